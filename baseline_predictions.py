@@ -0,0 +1,124 @@
+"""
+Baseline predictions stored in the dataset.
+
+Scores the published scores of every company once, offline, and writes the
+top-2 ratings and their probabilities back into the dataset as extra columns,
+together with the checksum of the model that computed them:
+
+    python -m baseline_predictions
+    python -m baseline_predictions --dataset data/universe_1m.parquet --version v2
+
+Company cards show these predictions as soon as they open, as long as the
+checksum matches the served model; only edited scores go through the model.
+"""
+import argparse
+import os
+import time
+
+import pandas as pd
+
+import config
+from data.database import CHUNK_ROWS, iter_dataset
+from instrumentation import get_logger, increment, timer
+from scoring import _ScoreWriter, score_chunk
+
+logger = get_logger("baseline_predictions")
+
+BASELINE_RATINGS = ["BASELINE_RATING_1", "BASELINE_RATING_2"]
+BASELINE_PROBABILITIES = ["BASELINE_PROBABILITY_1", "BASELINE_PROBABILITY_2"]
+BASELINE_MODEL = "BASELINE_MODEL"
+BASELINE_COLUMNS = BASELINE_RATINGS + BASELINE_PROBABILITIES + [BASELINE_MODEL]
+
+def add_baseline(model, checksum, chunk):
+    """
+    Adds (or replaces) the baseline prediction columns of a chunk of the dataset.
+
+    Args:
+        model (ModelInterface): The rating model.
+        checksum (str): The checksum of the model, stored in `BASELINE_MODEL`.
+        chunk (pd.DataFrame): Rows of the dataset.
+
+    Returns:
+        pd.DataFrame: The rows with the `BASELINE_*` columns last.
+    """
+    scores = score_chunk(model, chunk, 2)
+    chunk = chunk.drop(columns=BASELINE_COLUMNS, errors="ignore")
+    return chunk.assign(**{
+        "BASELINE_RATING_1": scores["RATING_1"].to_numpy(),
+        "BASELINE_PROBABILITY_1": scores["PROBABILITY_1"].to_numpy(),
+        "BASELINE_RATING_2": scores["RATING_2"].to_numpy(),
+        "BASELINE_PROBABILITY_2": scores["PROBABILITY_2"].to_numpy(),
+        BASELINE_MODEL: checksum,
+    })
+
+def build_baseline(model, checksum, dataset_path, output_path=None, chunk_rows=CHUNK_ROWS):
+    """
+    Writes the dataset with the baseline prediction of every company.
+
+    Args:
+        model (ModelInterface): The rating model.
+        checksum (str): The checksum of the model.
+        dataset_path (str): The dataset (.csv, .parquet or .feather).
+        output_path (str, optional): The output (.csv, .parquet or .feather); the dataset
+            itself by default. Written to a temporary file and moved into place
+            once complete, so the app never reads a partial file.
+        chunk_rows (int, optional): Rows read and scored per chunk.
+
+    Returns:
+        dict: `rows` and `seconds`.
+    """
+    output_path = output_path or dataset_path
+    writer = _ScoreWriter(output_path)
+    start = time.perf_counter()
+    rows = 0
+    with timer("baseline_build"):
+        try:
+            for chunk in iter_dataset(dataset_path, chunk_rows=chunk_rows):
+                writer.write(add_baseline(model, checksum, chunk))
+                rows += len(chunk)
+                increment("baseline_rows", len(chunk))
+                logger.info("Baseline of %d rows computed", rows)
+        except BaseException:
+            writer.abort()
+            raise
+        writer.close()
+    seconds = time.perf_counter() - start
+    logger.info("Baseline of %s (model %s) written to %s in %.1fs", dataset_path, checksum[:12], output_path, seconds)
+    return {"rows": rows, "seconds": seconds}
+
+def baseline_prediction(company, checksum):
+    """
+    Returns the stored baseline prediction of a company.
+
+    Args:
+        company (pd.Series): The company's row.
+        checksum (str): The checksum of the served model.
+
+    Returns:
+        tuple or None: The two ratings and their probabilities, or None if the
+        row has no baseline or it was computed by another model.
+    """
+    if company.get(BASELINE_MODEL) != checksum or pd.isna(company.get(BASELINE_RATINGS[0])):
+        return None
+    return [company[c] for c in BASELINE_RATINGS], [float(company[c]) for c in BASELINE_PROBABILITIES]
+
+def main():
+    from model_registry import ModelRegistry, load_served_model
+
+    parser = argparse.ArgumentParser(description="Store the baseline prediction of every company in the dataset.")
+    parser.add_argument("--dataset", default=config.DATASET_PATH, help="Dataset to score (.csv, .parquet or .feather).")
+    parser.add_argument("--output", help="Dataset to write (.csv, .parquet or .feather); the input dataset by default.")
+    parser.add_argument("--version", default=config.MODEL_VERSION, help="Registered model version; the served one by default.")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, help="Rows read and scored per chunk.")
+    args = parser.parse_args()
+
+    # Same model as the app: the registry's version, or CLARIFICATION_MODEL while it is empty
+    model = load_served_model(ModelRegistry(config.MODEL_REGISTRY_PATH), config.MODEL_PATH, args.version)
+    checksum = model.metadata["checksum"]
+
+    stats = build_baseline(model, checksum, args.dataset, args.output, args.chunk_rows)
+    print(f"Stored the baseline of {stats['rows']} companies (model {checksum[:12]}) in "
+          f"{os.path.abspath(args.output or args.dataset)} in {stats['seconds']:.1f}s")
+
+if __name__ == "__main__":
+    main()
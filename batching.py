@@ -0,0 +1,145 @@
+"""
+Micro-batching of concurrent prediction requests.
+
+Every Streamlit session (and every request of the REST service) predicts one
+or a few rows at a time, and each model call pays a fixed cost in input
+validation and scaling that dwarfs the arithmetic of a single row. The
+`MicroBatcher` queues those requests, stacks the ones arriving within a few
+milliseconds of each other into one matrix, makes a single `predict_proba`
+call and hands each caller its own rows back.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+import config
+from instrumentation import get_logger, increment, set_gauge
+
+logger = get_logger("batching")
+
+class MicroBatcher:
+    """
+    Stands in for a model, batching the prediction calls of concurrent callers.
+
+    A dispatcher thread takes the first queued request, then keeps collecting
+    requests for at most `max_wait_ms` or until `max_batch_rows` rows are
+    gathered. With `max_wait_ms=0` it does not wait, but still batches the
+    requests that queued up while the previous batch was running. If a batch
+    fails, its requests are retried one by one, so a bad request only fails
+    its own caller.
+
+    Exposes the `ModelInterface` prediction methods.
+    """
+    def __init__(self, model, max_batch_rows=config.PREDICT_BATCH_ROWS, max_wait_ms=config.PREDICT_BATCH_MS):
+        """
+        Args:
+            model (ModelInterface or ShadowModel): The model doing the predictions.
+            max_batch_rows (int, optional): Rows above which a batch is sent without waiting.
+            max_wait_ms (float, optional): How long the first request of a batch waits for others.
+        """
+        self.model = model
+        self.max_batch_rows = max_batch_rows
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def metadata(self):
+        return getattr(self.model, "metadata", {})
+
+    def submit(self, input_data):
+        """
+        Queues rows for prediction.
+
+        Args:
+            input_data (array-like): One row or a matrix of rows.
+
+        Returns:
+            concurrent.futures.Future: Resolves to the probability vectors of the rows.
+
+        Raises:
+            ValueError: If the rows are not numbers, or not a row or a matrix.
+        """
+        rows = np.asarray(input_data, dtype=np.float64)
+        if rows.ndim == 1:
+            rows = rows.reshape(1, -1)
+        if rows.ndim != 2:
+            raise ValueError(f"Expected one row or a matrix of rows, got an array of shape {rows.shape}")
+        future = Future()
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+                    self._thread.start()
+        self._queue.put((rows, future))
+        return future
+
+    def predict_proba(self, input_data):
+        return self.submit(input_data).result()
+
+    def summarize(self, probabilities, k=2):
+        return self.model.summarize(probabilities, k)
+
+    def predict_distribution(self, input_data, k=2):
+        return self.summarize(self.predict_proba(input_data), k)
+
+    def top_k(self, input_data, k=2):
+        prediction = self.predict_distribution(input_data, k)
+        return prediction["classes"], prediction["confidences"]
+
+    def predict(self, input_data):
+        classes, _ = self.top_k(input_data, 2)
+        return classes
+
+    def sensitivity(self, input_row, steps=101, low=0.0, high=10.0):
+        # Already a single batched call
+        return self.model.sensitivity(input_row, steps, low, high)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            try:
+                rows = len(batch[0][0])
+                deadline = time.perf_counter() + self.max_wait
+                while rows < self.max_batch_rows:
+                    timeout = deadline - time.perf_counter()
+                    try:
+                        item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    batch.append(item)
+                    rows += len(item[0])
+                self._dispatch(batch, rows)
+            except Exception as e:
+                # The thread serves every session: it must survive, and no caller may wait forever
+                logger.exception("Micro-batcher failed on a batch of %d requests", len(batch))
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _dispatch(self, batch, rows):
+        increment("model_batches")
+        increment("model_batched_requests", len(batch))
+        set_gauge("model_batch_rows", rows)
+        try:
+            stacked = batch[0][0] if len(batch) == 1 else np.concatenate([part for part, _ in batch])
+            probabilities = self.model.predict_proba(stacked)
+            if len(probabilities) != rows:
+                raise ValueError(f"The model returned {len(probabilities)} predictions for {rows} rows")
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0][1].set_exception(e)
+                return
+            logger.warning("Batch of %d requests failed, retrying them one by one: %s", len(batch), e)
+            increment("model_batch_retries")
+            for item in batch:
+                self._dispatch([item], len(item[0]))
+            return
+        offset = 0
+        for part, future in batch:
+            future.set_result(probabilities[offset:offset + len(part)])
+            offset += len(part)
@@ -0,0 +1,84 @@
+"""
+Throughput of single-row predictions, per call versus micro-batched.
+
+Starts N caller threads (as many concurrent sessions), each predicting
+single rows back to back, first calling the model directly and then through
+a `MicroBatcher`, and reports rows per second and latency percentiles:
+
+    python benchmarks/batching_throughput.py
+    python benchmarks/batching_throughput.py --callers 1 8 64 --calls 500 --max-wait-ms 1 --json batching.json
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+import warnings
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def run(predict, rows, callers, calls):
+    latencies = [[] for _ in range(callers)]
+    barrier = threading.Barrier(callers + 1)
+
+    def caller(index):
+        barrier.wait()
+        for i in range(calls):
+            start = time.perf_counter()
+            predict(rows[(index * calls + i) % len(rows)])
+            latencies[index].append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=caller, args=(i,)) for i in range(callers)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    samples = [latency for per_caller in latencies for latency in per_caller]
+    quantiles = statistics.quantiles(samples, n=100)
+    return {"rows_per_second": len(samples) / elapsed, "p50_ms": quantiles[49] * 1000, "p99_ms": quantiles[98] * 1000}
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-call and micro-batched single-row predictions.")
+    parser.add_argument("--callers", type=int, nargs="+", default=[1, 4, 16, 64], help="Concurrent caller threads.")
+    parser.add_argument("--calls", type=int, default=300, help="Predictions per caller.")
+    parser.add_argument("--max-wait-ms", type=float, default=0.0, help="Batching window of the MicroBatcher.")
+    parser.add_argument("--max-batch-rows", type=int, default=4096, help="Largest batch of the MicroBatcher.")
+    parser.add_argument("--json", help="Write the results as JSON to this file.")
+    args = parser.parse_args()
+
+    sys.path.insert(0, REPO_ROOT)
+    os.chdir(REPO_ROOT)
+    warnings.filterwarnings("ignore", message="Trying to unpickle estimator")
+    warnings.filterwarnings("ignore", message="X does not have valid feature names")
+    import config
+    from batching import MicroBatcher
+    from data.database import read_dataset
+    from features import FEATURES
+    from ml_model import ModelInterface
+
+    model = ModelInterface(config.MODEL_PATH)
+    rows = [[row] for row in FEATURES.from_frame(read_dataset(config.DATASET_PATH), dtype=float).tolist()]
+    batcher = MicroBatcher(model, args.max_batch_rows, args.max_wait_ms)
+
+    results = []
+    for callers in args.callers:
+        for mode, predict in (("per-call", model.predict_proba), ("batched", batcher.predict_proba)):
+            result = run(predict, rows, callers, args.calls)
+            results.append({"callers": callers, "mode": mode, **result})
+
+    print(f"{'callers':>8} {'mode':<10}{'rows/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for r in results:
+        print(f"{r['callers']:>8} {r['mode']:<10}{r['rows_per_second']:>10.0f}{r['p50_ms']:>10.2f}{r['p99_ms']:>10.2f}")
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump({"max_wait_ms": args.max_wait_ms, "results": results}, file, indent=2)
+
+if __name__ == "__main__":
+    main()
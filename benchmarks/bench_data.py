@@ -0,0 +1,48 @@
+import random
+
+import pytest
+
+import config
+from data import database
+from data.store import CompanyStore
+
+
+@pytest.fixture(scope="module")
+def universe_store(universe):
+    return CompanyStore(universe)
+
+
+def bench_companies_data_load(benchmark):
+    store = benchmark(lambda: CompanyStore(database.read_dataset(config.DATASET_PATH)))
+    assert len(store.frame) > 0
+
+
+@pytest.mark.parametrize("n_selected", [1, 10, 50])
+def bench_get_card_data(benchmark, monkeypatch, universe_store, n_selected):
+    monkeypatch.setattr(database, "get_store", lambda: universe_store)
+    selected = random.Random(0).sample(universe_store.names().tolist(), n_selected)
+
+    result = benchmark(database.get_card_data, selected)
+    assert len(result) == n_selected
+
+
+def bench_get_companies_names(benchmark, monkeypatch, universe_store):
+    monkeypatch.setattr(database, "get_store", lambda: universe_store)
+
+    def names():
+        database._companies_names.clear()
+        return database.get_companies_names()
+
+    assert len(benchmark(names)) == len(universe_store.frame)
+    # Do not leak the synthesized names into the other benchmarks
+    database._companies_names.clear()
+
+
+def bench_store_upsert(benchmark, universe_store):
+    rows = universe_store.frame.sample(10, random_state=0).copy()
+
+    def upsert():
+        rows["BOARD_SCORE"] = (rows["BOARD_SCORE"] + 0.1) % 10
+        return universe_store.upsert(rows)
+
+    assert len(benchmark(upsert)) == 10
@@ -0,0 +1,42 @@
+import datetime
+import random
+
+import pytest
+
+from data.history import HistoryStore, synthesize_history
+
+HISTORY_DAYS = 3 * 365
+END_DATE = datetime.date(2026, 10, 19)
+
+
+@pytest.fixture(scope="module")
+def history(tmp_path_factory, demo_data):
+    store = HistoryStore(str(tmp_path_factory.mktemp("history")))
+    for date, snapshot in synthesize_history(demo_data, HISTORY_DAYS, END_DATE):
+        store.append(snapshot, date)
+    return store
+
+
+def bench_company_history(benchmark, history, demo_data):
+    company = random.Random(0).choice(demo_data["Company_Name"].tolist())
+    columns = ["IVA_COMPANY_RATING", "ENVIRONMENTAL_PILLAR_SCORE", "SOCIAL_PILLAR_SCORE", "GOVERNANCE_PILLAR_SCORE"]
+
+    result = benchmark(history.company_history, company, columns=columns)
+    assert len(result) == HISTORY_DAYS
+
+
+def bench_rolling_changes(benchmark, history, demo_data):
+    result = benchmark(history.rolling_changes, 90)
+    assert len(result) == len(demo_data)
+
+
+def bench_rating_transitions(benchmark, history):
+    result = benchmark(history.rating_transitions)
+    assert set(result["direction"]) <= {"upgrade", "downgrade"}
+
+
+def bench_history_append(benchmark, tmp_path, demo_data):
+    store = HistoryStore(str(tmp_path))
+    dates = iter(END_DATE + datetime.timedelta(days=i) for i in range(10_000))
+
+    benchmark(lambda: store.append(demo_data, next(dates)))
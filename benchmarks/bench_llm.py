@@ -0,0 +1,9 @@
+from llama_wrapper import CompanyAnalyzer
+
+
+def bench_analyze_stub_stream(benchmark, stub_llm_url, demo_data):
+    analyzer = CompanyAnalyzer(api_url=stub_llm_url, model_name="stub", csv_path="data/df_demo.csv")
+    row = demo_data.iloc[0]
+
+    result = benchmark(analyzer.analyze, row)
+    assert result.startswith("tok0")
@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+
+from features import FEATURES
+
+
+def bench_predict_single(benchmark, model, demo_data):
+    row = FEATURES.from_frame(demo_data.iloc[:1], dtype=np.float64).tolist()
+
+    prediction = benchmark(model.predict, row)
+    assert prediction.shape == (1, 2)
+
+
+@pytest.mark.parametrize("batch_size", [100, 10_000])
+def bench_predict_batch(benchmark, model, demo_data, batch_size):
+    scores = FEATURES.from_frame(demo_data, dtype=np.float64)
+    batch = scores.take(range(batch_size), axis=0, mode="wrap")
+
+    prediction = benchmark(model.predict, batch)
+    assert prediction.shape == (batch_size, 2)
+
+
+def bench_sensitivity(benchmark, model, demo_data):
+    row = FEATURES.from_frame(demo_data.iloc[:1], dtype=np.float64)[0].tolist()
+
+    result = benchmark(model.sensitivity, row)
+    assert result["ratings"].shape == (len(FEATURES), 101)
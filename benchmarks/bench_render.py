@@ -0,0 +1,40 @@
+"""
+Renders the card and the comparator through Streamlit's AppTest, i.e. the
+full script run including element serialization, without a browser.
+"""
+import pytest
+from streamlit.testing.v1 import AppTest
+
+CARD_SCRIPT = """
+import streamlit as st
+from data import database
+from company_card import company_card
+
+for company in database.get_card_data(database.get_companies_names()[:{n}]):
+    company_card(company)
+"""
+
+COMPARATOR_SCRIPT = """
+import streamlit as st
+from data import database
+from companies_comparator import companies_comparator
+
+companies_comparator(database.get_card_data(database.get_companies_names()[:{n}]))
+"""
+
+
+def _run(script):
+    at = AppTest.from_string(script, default_timeout=60).run()
+    assert not at.exception
+    return at
+
+
+@pytest.mark.parametrize("n_cards", [1, 10])
+def bench_render_company_card(benchmark, n_cards):
+    at = benchmark(_run, CARD_SCRIPT.format(n=n_cards))
+    assert len(at.slider) == 11 * n_cards
+
+
+@pytest.mark.parametrize("n_companies", [2, 20])
+def bench_render_companies_comparator(benchmark, n_companies):
+    benchmark(_run, COMPARATOR_SCRIPT.format(n=n_companies))
@@ -0,0 +1,97 @@
+"""
+Shared fixtures for the benchmark suite.
+
+Run from the repository root:
+
+    pip install -r benchmarks/requirements.txt
+    python -m pytest benchmarks
+
+Every run is saved by pytest-benchmark as JSON under `.benchmarks/`
+(commit id included); compare two runs with
+`pytest-benchmark compare 0001 0002` or fail on regressions with
+`python -m pytest benchmarks --benchmark-compare --benchmark-compare-fail=mean:20%`.
+"""
+import json
+import os
+import sys
+import threading
+import warnings
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+# The app opens "data/...", "ml-model/..." relative to the working directory
+os.chdir(REPO_ROOT)
+
+from data.generator import DatasetProfile
+
+# The pickled scaler was fitted with an older scikit-learn
+warnings.filterwarnings("ignore", message="Trying to unpickle estimator")
+
+UNIVERSE_SIZES = [500, 5_000, 50_000]
+DEMO_CSV = os.path.join(REPO_ROOT, "data", "df_demo.csv")
+
+def synthesize_universe(size):
+    """
+    Builds a dataset of `size` companies with the distributions learned from `df_demo.csv`.
+
+    Args:
+        size (int): The number of rows of the synthesized dataset.
+
+    Returns:
+        pd.DataFrame: The synthesized dataset.
+    """
+    profile = DatasetProfile(pd.read_csv(DEMO_CSV))
+    return profile.sample(np.random.default_rng(0), 0, size)
+
+@pytest.fixture(scope="session")
+def demo_data():
+    return pd.read_csv(DEMO_CSV)
+
+@pytest.fixture(scope="session", params=UNIVERSE_SIZES, ids=lambda size: f"n={size}")
+def universe(request):
+    return synthesize_universe(request.param)
+
+@pytest.fixture(scope="session")
+def model():
+    from ml_model import ModelInterface
+    return ModelInterface("ml-model/model.pkl")
+
+class _StubChatHandler(BaseHTTPRequestHandler):
+    """
+    Mimics Ollama's streaming `/api/chat`: one NDJSON line per token, then a `done` line.
+    """
+    protocol_version = "HTTP/1.0"
+    tokens = 120
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+        for i in range(self.tokens):
+            line = {"model": "stub", "message": {"role": "assistant", "content": f"tok{i} "}, "done": False}
+            self.wfile.write(json.dumps(line).encode("utf-8") + b"\n")
+            self.wfile.flush()
+        done = {"model": "stub", "message": {"role": "assistant", "content": ""}, "done": True,
+                "eval_count": self.tokens, "eval_duration": 1_000_000}
+        self.wfile.write(json.dumps(done).encode("utf-8") + b"\n")
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture(scope="session")
+def stub_llm_url():
+    """
+    Starts a local stub of the streaming chat endpoint and yields its URL.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubChatHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/api/chat"
+    server.shutdown()
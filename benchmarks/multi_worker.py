@@ -0,0 +1,130 @@
+"""
+Cache hit rates and memory of N app workers, with and without the shared cache.
+
+Launches N worker processes the way `python -m workers` configures them
+(SQLite dataset, shared SQLite cache), each replaying user sessions through
+Streamlit's AppTest: open a card among the first companies, move a slider,
+show the sensitivity table and read the analysis. A stub LLM answers the
+analyses. Each run is repeated with isolated workers for comparison:
+
+    python benchmarks/multi_worker.py
+    python benchmarks/multi_worker.py --workers 4 --sessions 20 --companies 10 --json workers.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = r"""
+import json, os, random, sys, warnings
+warnings.filterwarnings("ignore")
+sessions, companies, seed = int(sys.argv[1]), int(sys.argv[2]), int(sys.argv[3])
+
+from streamlit.testing.v1 import AppTest
+import instrumentation
+
+rng = random.Random(seed)
+for _ in range(sessions):
+    at = AppTest.from_file("main.py", default_timeout=120).run()
+    name = rng.choice(at.multiselect[0].options[:companies])
+    at.multiselect[0].select(name).run()
+    at.slider(key=f"slide1_{name}").set_value(rng.choice([2.0, 5.0, 8.0])).run()
+    at.toggle(key=f"sensitivity_{name}").set_value(True).run()
+    at.button(key=f"analysis_button_{name}").click().run()
+
+with open("/proc/self/statm") as f:
+    rss_mb = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+counters = instrumentation.snapshot()["counters"]
+print(json.dumps({"counters": counters, "rss_mb": rss_mb}))
+"""
+
+class _StubLLM(BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(0.2)
+        self.send_response(200)
+        self.end_headers()
+        for piece in ["- Strength: governance\n", "- Weakness: pay\n"]:
+            self.wfile.write((json.dumps({"message": {"content": piece}, "done": False}) + "\n").encode())
+        self.wfile.write((json.dumps({"message": {"content": ""}, "done": True, "eval_count": 2}) + "\n").encode())
+
+    def log_message(self, format, *args):
+        pass
+
+def run(workers, sessions, companies, llm_url, shared_cache):
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT, CLARIFICATION_LLM_URL=llm_url, CLARIFICATION_BACKEND="sqlite",
+               CLARIFICATION_REFRESH_SECONDS="0")
+    if shared_cache:
+        env["CLARIFICATION_SHARED_CACHE"] = shared_cache
+    else:
+        env.pop("CLARIFICATION_SHARED_CACHE", None)
+    processes = [
+        subprocess.Popen([sys.executable, "-c", PROBE, str(sessions), str(companies), str(i)],
+                         cwd=REPO_ROOT, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        for i in range(workers)
+    ]
+    results = []
+    for i, process in enumerate(processes):
+        stdout, stderr = process.communicate()
+        if process.returncode != 0:
+            raise RuntimeError(stderr[-2000:])
+        result = json.loads(stdout.strip().splitlines()[-1])
+        counters = result["counters"]
+        hits = counters.get("state_hits", 0)
+        shared_hits = counters.get("state_spill_hits", 0)
+        lookups = hits + shared_hits + counters.get("state_misses", 0)
+        results.append({
+            "worker": i,
+            "hit_rate": (hits + shared_hits) / lookups if lookups else 0.0,
+            "shared_hits": shared_hits,
+            "llm_requests": counters.get("llm_requests", 0),
+            "rss_mb": result["rss_mb"],
+        })
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cache hit rates and memory of N workers.")
+    parser.add_argument("--workers", type=int, default=3, help="Worker processes.")
+    parser.add_argument("--sessions", type=int, default=10, help="Sessions replayed per worker.")
+    parser.add_argument("--companies", type=int, default=5, help="Companies the sessions pick from.")
+    parser.add_argument("--json", help="Write the results as JSON to this file.")
+    args = parser.parse_args()
+
+    sys.path.insert(0, REPO_ROOT)
+    os.chdir(REPO_ROOT)
+    from workers import prepare
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubLLM)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    llm_url = f"http://127.0.0.1:{server.server_address[1]}/api/chat"
+
+    report = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        shared_cache = os.path.join(workdir, "shared_cache.sqlite")
+        prepare(shared_cache, "sqlite")
+        for mode, cache in (("isolated", None), ("shared", shared_cache)):
+            start = time.perf_counter()
+            report[mode] = {"results": run(args.workers, args.sessions, args.companies, llm_url, cache),
+                            "seconds": time.perf_counter() - start}
+    server.shutdown()
+
+    print(f"{'mode':<10}{'worker':>7}{'hit rate':>10}{'shared':>8}{'LLM calls':>11}{'RSS MB':>9}")
+    for mode, run_report in report.items():
+        for r in run_report["results"]:
+            print(f"{mode:<10}{r['worker']:>7}{r['hit_rate']:>10.0%}{r['shared_hits']:>8}{r['llm_requests']:>11}{r['rss_mb']:>9.0f}")
+        total = sum(r["llm_requests"] for r in run_report["results"])
+        print(f"{mode:<10}{'all':>7}{'':>10}{'':>8}{total:>11}{'':>9}  ({run_report['seconds']:.0f}s)")
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump({"workers": args.workers, "sessions": args.sessions, **report}, file, indent=2)
+
+if __name__ == "__main__":
+    main()
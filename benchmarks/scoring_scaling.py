@@ -0,0 +1,69 @@
+"""
+Scaling of the parallel scoring executor from 1 to N worker processes.
+
+Generates a synthetic dataset (2M rows of Parquet by default, reused between
+runs), scores it once with the single-process `score_file` as a baseline,
+then with `score_file_parallel` for each worker count:
+
+    python benchmarks/scoring_scaling.py
+    python benchmarks/scoring_scaling.py --rows 500000 --max-workers 8 --format csv --json scaling.json
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import warnings
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure parallel scoring throughput from 1 to N workers.")
+    parser.add_argument("--rows", type=int, default=2_000_000, help="Rows of the synthetic dataset.")
+    parser.add_argument("--format", choices=["parquet", "feather", "csv"], default="parquet", help="Format of the dataset.")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count(), help="Largest number of workers tried.")
+    parser.add_argument("--chunk-rows", type=int, default=100_000, help="Rows per shard.")
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "clarification-bench"), help="Where datasets are generated and reused.")
+    parser.add_argument("--json", help="Write the results as JSON to this file.")
+    args = parser.parse_args()
+
+    sys.path.insert(0, REPO_ROOT)
+    os.chdir(REPO_ROOT)
+    # The pickled scaler was fitted with an older scikit-learn, on a DataFrame;
+    # forked workers inherit these filters
+    warnings.filterwarnings("ignore", message="Trying to unpickle estimator")
+    warnings.filterwarnings("ignore", message="X does not have valid feature names")
+    import config
+    from data.generator import generate
+    from ml_model import ModelInterface
+    from scoring import score_file, score_file_parallel
+
+    os.makedirs(args.workdir, exist_ok=True)
+    dataset = os.path.join(args.workdir, f"universe_{args.rows}.{args.format}")
+    output = os.path.join(args.workdir, "scores.parquet")
+    if not os.path.exists(dataset):
+        print(f"Generating {args.rows} rows into {dataset}...")
+        generate(args.rows, dataset)
+
+    baseline = score_file(ModelInterface(config.MODEL_PATH), dataset, output, args.chunk_rows)
+    results = [{"workers": 0, "seconds": baseline["seconds"], "rows_per_second": baseline["rows_per_second"]}]
+    for workers in range(1, args.max_workers + 1):
+        stats = score_file_parallel(config.MODEL_PATH, dataset, output, workers, args.chunk_rows)
+        results.append({"workers": workers, "seconds": stats["seconds"], "rows_per_second": stats["rows_per_second"]})
+    os.remove(output)
+
+    single = results[1]["rows_per_second"]
+    print(f"{'workers':>8} {'seconds':>9} {'rows/s':>12} {'speedup':>8} {'efficiency':>11}")
+    for result in results:
+        label = "serial" if result["workers"] == 0 else str(result["workers"])
+        speedup = result["rows_per_second"] / single
+        result["speedup"] = speedup
+        efficiency = f"{speedup / result['workers']:.0%}" if result["workers"] else ""
+        print(f"{label:>8} {result['seconds']:>9.2f} {result['rows_per_second']:>12,.0f} {speedup:>8.2f} {efficiency:>11}")
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump({"rows": args.rows, "format": args.format, "cpu_count": os.cpu_count(), "results": results}, file, indent=2)
+
+if __name__ == "__main__":
+    main()
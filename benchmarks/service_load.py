@@ -0,0 +1,123 @@
+"""
+Load test of the REST service.
+
+Starts `python -m service` on a free port (or targets a running one with
+--url), then sends requests from concurrent clients and reports throughput
+and latency percentiles per scenario:
+
+    python benchmarks/service_load.py
+    python benchmarks/service_load.py --clients 32 --requests 2000 --scenario predict-1
+    python benchmarks/service_load.py --url http://localhost:8600 --json service.json
+
+Scenarios: `predict-1` (one row per request, batched by the service),
+`predict-100` (100 rows per request) and `lookup` (one company by name).
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+import requests
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCENARIOS = ("predict-1", "predict-100", "lookup")
+FEATURES = 11
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_service(workers):
+    port = _free_port()
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT, CLARIFICATION_REFRESH_SECONDS="0")
+    process = subprocess.Popen([sys.executable, "-m", "service", "--port", str(port), "--workers", str(workers)],
+                               cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(300):
+        try:
+            requests.get(url + "/health", timeout=1).raise_for_status()
+            return process, url
+        except requests.RequestException:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("The service did not start")
+
+def _request_factory(scenario, url, names, rng):
+    if scenario == "lookup":
+        return lambda session: session.get(f"{url}/companies/{quote(rng.choice(names), safe='')}")
+    rows = 1 if scenario == "predict-1" else 100
+    def send(session):
+        body = {"rows": [[round(rng.uniform(0, 10), 1) for _ in range(FEATURES)] for _ in range(rows)]}
+        return session.post(f"{url}/predict", json=body)
+    return send
+
+def run_scenario(scenario, url, names, clients, total):
+    rng = random.Random(0)
+    send = _request_factory(scenario, url, names, rng)
+    latencies = []
+    errors = 0
+
+    def client(count):
+        nonlocal errors
+        session = requests.Session()
+        for _ in range(count):
+            start = time.perf_counter()
+            response = send(session)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                errors += 1
+
+    per_client = [total // clients + (i < total % clients) for i in range(clients)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        list(pool.map(client, per_client))
+    elapsed = time.perf_counter() - start
+
+    quantiles = statistics.quantiles(latencies, n=100)
+    return {
+        "scenario": scenario,
+        "requests": total,
+        "errors": errors,
+        "requests_per_second": total / elapsed,
+        "p50_ms": quantiles[49] * 1000,
+        "p95_ms": quantiles[94] * 1000,
+        "p99_ms": quantiles[98] * 1000,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the REST service.")
+    parser.add_argument("--url", help="A running service; one is started by default.")
+    parser.add_argument("--workers", type=int, default=4, help="Worker threads of the started service.")
+    parser.add_argument("--clients", type=int, default=16, help="Concurrent clients.")
+    parser.add_argument("--requests", type=int, default=1000, help="Requests per scenario.")
+    parser.add_argument("--scenario", choices=SCENARIOS, action="append", help="Scenario to run; all by default.")
+    parser.add_argument("--json", help="Write the results as JSON to this file.")
+    args = parser.parse_args()
+
+    process, url = (None, args.url.rstrip("/")) if args.url else start_service(args.workers)
+    try:
+        names = [row["Company_Name"] for row in requests.get(url + "/companies", params={"limit": 1000}).json()]
+        results = [run_scenario(scenario, url, names, args.clients, args.requests) for scenario in args.scenario or SCENARIOS]
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    print(f"{'scenario':<14}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for r in results:
+        print(f"{r['scenario']:<14}{r['requests_per_second']:>10.0f}{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}{r['p99_ms']:>10.1f}{r['errors']:>8}")
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump({"clients": args.clients, "results": results}, file, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Cold start report: import-time profile and time to first paint of `main.py`.
+
+Runs the app once in a fresh interpreter with `-X importtime` through
+Streamlit's AppTest (no selection, i.e. the first page a user sees), then
+reports the slowest imports, flags heavy modules that should have been
+deferred and checks the first-paint time against a target:
+
+    python benchmarks/startup.py
+    python benchmarks/startup.py --target 1.5 --json startup.json
+
+Exits with status 1 when the target is missed or a deferred module was imported.
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Time to first paint target, in seconds, measured from interpreter start
+TTFP_TARGET_SECONDS = 1.2
+
+# Only needed once a card is rendered or an analysis is requested. Streamlit
+# itself imports the light `plotly` package, so only the figure classes are checked
+DEFERRED_MODULES = ["plotly.graph_objs._figure", "sklearn", "joblib", "mord", "requests", "ml_model", "llama_wrapper"]
+
+RUNNER = """
+import time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+harness = time.perf_counter() - start
+at = AppTest.from_file("main.py", default_timeout=120).run()
+assert not at.exception, at.exception
+print("TTFP", time.perf_counter() - start - harness)
+"""
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+def parse_importtime(stderr):
+    """
+    Parses the `-X importtime` output.
+
+    Args:
+        stderr (str): The stderr of the profiled interpreter.
+
+    Returns:
+        list: One dict per imported module with `module`, `self_us`, `cumulative_us` and `depth`.
+    """
+    modules = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            modules.append({"module": module, "self_us": int(self_us), "cumulative_us": int(cumulative_us), "depth": len(indent) // 2})
+    return modules
+
+def profile_startup():
+    """
+    Runs the first paint of `main.py` in a fresh interpreter.
+
+    Returns:
+        tuple: (time to first paint in seconds, parsed import profile).
+    """
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT, PYTHONWARNINGS="ignore")
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", RUNNER], cwd=REPO_ROOT, env=env, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"First paint failed:\n{completed.stderr[-2000:]}")
+    ttfp = float(re.search(r"TTFP ([0-9.]+)", completed.stdout).group(1))
+    return ttfp, parse_importtime(completed.stderr)
+
+def main():
+    parser = argparse.ArgumentParser(description="Report import time and time to first paint of main.py.")
+    parser.add_argument("--target", type=float, default=TTFP_TARGET_SECONDS, help="Time to first paint target in seconds.")
+    parser.add_argument("--top", type=int, default=15, help="Number of slowest top-level imports to show.")
+    parser.add_argument("--json", help="Write the report as JSON to this file.")
+    args = parser.parse_args()
+
+    ttfp, modules = profile_startup()
+    top_level = sorted((m for m in modules if m["depth"] == 1), key=lambda m: m["cumulative_us"], reverse=True)
+    imported = {m["module"] for m in modules}
+    eager = [name for name in DEFERRED_MODULES if any(module == name or module.startswith(name + ".") for module in imported)]
+
+    print(f"{'module':<40} {'cumulative (ms)':>16} {'self (ms)':>10}")
+    for m in top_level[:args.top]:
+        print(f"{m['module']:<40} {m['cumulative_us'] / 1000:>16.1f} {m['self_us'] / 1000:>10.1f}")
+    print()
+    print(f"Modules imported before first paint: {len(modules)}")
+    print(f"Deferred modules imported eagerly: {', '.join(eager) if eager else 'none'}")
+    print(f"Time to first paint: {ttfp:.3f}s (target {args.target:.3f}s)")
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump({"ttfp_seconds": ttfp, "target_seconds": args.target, "eager_modules": eager, "imports": modules}, file, indent=2)
+
+    sys.exit(0 if ttfp <= args.target and not eager else 1)
+
+if __name__ == "__main__":
+    main()
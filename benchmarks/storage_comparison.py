@@ -0,0 +1,103 @@
+"""
+Memory and latency of the in-memory (CSV) store versus the SQLite store.
+
+Generates a synthetic dataset (1M rows by default, reused between runs),
+builds its SQLite file, then measures each backend in a fresh interpreter so
+resident memory is not shared:
+
+    python benchmarks/storage_comparison.py
+    python benchmarks/storage_comparison.py --rows 100000 --json storage.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = r"""
+import json, os, random, statistics, sys, time, warnings
+warnings.filterwarnings("ignore")
+backend, dataset, sqlite_path = sys.argv[1:4]
+
+def rss_mb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+def median_ms(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+import pandas as pd
+from data.database import read_dataset
+from data.sqlite_backend import SqliteCompanyStore
+from data.store import CompanyStore
+baseline = rss_mb()
+
+start = time.perf_counter()
+store = CompanyStore(read_dataset(dataset)) if backend == "memory" else SqliteCompanyStore(sqlite_path)
+load_s = time.perf_counter() - start
+loaded = rss_mb()
+
+names = store.sorted_names()
+sample = random.Random(0).sample(names, 10)
+result = {
+    "backend": backend,
+    "load_s": load_s,
+    "rss_after_load_mb": loaded - baseline,
+    "sorted_names_ms": median_ms(store.sorted_names, 3),
+    "lookup_10_ms": median_ms(lambda: store.lookup(sample), 50),
+    "filter_industry_rating_ms": median_ms(lambda: store.filter(industry="Banks", rating="AA"), 20),
+    "company_version_ms": median_ms(lambda: store.company_version(sample[0]), 200),
+}
+result["rss_final_mb"] = rss_mb() - baseline
+print(json.dumps(result))
+"""
+
+def run_probe(backend, dataset, sqlite_path):
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT, CLARIFICATION_METRICS="0")
+    completed = subprocess.run([sys.executable, "-c", PROBE, backend, dataset, sqlite_path], cwd=REPO_ROOT, env=env, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr[-2000:])
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the in-memory and SQLite dataset stores.")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Rows of the synthetic dataset.")
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "clarification-bench"), help="Where datasets are generated and reused.")
+    parser.add_argument("--json", help="Write the results as JSON to this file.")
+    args = parser.parse_args()
+
+    sys.path.insert(0, REPO_ROOT)
+    os.chdir(REPO_ROOT)
+    from data.database import read_dataset
+    from data.generator import generate
+    from data.sqlite_backend import open_store
+
+    os.makedirs(args.workdir, exist_ok=True)
+    dataset = os.path.join(args.workdir, f"universe_{args.rows}.csv")
+    sqlite_path = os.path.join(args.workdir, f"universe_{args.rows}.sqlite")
+    if not os.path.exists(dataset):
+        print(f"Generating {args.rows} rows into {dataset}...")
+        generate(args.rows, dataset)
+    open_store(sqlite_path, dataset, read_dataset)
+
+    results = [run_probe(backend, dataset, sqlite_path) for backend in ("memory", "sqlite")]
+
+    metrics = [k for k in results[0] if k != "backend"]
+    print(f"{'metric':<28}" + "".join(f"{r['backend']:>14}" for r in results))
+    for metric in metrics:
+        print(f"{metric:<28}" + "".join(f"{r[metric]:>14.2f}" for r in results))
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump({"rows": args.rows, "results": results}, file, indent=2)
+
+if __name__ == "__main__":
+    main()
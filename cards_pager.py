@@ -0,0 +1,83 @@
+import math
+import streamlit as st
+from company_card import company_card, company_summary_row
+from features import FEATURES
+
+PAGE_SIZE_OPTIONS = [3, 5, 10, 20]
+DEFAULT_PAGE_SIZE = 5
+
+def _keep_widget_state(company_name):
+    """
+    Keeps the slider values of a company alive while its card is not rendered.
+
+    Streamlit drops the state of widgets that are not drawn during a rerun, so
+    the sliders of a company living on another page would fall back to the
+    dataset values. Re-assigning each key through the Session State API turns
+    it into user state, which survives until the card is rendered again.
+
+    Args:
+        company_name (str): The company whose slider keys must be preserved.
+
+    Returns:
+        None
+    """
+    for key in FEATURES.slider_keys(company_name):
+        if key in st.session_state:
+            st.session_state[key] = st.session_state[key]
+
+def _go_to_page(page):
+    st.session_state["cards_page"] = page
+
+def render_company_cards(card_data):
+    """
+    Renders the selected companies as a paginated list of cards.
+
+    Only the cards belonging to the current page are fully built (chart,
+    sliders and buttons); every other company is shown as a collapsed
+    summary row with a button that jumps to its page. Per-company session
+    state (`slide*_*`, `prediction_*`, `analysis_*`) is preserved across pages.
+
+    Args:
+        card_data (list): A list of rows (as pandas Series) returned by `get_card_data`.
+
+    Returns:
+        None
+
+    Example:
+        >>> render_company_cards(get_card_data(["Company A", "Company B"]))
+        # Renders the first page of cards and summary rows for the rest.
+    """
+    if card_data == None or len(card_data) == 0:
+        return
+
+    page_size = st.session_state.get("cards_page_size", DEFAULT_PAGE_SIZE)
+    n_pages = max(1, math.ceil(len(card_data) / page_size))
+    if st.session_state.get("cards_page", 1) > n_pages:
+        st.session_state["cards_page"] = n_pages
+
+    page = 1
+    if len(card_data) > PAGE_SIZE_OPTIONS[0]:
+        size_col, page_col, info_col = st.columns([1, 1, 3])
+        with size_col:
+            st.selectbox("Cards per page", PAGE_SIZE_OPTIONS, index=PAGE_SIZE_OPTIONS.index(DEFAULT_PAGE_SIZE), key="cards_page_size")
+        if n_pages > 1:
+            with page_col:
+                page = st.number_input("Page", min_value=1, max_value=n_pages, step=1, key="cards_page")
+            with info_col:
+                st.markdown(f"Showing page {page} of {n_pages} ({len(card_data)} companies)")
+
+    first = (page - 1) * page_size
+    last = first + page_size
+
+    for i, company in enumerate(card_data):
+        if first <= i < last:
+            company_card(company)
+
+    others = [(i, company) for i, company in enumerate(card_data) if not first <= i < last]
+    if len(others) == 0:
+        return
+
+    st.markdown("#### Other selected companies")
+    for i, company in others:
+        _keep_widget_state(company['Company_Name'])
+        company_summary_row(company, on_open=_go_to_page, open_args=(i // page_size + 1,))
@@ -1,5 +1,5 @@
 import streamlit as st
-import plotly.graph_objects as go
+from figures import comparison_figure
 
 def companies_comparator(companies):
     """
@@ -50,65 +50,7 @@ def companies_comparator(companies):
             st.write(
                     "Select at least one company to display the information."
                     )
-        category_names = [
-            'Environmental', 'Social', 'Governance', 'Climate Change', 'Business Ethics',
-            'Human Capital', 'Human Capital Dev', 'Accounting', 'Board',
-            'Ownership & Control', 'Pay'
-        ]
-        fig_comparison = go.Figure()
-
-        for i, company in enumerate(companies):
-            company_name = company['Company_Name']
-            esg_values = [
-                company.get("ENVIRONMENTAL_PILLAR_SCORE", 5),
-                company.get("SOCIAL_PILLAR_SCORE", 5),
-                company.get("GOVERNANCE_PILLAR_SCORE", 5),
-                company.get("CLIMATE_CHANGE_THEME_SCORE", 5),
-                company.get("BUSINESS_ETHICS_THEME_SCORE", 5),
-                company.get("HUMAN_CAPITAL_THEME_SCORE", 5),
-                company.get("HUMAN_CAPITAL_DEV_SCORE", 5),
-                company.get("ACCOUNTING_SCORE", 5),
-                company.get("BOARD_SCORE", 5),
-                company.get("OWNERSHIP_AND_CONTROL_SCORE", 5),
-                company.get("PAY_SCORE", 5)
-            ]
-
-            # Color palette
-            colors = [
-                'rgb(31, 119, 180)', 'rgb(255, 127, 14)', 'rgb(44, 160, 44)', 'rgb(214, 39, 40)',
-                'rgb(148, 103, 189)', 'rgb(140, 86, 75)', 'rgb(227, 119, 194)', 'rgb(127, 127, 127)',
-                'rgb(188, 189, 34)', 'rgb(23, 190, 207)'
-            ]
-            color = colors[i % len(colors)]
-
-            fig_comparison.add_trace(go.Bar(
-                y=esg_values,
-                x=category_names,
-                name=company_name,
-                text=esg_values,
-                textposition='outside',
-                textfont=dict(size=14),
-                marker_color=color
-            ))
-
-        fig_comparison.update_layout(
-            xaxis_title="Categories",
-            yaxis=dict(range=[0, 10.5], title="Score (out of 10)"),
-            template="plotly_white",
-            height=600,
-            barmode='group',
-            paper_bgcolor="#22222E",
-            plot_bgcolor="#22222E",
-            font=dict(color="white"),
-            margin=dict(l=0, r=0, t=50, b=100),
-            legend_title="Companies",
-            legend=dict(
-                orientation="h",
-                yanchor="bottom",
-                y=-0.3,
-                xanchor="center",
-                x=0.5
-            )
-        )
+            return
+        fig_comparison = comparison_figure(companies)
 
         st.plotly_chart(fig_comparison, use_container_width=True)
@@ -1,8 +1,13 @@
 import streamlit as st
-import plotly.graph_objects as go
-from datetime import datetime
+import resources
+from data import database
+from data.history import RATINGS, rating_notches
+from features import FEATURES, PILLAR_COLUMNS
+from figures import pillar_bars_figure
+from instrumentation import get_logger, timer
+from shared_state import NearestVectors
 
-from streamlit.runtime.state import session_state
+logger = get_logger("company_card")
 
 # CSS for card styling
 card_style = """
@@ -23,6 +28,8 @@ card_style = """
 # Inject the CSS style
 st.markdown(card_style, unsafe_allow_html=True)
 
+SLIDERS_COUNT = len(FEATURES)
+
 predictions_dict = {6: 'AAA', 5: 'AA', 4: 'A', 3: 'BBB', 2: 'BB', 1: 'B', 0: 'CCC'}
 
 # Mapping of alphabetical scores to numeric values for visualization
@@ -53,50 +60,54 @@ def update_model(company_row):
         1. Extracts the company name from the provided row.
         2. Retrieves input values from Streamlit session state using company-specific keys.
         3. Uses the stored model in session state to generate a prediction.
-        4. Converts the prediction into integer values.
-        5. Stores the prediction result in session state.
+        4. Reuses the prediction of the same scores from the shared result
+           store, or converts the top two classes into integer values.
+        5. Stores the prediction result and its confidences in session state.
         6. Marks the company analysis as updated.
-        7. Removes any previous analysis data from the session state.
 
     Returns:
         None
 
     Debugging:
-        - Prints input values for verification.
-        - Logs the model type and prediction output for debugging.
+        - Logs the input values and the prediction output at DEBUG level.
 
     Example:
         >>> update_model(company_row)
         # Updates session state with new predictions based on slider inputs.
     """
     company_name = company_row['Company_Name']
-    input_values = [
-        st.session_state[f"slide1_{company_name}"],
-        st.session_state[f"slide2_{company_name}"],
-        st.session_state[f"slide3_{company_name}"],
-        st.session_state[f"slide4_{company_name}"],
-        st.session_state[f"slide5_{company_name}"],
-        st.session_state[f"slide6_{company_name}"],
-        st.session_state[f"slide7_{company_name}"],
-        st.session_state[f"slide8_{company_name}"],
-        st.session_state[f"slide9_{company_name}"],
-        st.session_state[f"slide10_{company_name}"],
-        st.session_state[f"slide11_{company_name}"]
-    ]
-    # print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] DEBUG inputs: {input_values}")
-    model = st.session_state['model']
-    # print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] DEBUG: model type {type(model)}")
-    prediction = model.predict([input_values])
-    predictions_int = [int(prediction[0, 0]), int(prediction[0, 1])]
-    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] DEBUG: prediction {prediction}")
+    input_values = FEATURES.from_sliders(st.session_state, [company_name])[0]
+    predictions_int, confidences = cached_prediction(input_values)
+    logger.debug("Prediction for %s: %s (inputs %s)", company_name, predictions_int, input_values)
     st.session_state[f"prediction_{company_name}"] = predictions_int
+    st.session_state[f"confidence_{company_name}"] = confidences
 
     st.session_state[f"analysis_{company_name}"] = True
-    if f"analysis_data_{company_name}" in st.session_state:
-        st.session_state.pop(f"analysis_data_{company_name}", None)
+
+def cached_prediction(input_values):
+    """
+    Returns the two most probable ratings of a score vector, computed once for every session.
+    """
+    return resources.get_results().get_or_compute(
+        ("prediction", resources.get_model_checksum(), FEATURES.key(input_values)),
+        lambda: predict_top_2(input_values)
+    )
+
+def predict_top_2(input_values):
+    """
+    Predicts the two most probable ratings of a score vector.
+
+    Args:
+        input_values (array-like): The eleven scores, in `FEATURES` order.
+
+    Returns:
+        tuple: The two classes and their probabilities, as plain lists.
+    """
+    prediction = resources.get_model().predict_distribution([input_values])
+    return [int(c) for c in prediction["classes"][0, :2]], [float(p) for p in prediction["confidences"][0, :2]]
 
 @st.dialog("Analysis summary")
-def analysis(company, s1, s2, s3, s4, s5, s6, s7, s8, s9, s10, s11):
+def analysis(company, scores):
     """
     Displays and updates the AI-generated analysis for a given company.
 
@@ -107,15 +118,18 @@ def analysis(company, s1, s2, s3, s4, s5, s6, s7, s8, s9, s10, s11):
 
     Args:
         company (pd.Series): The company's data.
-        s1 - s11 (float): Updated scores for various performance metrics.
+        scores (list): The slider values of the eleven scores, in `FEATURES` order.
 
     Workflow:
         1. Retrieves the company name and session state keys for the analysis.
-        2. Checks if a previous analysis exists in the session state:
+        2. Checks if an analysis of the same scores, or of scores within
+           `ANALYSIS_REUSE_DISTANCE` predicting the same rating, exists in the
+           shared result store (written by any session):
             - If found, it displays the stored analysis.
             - If not found, updates the company’s scores and runs the AI analysis.
-        3. Shows a loading spinner while AI processes the analysis.
-        4. Saves the generated analysis in the session state.
+        3. Shows a loading spinner while AI processes the analysis; if the
+           LLM is too busy to start it in time, falls back to the published analysis.
+        4. Saves the generated analysis in the shared result store.
         5. Displays the analysis result.
         6. If no analysis is available, displays a default message.
         7. Provides a "Close" button to refresh the page.
@@ -124,41 +138,49 @@ def analysis(company, s1, s2, s3, s4, s5, s6, s7, s8, s9, s10, s11):
         None
 
     Example:
-        >>> analysis(company, 5.2, 7.8, 6.1, 4.3, 6.9, 5.0, 7.2, 8.5, 7.0, 6.8, 5.5)
+        >>> analysis(company, [5.2, 7.8, 6.1, 4.3, 6.9, 5.0, 7.2, 8.5, 7.0, 6.8, 5.5])
         # Displays or generates an analysis based on updated scores.
     """
     company_name = company['Company_Name']
     analysis_data_name = f"analysis_{company_name}"
-    analysis_data = f"analysis_data_{company_name}"
 
+    result = None
     if analysis_data_name in st.session_state:
-
-        if analysis_data in st.session_state:
-            st.write(
-                st.session_state[analysis_data]
-            )
-        else:
-            llama = st.session_state['llama']
+        llama = resources.get_analyzer()
+        results = resources.get_results()
+        scores = FEATURES.key(scores)
+        analysis_prefix = ("analysis", company_name, database.get_store().row_hash(company_name), llama.model_name)
+        result = results.get(analysis_prefix + (scores,))
+
+        if result is None:
+            # Scores nudged since an analysis was written reuse it, as long as they predict the same rating
+            neighbours = NearestVectors(results)
+            group = analysis_prefix + (cached_prediction(list(scores))[0][0],)
+            nearest = neighbours.nearest(group, scores)
+            while nearest is not None:
+                result = results.get(analysis_prefix + (nearest,))
+                if result is not None:
+                    break
+                # The analysis was evicted: stop offering its vector, try the next closest
+                neighbours.discard(group, nearest)
+                nearest = neighbours.nearest(group, scores)
+
+        if result is None:
             s_copy = company.copy(deep=True)
-            company['ENVIRONMENTAL_PILLAR_SCORE'] = s1
-            company['GOVERNANCE_PILLAR_SCORE'] = s2
-            company['SOCIAL_PILLAR_SCORE'] = s3
-            company['CLIMATE_CHANGE_THEME_SCORE'] = s4
-            company['BUSINESS_ETHICS_THEME_SCORE'] = s5
-            company['HUMAN_CAPITAL_THEME_SCORE'] = s6
-            company['HUMAN_CAPITAL_DEV_SCORE'] = s7
-            company['ACCOUNTING_SCORE'] = s8
-            company['BOARD_SCORE'] = s9
-            company['OWNERSHIP_AND_CONTROL_SCORE'] = s10
-            company['PAY_SCORE'] = s11
+            s_copy[FEATURES.columns] = scores
 
             with st.spinner("Our AI is writing the analysis..."):
                 result = llama.analyze(s_copy)
-                st.session_state[f"analysis_data_{company_name}"] = result
+            if result is None:
+                st.caption("Our AI is busy with other analyses; here is the published one.")
+            elif not result.startswith("Analysis failed"):
+                results.put(analysis_prefix + (scores,), result)
+                neighbours.add(group, scores)
 
-            st.write(
-                result
-            )
+    if result is not None:
+        st.write(
+            result
+        )
     else:
         st.write(
             company.get("IVA_RATING_ANALYSIS", "No analysis available.")
@@ -192,20 +214,11 @@ def reset_card(company):
         # Restores original company scores and clears previous analysis.
     """
     company_name = company['Company_Name']
-    st.session_state[f"slide1_{company_name}"] = company['ENVIRONMENTAL_PILLAR_SCORE']
-    st.session_state[f"slide2_{company_name}"] = company['GOVERNANCE_PILLAR_SCORE']
-    st.session_state[f"slide3_{company_name}"] = company['SOCIAL_PILLAR_SCORE']
-    st.session_state[f"slide4_{company_name}"] = company['CLIMATE_CHANGE_THEME_SCORE']
-    st.session_state[f"slide5_{company_name}"] = company['BUSINESS_ETHICS_THEME_SCORE']
-    st.session_state[f"slide6_{company_name}"] = company['HUMAN_CAPITAL_THEME_SCORE']
-    st.session_state[f"slide7_{company_name}"] = company['HUMAN_CAPITAL_DEV_SCORE']
-    st.session_state[f"slide8_{company_name}"] = company['ACCOUNTING_SCORE']
-    st.session_state[f"slide9_{company_name}"] = company['BOARD_SCORE']
-    st.session_state[f"slide10_{company_name}"] = company['OWNERSHIP_AND_CONTROL_SCORE']
-    st.session_state[f"slide11_{company_name}"] = company['PAY_SCORE']
+    FEATURES.set_sliders(st.session_state, company_name, company)
 
     st.session_state.pop(f"analysis_{company_name}", None)
     st.session_state.pop(f"prediction_{company_name}", None)
+    st.session_state.pop(f"confidence_{company_name}", None)
     st.session_state.pop(f"reset_{company_name}", None)
 
 
@@ -217,54 +230,205 @@ def map_score_to_numeric(score):
     """
     return score_mapping.get(score, 5)  # Default to 5 if score is missing or invalid
 
+def rating_delta(company):
+    """
+    Computes the change between the current and the previous rating of a company.
+
+    Args:
+        company (pd.Series): The company's data.
+
+    Returns:
+        tuple: The text to display next to the rating (arrow and delta) and its color.
+
+    Example:
+        >>> rating_delta(company)
+        ('\u25B2 1', 'green')
+    """
+    esg_value_numeric = map_score_to_numeric(company.get("IVA_COMPANY_RATING", "B"))
+    prev_rating_numeric = map_score_to_numeric(company.get("IVA_PREVIOUS_RATING", "B"))
+
+    delta = esg_value_numeric - prev_rating_numeric
+
+    if delta > 0:
+        delta_arrow = "\u25B2"  # Up arrow
+        delta_color = "green"
+        delta_text = f"{delta_arrow} {delta}"
+    elif delta < 0:
+        delta_arrow = "\u25BC"  # Down arrow
+        delta_color = "red"
+        delta_text = f"{delta_arrow} {delta}"
+    else:
+        delta_arrow = "\u003D"  # Equal sign
+        delta_color = ""
+        delta_text = f"{delta_arrow}"
+
+    return delta_text, delta_color
+
+def prediction_text(company):
+    """
+    Formats the prediction of a company with the confidence of both ratings.
+
+    The last prediction of the edited scores is shown if there is one, and
+    otherwise the baseline prediction stored in the dataset, if it was computed
+    by the served model.
+
+    Args:
+        company (pd.Series): The company's data.
+
+    Returns:
+        str or None: E.g. "BBB/A (62% / 21%)", or None if there is no prediction.
+    """
+    company_name = company['Company_Name']
+    prediction = st.session_state.get(f"prediction_{company_name}")
+    if prediction is not None:
+        ratings = [predictions_dict[prediction[0]], predictions_dict[prediction[1]]]
+        confidence = st.session_state.get(f"confidence_{company_name}")
+    else:
+        from baseline_predictions import baseline_prediction
+        baseline = baseline_prediction(company, resources.get_model_checksum())
+        if baseline is None:
+            return None
+        ratings, confidence = baseline
+
+    text = f"{ratings[0]}/{ratings[1]}"
+    if confidence is not None:
+        text += f" ({confidence[0]:.0%} / {confidence[1]:.0%})"
+    return text
+
+def company_summary_row(company, on_open=None, open_args=()):
+    """
+    Renders a collapsed, one-line summary of a company card.
+
+    Used for the companies that are not on the visible page: it shows the rating,
+    its delta, the industry and the last prediction (if any) without building the
+    chart and the sliders.
+
+    Args:
+        company (pd.Series): The company's data.
+        on_open (callable, optional): Callback invoked when the "Open" button is clicked.
+        open_args (tuple, optional): Arguments passed to `on_open`.
+
+    Returns:
+        None
+    """
+    company_name = company['Company_Name']
+    delta_text, delta_color = rating_delta(company)
+    summary = f"**{company_name}**: {company.get('IVA_COMPANY_RATING', 'B')}<sup style='color:{delta_color};'> ({delta_text})</sup> | {company['IVA_INDUSTRY']}"
+
+    prediction = prediction_text(company)
+    if prediction is not None:
+        summary += f" | Score Prediction: {prediction}"
+
+    text_col, button_col = st.columns([6, 1])
+    with text_col:
+        st.markdown(summary, unsafe_allow_html=True)
+    with button_col:
+        st.button("Open", key=f"open_button_{company_name}", on_click=on_open, args=open_args, use_container_width=True)
+
+def sensitivity_rows(input_values):
+    """
+    Summarizes, for each score, the nearest values that change the predicted rating.
+
+    All the single-score perturbations are predicted in one batch by
+    `ModelInterface.sensitivity`.
+
+    Args:
+        input_values (list): The eleven slider values, in `FEATURES` order.
+
+    Returns:
+        list: One dict per score with the score name, its current value and the
+        rating reached when raising it or lowering it past the nearest threshold.
+    """
+    result = resources.get_model().sensitivity(input_values)
+    rows = []
+    for feature, current, thresholds in zip(FEATURES.columns, input_values, result["thresholds"]):
+        above = [(value, new) for value, _, new in thresholds if value > current]
+        below = [(value, old) for value, old, _ in thresholds if value <= current]
+        rows.append({
+            "Score": feature.replace("_", " ").title(),
+            "Current": current,
+            "Raise to": f"{above[0][0]:.1f} \u2192 {predictions_dict[above[0][1]]}" if above else "",
+            "Lower below": f"{below[-1][0]:.1f} \u2192 {predictions_dict[below[-1][1]]}" if below else "",
+        })
+    return rows
+
+HISTORY_COLUMNS = ["IVA_COMPANY_RATING"] + PILLAR_COLUMNS
+PILLAR_COLORS = ['#2ca02c', '#1f77b4', '#ff7f0e']  # Environmental, Social, Governance
+
+def history_figure(company_name):
+    """
+    Builds the chart of a company's recorded pillar scores and rating over time.
+
+    Args:
+        company_name (str): The company.
+
+    Returns:
+        go.Figure or None: The chart, or None if no history is recorded for the company.
+    """
+    history = database.get_history().company_history(company_name, columns=HISTORY_COLUMNS)
+    if len(history) == 0:
+        return None
+
+    with timer("figure_build"):
+        import plotly.graph_objects as go  # deferred: not needed before the first card
+
+        fig = go.Figure()
+        for column, color in zip(PILLAR_COLUMNS, PILLAR_COLORS):
+            name = FEATURES.labels[FEATURES.columns.index(column)].replace(" Pillar Score", "")
+            fig.add_trace(go.Scatter(x=history["date"], y=history[column], name=name, mode="lines", line=dict(color=color)))
+        fig.add_trace(go.Scatter(
+            x=history["date"], y=rating_notches(history["IVA_COMPANY_RATING"]), name="Rating",
+            mode="lines", line=dict(color="white", shape="hv", dash="dot"), yaxis="y2"
+        ))
+
+        fig.update_layout(
+            yaxis=dict(title="Score (out of 10)", range=[0, 10.5]),
+            yaxis2=dict(overlaying="y", side="right", range=[-0.5, len(RATINGS) - 0.5],
+                        tickvals=list(range(len(RATINGS))), ticktext=RATINGS, showgrid=False),
+            legend=dict(orientation="h", y=1.1),
+            template="plotly_white",
+            height=300,
+            paper_bgcolor="#22222E",
+            plot_bgcolor="#22222E",
+            margin=dict(l=0, r=0, t=30, b=0),
+        )
+
+    return fig
+
 def company_card(company):
     """
     Generates a detailed card for the company using the data from the provided company dictionary.
     :param company: pd.Series with company data.
     """
     # Create a container for the card
-    with st.container():
+    with st.container(), timer("card_render"):
         company_name = company['Company_Name']
-        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] DEBUG: building container for company: {company_name}")
-        prediction = None
+        logger.debug("Building container for company: %s", company_name)
         prediction_key = f"prediction_{company_name}"
         reset_key = f"reset_{company_name}"
+        version_key = f"version_{company_name}"
+        company_version = database.get_store().company_version(company_name)
+
+        if version_key in st.session_state and st.session_state[version_key] != company_version:
+            # The company's row changed in the dataset: drop what was computed from the old one
+            logger.debug("Dataset row changed for %s", company_name)
+            reset_card(company)
+        st.session_state[version_key] = company_version
 
         if reset_key in st.session_state:
-            print(f"DEBUG: reset found for {company_name}")
+            logger.debug("Reset found for %s", company_name)
             reset_card(company)
             st.session_state.pop(reset_key, None)
 
-        elif prediction_key in st.session_state:
-            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] DEBUG: found prediction for {company_name}")
-            prediction = st.session_state[prediction_key]
-            prediction = [predictions_dict[prediction[0]], predictions_dict[prediction[1]]]
+        if prediction_key in st.session_state:
+            logger.debug("Found prediction for %s", company_name)
+        prediction = prediction_text(company)
 
 
         # Row 1: Company Name and Industry Info
         col1, col2 = st.columns([3, 2])  # Adjust the column widths as necessary
         esg_value_alpha = company.get("IVA_COMPANY_RATING", "B")
-        esg_value_numeric = map_score_to_numeric(esg_value_alpha)
-
-        prev_rating_alpha = company.get("IVA_PREVIOUS_RATING", "B")
-        prev_rating_numeric = map_score_to_numeric(prev_rating_alpha)
-
-        delta = esg_value_numeric - prev_rating_numeric
-        delta_arrow = ""
-        delta_text = ""
-
-        if delta > 0:
-            delta_arrow = "\u25B2"  # Up arrow
-            delta_color = "green"
-            delta_text = f"{delta_arrow} {delta}"
-        elif delta < 0:
-            delta_arrow = "\u25BC"  # Down arrow
-            delta_color = "red"
-            delta_text = f"{delta_arrow} {delta}"
-        else:
-            delta_arrow = "\u003D"  # Equal sign
-            delta_color = ""
-            delta_text = f"{delta_arrow}"
+        delta_text, delta_color = rating_delta(company)
 
         # Displaying ESG Rating with color
 
@@ -280,7 +444,7 @@ def company_card(company):
 
             with pred_score_col:
                 st.markdown(
-                    f"### Score Prediction: {prediction[0]}/{prediction[1]}",
+                    f"### Score Prediction: {prediction}",
                     unsafe_allow_html=True
                 )
 
@@ -290,41 +454,8 @@ def company_card(company):
         col1, col2, col3 = st.columns([3, 1, 1])
 
         with col1:
-            esg_values = [
-                company.get("ENVIRONMENTAL_PILLAR_SCORE", 5),
-                company.get("SOCIAL_PILLAR_SCORE", 5),
-                company.get("GOVERNANCE_PILLAR_SCORE", 5),
-            ]
-            categories = ['Environmental', 'Social', 'Governance']
-
-            fig_bars = go.Figure(data=[
-                go.Bar(
-                    y=esg_values,
-                    x=categories,
-                    orientation='v',
-                    marker_color=['#2ca02c', '#1f77b4', '#ff7f0e'],
-                    text=esg_values,
-                    textposition='outside',
-                    textfont=dict(size=18),  # Increase font size of the values inside the bars
-                )
-            ])
-
-            fig_bars.update_layout(
-                xaxis_title="Score (out of 10)",
-                yaxis=dict(range=[0, 10.5]),  # Extend Y-axis slightly for better spacing
-                xaxis=dict(
-                    title=dict(
-                        text="Pillar Categories",  # X-axis label
-                        font=dict(size=18)  # Font size for the X-axis label
-                    ),
-                    tickfont=dict(size=16),  # Increase font size for the X-axis tick labels
-                ),
-                template="plotly_white",
-                height=400,
-                paper_bgcolor="#22222E",
-                plot_bgcolor="#22222E",
-                margin=dict(l=0, r=0, t=0, b=0),  # Set the margins to zero for better layout
-            )
+            esg_values = [company.get(column, 5) for column in PILLAR_COLUMNS]
+            fig_bars = database.get_figure_cache().get_or_build(company_name, "pillar_bars", lambda: pillar_bars_figure(esg_values))
 
             st.plotly_chart(fig_bars, use_container_width=True, key=f"bars_{company['Company_Name']}")  # Unique key for each chart
         # Column 2: ESG Analysis Summary (Expandable below chart)
@@ -338,30 +469,37 @@ def company_card(company):
         """
 
         st.markdown(hide_sliders_limits, unsafe_allow_html=True)
-        with col2:
-            s1 = st.slider('Environmental Pillar Score', 0.0, 10.0, company['ENVIRONMENTAL_PILLAR_SCORE'], 0.1, key=f"slide1_{company_name}", on_change=update_model, args=(company,))
-            s2 = st.slider("Governance Pillar Score", 0.0, 10.0, company['GOVERNANCE_PILLAR_SCORE'], 0.1, key=f"slide2_{company_name}", on_change=update_model, args=(company,))
-            s3 = st.slider("Social Pillar Score", 0.0, 10.0, company['SOCIAL_PILLAR_SCORE'], 0.1, key=f"slide3_{company_name}", on_change=update_model, args=(company,))
-            s4 = st.slider("Climate Change Theme Score", 0.0, 10.0, company['CLIMATE_CHANGE_THEME_SCORE'], 0.1, key=f"slide4_{company_name}", on_change=update_model, args=(company,))
-            s5 = st.slider("Business Ethics Theme Score", 0.0, 10.0, company['BUSINESS_ETHICS_THEME_SCORE'], 0.1, key=f"slide5_{company_name}", on_change=update_model, args=(company,))
-            s6 = st.slider("Human Capital Theme Score", 0.0, 10.0, company['HUMAN_CAPITAL_THEME_SCORE'], 0.1, key=f"slide6_{company_name}", on_change=update_model, args=(company,))
+        # Six sliders in the first column, five in the second, in `FEATURES` order
+        slider_keys = FEATURES.slider_keys(company_name)
+        input_values = []
+        for column, indices in ((col2, range(0, 6)), (col3, range(6, SLIDERS_COUNT))):
+            with column:
+                for i in indices:
+                    input_values.append(st.slider(FEATURES.labels[i], 0.0, 10.0, company[FEATURES.columns[i]], 0.1, key=slider_keys[i], on_change=update_model, args=(company,)))
 
         with col3:
-            s7 = st.slider("Human Capital Dev Score", 0.0, 10.0, company['HUMAN_CAPITAL_DEV_SCORE'], 0.1, key=f"slide7_{company_name}", on_change=update_model, args=(company,))
-            s8 = st.slider("Accounting Score", 0.0, 10.0, company['ACCOUNTING_SCORE'], 0.1, key=f"slide8_{company_name}", on_change=update_model, args=(company,))
-            s9 = st.slider("Board Score", 0.0, 10.0, company['BOARD_SCORE'], 0.1, key=f"slide9_{company_name}", on_change=update_model, args=(company,))
-            s10 = st.slider("Ownership and Control Score", 0.0, 10.0, company['OWNERSHIP_AND_CONTROL_SCORE'], 0.1, key=f"slide10_{company_name}", on_change=update_model, args=(company,))
-            s11 = st.slider("Pay Score", 0.0, 10.0, company['PAY_SCORE'], 0.1, key=f"slide11_{company_name}", on_change=update_model, args=(company,))
             btn1, btn2 = st.columns(2)
             with btn1:
                 if st.button("Read analysis", type="primary", key=f"analysis_button_{company_name}", use_container_width=True):
-                    analysis(company, s1, s2, s3, s4, s5, s6, s7, s8, s9, s10, s11)
+                    analysis(company, input_values)
 
             with btn2:
                 if st.button("Reset", type="secondary", key=f"reset_button_{company_name}", use_container_width=True):
                     st.session_state[f"reset_{company_name}"] = True
                     st.rerun()
 
+        if st.toggle("Show what moves the rating", key=f"sensitivity_{company_name}"):
+            # The thresholds depend on the model: a new model version must not reuse them
+            sensitivity_key = ("sensitivity", resources.get_model_checksum(), FEATURES.key(input_values))
+            rows = database.get_figure_cache().get_or_build(company_name, sensitivity_key, lambda: sensitivity_rows(input_values))
+            st.dataframe(rows, hide_index=True, use_container_width=True)
+
+        history_key = ("history", database.get_history().version)
+        fig_history = database.get_figure_cache().get_or_build(company_name, history_key, lambda: history_figure(company_name))
+        if fig_history is not None:
+            with st.expander("Score history"):
+                st.plotly_chart(fig_history, use_container_width=True, key=f"history_{company_name}")
+
         st.divider()
 
         st.markdown('</div>', unsafe_allow_html=True)
@@ -0,0 +1,333 @@
+"""
+Report pack of selected companies: CSV, HTML and PDF.
+
+Gathers the scores, the predicted ratings and the analyses of a list of
+companies and writes them as a CSV table, an HTML page with the comparison
+chart and each company's pillar chart, and a PDF with one page per company:
+
+    python -m company_report --companies "Pinnacle Soft Systems" "Pro Pulse Inc"
+    python -m company_report --file names.txt --output data/reports/pack --format csv html
+
+The app builds the same pack for the companies selected in the search bar.
+
+Predicted ratings come from the baseline columns when they were computed by
+the served model, and otherwise from one batched model call. Analyses come
+from the shared result store (those already read in the app) and fall back
+to `IVA_RATING_ANALYSIS`. Figures are rendered on a thread pool from cached
+figures or from a copy of one template spec.
+"""
+import argparse
+import html
+import io
+import os
+import textwrap
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+import config
+from baseline_predictions import BASELINE_MODEL, BASELINE_PROBABILITIES, BASELINE_RATINGS
+from data.history import RATINGS
+from features import FEATURES, PILLAR_COLUMNS
+from figures import comparison_figure, pillar_bars_spec
+from instrumentation import get_logger, increment, timer
+
+logger = get_logger("company_report")
+
+REPORT_FORMATS = ("csv", "html", "pdf")
+INFO_COLUMNS = ["Company_Name", "IVA_INDUSTRY", "GICS_SUB_IND", "IVA_COMPANY_RATING", "IVA_PREVIOUS_RATING"]
+PREDICTION_COLUMNS = ["PREDICTED_RATING", "PREDICTED_PROBABILITY", "SECOND_RATING", "SECOND_PROBABILITY"]
+# Above this, the grouped comparison chart is unreadable and shows the first companies only
+COMPARISON_MAX_COMPANIES = 10
+
+def read_names(path):
+    """
+    Reads company names from a text file, one per line; blank lines and `#` comments are skipped.
+    """
+    with open(path, encoding="utf-8") as file:
+        return [line.strip() for line in file if line.strip() and not line.lstrip().startswith("#")]
+
+def report_frame(store, model, checksum, names, results=None, llm_model_name=config.LLM_MODEL_NAME):
+    """
+    Builds the table of the report.
+
+    Args:
+        store (CompanyStore or SqliteCompanyStore): The dataset.
+        model (ModelInterface): The served model, used for rows without a valid baseline.
+        checksum (str): The served model's checksum.
+        names (list): The companies, in report order; unknown names are skipped.
+        results (ResultStore, optional): Where the analyses read in the app are stored.
+        llm_model_name (str, optional): The LLM the stored analyses were written by.
+
+    Returns:
+        pd.DataFrame: One row per company: its information, its eleven scores,
+        the two predicted ratings with their probabilities and the analysis.
+    """
+    rows = store.lookup(names)
+    rows = rows.reindex([name for name in dict.fromkeys(names) if name in rows.index])
+    frame = rows[[c for c in INFO_COLUMNS if c in rows.columns] + FEATURES.columns].copy()
+
+    if BASELINE_MODEL in rows.columns:
+        valid = (rows[BASELINE_MODEL] == checksum).to_numpy()
+    else:
+        valid = pd.Series(False, index=rows.index).to_numpy()
+    for column in PREDICTION_COLUMNS:
+        frame[column] = None
+    if valid.any():
+        frame.loc[valid, PREDICTION_COLUMNS] = rows.loc[valid, [BASELINE_RATINGS[0], BASELINE_PROBABILITIES[0],
+                                                                 BASELINE_RATINGS[1], BASELINE_PROBABILITIES[1]]].to_numpy()
+    if (~valid).any():
+        classes, probabilities = model.top_k(FEATURES.from_frame(rows.loc[~valid]), 2)
+        frame.loc[~valid, "PREDICTED_RATING"] = [RATINGS[c] for c in classes[:, 0]]
+        frame.loc[~valid, "PREDICTED_PROBABILITY"] = probabilities[:, 0]
+        frame.loc[~valid, "SECOND_RATING"] = [RATINGS[c] for c in classes[:, 1]]
+        frame.loc[~valid, "SECOND_PROBABILITY"] = probabilities[:, 1]
+
+    analyses, sources = [], []
+    scores = FEATURES.from_frame(rows)
+    for (name, row), row_scores in zip(rows.iterrows(), scores):
+        text = None
+        if results is not None:
+            # Same key as the card's "Read analysis" dialog for the published scores
+            key = ("analysis", name, store.row_hash(name), llm_model_name, FEATURES.key(row_scores))
+            text = results.get(key)
+        analyses.append(text if text is not None else row.get("IVA_RATING_ANALYSIS", ""))
+        sources.append("llm" if text is not None else "dataset")
+    frame["ANALYSIS"] = analyses
+    frame["ANALYSIS_SOURCE"] = sources
+    return frame.reset_index(drop=True)
+
+def _figure_div(spec, div_id):
+    import plotly.io as pio
+    return pio.to_html(spec, full_html=False, include_plotlyjs=False, validate=False, div_id=div_id)
+
+def _pillar_specs(frame, figure_cache):
+    specs = []
+    for row in frame.itertuples(index=False):
+        cached = figure_cache.get(row.Company_Name, "pillar_bars") if figure_cache is not None else None
+        if cached is not None:
+            increment("report_cached_figures")
+            specs.append(cached.to_plotly_json())
+        else:
+            specs.append(pillar_bars_spec([getattr(row, column) for column in PILLAR_COLUMNS]))
+    return specs
+
+def _text(value):
+    return html.escape("" if value is None or (isinstance(value, float) and pd.isna(value)) else str(value))
+
+def render_html(frame, figure_cache=None, pool=None):
+    """
+    Renders the report as a self-contained HTML page (plotly.js is embedded once).
+
+    The figures are rendered on `pool` (an executor) when given, in this thread otherwise.
+    """
+    import plotly.offline
+
+    specs = _pillar_specs(frame, figure_cache)
+    comparison = comparison_figure(frame.head(COMPARISON_MAX_COMPANIES).to_dict("records"))
+    divs = list((pool.map if pool is not None else map)(_figure_div, specs, [f"pillars-{i}" for i in range(len(specs))]))
+    comparison_div = _figure_div(comparison.to_plotly_json(), "comparison")
+
+    table = frame.drop(columns=["ANALYSIS", "ANALYSIS_SOURCE"]).to_html(index=False, float_format=lambda x: f"{x:.2f}", border=0)
+    sections = []
+    for row, div in zip(frame.itertuples(index=False), divs):
+        sections.append(f"""
+<section>
+  <h2>{_text(row.Company_Name)}: {_text(row.IVA_COMPANY_RATING)}</h2>
+  <p><b>Industry:</b> {_text(row.IVA_INDUSTRY)} | <b>Score prediction:</b> {_text(row.PREDICTED_RATING)}/{_text(row.SECOND_RATING)}
+     ({row.PREDICTED_PROBABILITY:.0%} / {row.SECOND_PROBABILITY:.0%})</p>
+  {div}
+  <p class="analysis">{_text(row.ANALYSIS).replace(chr(10), "<br>")}</p>
+</section>""")
+    note = f"<p>First {COMPARISON_MAX_COMPANIES} companies.</p>" if len(frame) > COMPARISON_MAX_COMPANIES else ""
+    return f"""<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>ClarificatION report</title>
+<script type="text/javascript">{plotly.offline.get_plotlyjs()}</script>
+<style>
+  body {{ background-color: #22222E; color: white; font-family: sans-serif; margin: 2em; }}
+  table {{ border-collapse: collapse; font-size: 12px; }}
+  th, td {{ padding: 4px 8px; border-bottom: 1px solid #444; }}
+  section {{ border-top: 1px solid #444; margin-top: 2em; }}
+  .analysis {{ max-width: 60em; }}
+</style>
+</head>
+<body>
+<h1>ClarificatION report: {len(frame)} companies</h1>
+<p>Generated on {time.strftime("%Y-%m-%d %H:%M:%S")}.</p>
+{table}
+<h2>Comparison</h2>
+{note}
+{comparison_div}
+{"".join(sections)}
+</body>
+</html>
+"""
+
+# PDF pages: A4 in points, drawn with the standard Helvetica font (no font embedding, no extra dependency)
+PAGE_SIZE = (595, 842)
+MARGIN = 50
+SCORE_LABELS = [label.replace(" Score", "") for label in FEATURES.labels]
+BAR_COLORS = [(0.17, 0.63, 0.17), (1.0, 0.5, 0.05), (0.12, 0.47, 0.71)] + [(0.5, 0.5, 0.5)] * (len(FEATURES.columns) - 3)
+
+def _pdf_string(text):
+    text = str(text).encode("cp1252", "replace")
+    return b"(" + text.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+def _pdf_text(x, y, text, size=10):
+    return b"BT /F1 %d Tf %.1f %.1f Td " % (size, x, PAGE_SIZE[1] - y) + _pdf_string(text) + b" Tj ET\n"
+
+def _wrap(text, size, width):
+    # Helvetica averages about half its size per character
+    per_line = max(1, int(width / (size * 0.5)))
+    lines = []
+    for paragraph in text.splitlines() or [""]:
+        lines.extend(textwrap.wrap(paragraph, per_line) or [""])
+    return lines
+
+def _pdf_page(row):
+    """
+    Draws one company's page: ratings, the eleven scores as bars and the analysis.
+
+    Returns:
+        bytes: The page's content stream.
+    """
+    parts = [
+        _pdf_text(MARGIN, MARGIN, f"{row['Company_Name']}: {row['IVA_COMPANY_RATING']}", 18),
+        _pdf_text(MARGIN, MARGIN + 25, f"Industry: {row.get('IVA_INDUSTRY', '')}"),
+        _pdf_text(MARGIN, MARGIN + 40, f"Score prediction: {row['PREDICTED_RATING']}/{row['SECOND_RATING']} "
+                  f"({row['PREDICTED_PROBABILITY']:.0%} / {row['SECOND_PROBABILITY']:.0%})"),
+    ]
+    top, bar_left = MARGIN + 70, MARGIN + 150
+    bar_width = PAGE_SIZE[0] - bar_left - MARGIN - 30
+    for i, (label, column, color) in enumerate(zip(SCORE_LABELS, FEATURES.columns, BAR_COLORS)):
+        y = top + i * 20
+        value = float(row[column])
+        parts.append(_pdf_text(MARGIN, y + 10, label))
+        parts.append(b"%.2f %.2f %.2f rg %.1f %.1f %.1f 12 re f 0 g\n" % (*color, bar_left, PAGE_SIZE[1] - y - 12, bar_width * value / 10))
+        parts.append(_pdf_text(bar_left + bar_width * value / 10 + 4, y + 10, f"{value:.1f}"))
+
+    y = top + len(FEATURES.columns) * 20 + 30
+    for line in _wrap(str(row.get("ANALYSIS") or ""), 10, PAGE_SIZE[0] - 2 * MARGIN):
+        if y > PAGE_SIZE[1] - MARGIN:
+            break
+        parts.append(_pdf_text(MARGIN, y, line))
+        y += 14
+    return b"".join(parts)
+
+def render_pdf(frame, pool):
+    """
+    Renders the report as a PDF with one page per company, drawn on the pool.
+    """
+    streams = list(pool.map(_pdf_page, frame.to_dict("records")))
+    # Objects: 1 catalog, 2 page tree, 3 font, then a page and its content stream per company
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>"]
+    pages = []
+    for stream in streams:
+        page_id = len(objects) + 1
+        pages.append(b"%d 0 R" % page_id)
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>"
+                       % (*PAGE_SIZE, page_id + 1))
+        compressed = zlib.compress(stream)
+        objects.append(b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(compressed) + compressed + b"\nendstream")
+    objects[1] = b"<< /Type /Pages /Kids [" + b" ".join(pages) + b"] /Count %d >>" % len(pages)
+
+    output = io.BytesIO()
+    output.write(b"%PDF-1.4\n")
+    offsets = []
+    for i, content in enumerate(objects, start=1):
+        offsets.append(output.tell())
+        output.write(b"%d 0 obj\n" % i + content + b"\nendobj\n")
+    xref = output.tell()
+    output.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    output.write(b"".join(b"%010d 00000 n \n" % offset for offset in offsets))
+    output.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return output.getvalue()
+
+
+def build_company_report(frame, formats=REPORT_FORMATS, figure_cache=None, workers=None):
+    """
+    Renders a report table in the requested formats.
+
+    Args:
+        frame (pd.DataFrame): The output of `report_frame`.
+        formats (iterable, optional): Any of "csv", "html" and "pdf".
+        figure_cache (CompanyCache, optional): Figures already built by the app, reused as they are.
+        workers (int, optional): Threads rendering the figures and the pages.
+
+    Returns:
+        dict: The content of each format, as bytes.
+    """
+    unknown = set(formats) - set(REPORT_FORMATS)
+    if unknown:
+        raise ValueError(f"Unsupported report formats: {', '.join(sorted(unknown))}")
+    output = {}
+    with timer("company_report"), ThreadPoolExecutor(max_workers=workers or min(8, (os.cpu_count() or 1) + 4)) as pool:
+        if "csv" in formats:
+            output["csv"] = frame.to_csv(index=False).encode("utf-8")
+        if "html" in formats:
+            output["html"] = render_html(frame, figure_cache, pool).encode("utf-8")
+        if "pdf" in formats:
+            output["pdf"] = render_pdf(frame, pool)
+    increment("report_companies", len(frame))
+    return output
+
+def render_export(card_data):
+    """
+    Renders the export of the selected companies in the app: a build button, then downloads.
+    """
+    import streamlit as st
+    import resources
+    from data import database
+
+    with st.expander("Export report", expanded=False):
+        formats = st.multiselect("Formats", REPORT_FORMATS, default=["csv", "html"], key="report_formats")
+        if st.button("Build report", key="report_build"):
+            names = [company["Company_Name"] for company in card_data]
+            with st.spinner("Building the report..."):
+                frame = report_frame(database.get_store(), resources.get_model(), resources.get_model_checksum(),
+                                     names, resources.get_results())
+                st.session_state["report_files"] = build_company_report(frame, formats, database.get_figure_cache())
+        for extension, content in st.session_state.get("report_files", {}).items():
+            st.download_button(f"Download {extension.upper()}", content, file_name=f"clarification_report.{extension}", key=f"report_download_{extension}")
+
+def main():
+    from data.database import get_store
+    from model_registry import ModelRegistry, load_served_model
+    from shared_state import ResultStore
+
+    parser = argparse.ArgumentParser(description="Write a CSV/HTML/PDF report of selected companies.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--companies", nargs="+", help="Company names.")
+    source.add_argument("--file", help="Text file with one company name per line.")
+    source.add_argument("--industry", help="Every company of an industry.")
+    parser.add_argument("--output", default="data/reports/pack", help="Directory to write report.<format> into.")
+    parser.add_argument("--format", nargs="+", choices=REPORT_FORMATS, default=list(REPORT_FORMATS), help="Formats to write.")
+    parser.add_argument("--workers", type=int, help="Threads rendering figures and pages.")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    store = get_store()
+    if args.industry:
+        names = store.filter(industry=args.industry)["Company_Name"].tolist()
+    else:
+        names = args.companies or read_names(args.file)
+    model = load_served_model(ModelRegistry(config.MODEL_REGISTRY_PATH), config.MODEL_PATH, config.MODEL_VERSION)
+    # Analyses read in the app are only reachable from here through the multi-worker shared cache
+    results = ResultStore(spill_path=config.SHARED_CACHE_PATH, write_through=True) if config.SHARED_CACHE_PATH else None
+
+    frame = report_frame(store, model, model.metadata["checksum"], names, results)
+    files = build_company_report(frame, args.format, workers=args.workers)
+    os.makedirs(args.output, exist_ok=True)
+    for extension, content in files.items():
+        with open(os.path.join(args.output, f"report.{extension}"), "wb") as file:
+            file.write(content)
+    print(f"Report of {len(frame)} companies written to {args.output} ({', '.join(files)}) in {time.perf_counter() - start:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import os
+
+# Dataset served by the app: df_demo.csv or any .csv/.parquet/.feather file
+# written by `python -m data.generator`
+DATASET_PATH = os.environ.get("CLARIFICATION_DATASET", "data/df_demo.csv")
+
+# Storage backend: "memory" keeps the dataset in a pandas frame per process,
+# "sqlite" answers lookups with indexed queries on a file built from the dataset
+DATASET_BACKEND = os.environ.get("CLARIFICATION_BACKEND", "memory")
+SQLITE_PATH = os.environ.get("CLARIFICATION_SQLITE_PATH", os.path.splitext(DATASET_PATH)[0] + ".sqlite")
+
+# Directory of the append-only score history written by `python -m data.history`
+HISTORY_PATH = os.environ.get("CLARIFICATION_HISTORY", "data/history")
+
+# Output of `python -m discrepancy_report`, paged through by the Discrepancies page
+DISCREPANCY_REPORT_PATH = os.environ.get("CLARIFICATION_DISCREPANCY_REPORT", "data/reports/discrepancies.parquet")
+
+MODEL_PATH = os.environ.get("CLARIFICATION_MODEL", "ml-model/model.pkl")
+
+# Versioned model bundles (`python -m model_registry`). When the registry holds
+# bundles the app serves MODEL_VERSION (the latest by default) instead of
+# MODEL_PATH, and runs SHADOW_MODEL_VERSION alongside it if set
+MODEL_REGISTRY_PATH = os.environ.get("CLARIFICATION_MODEL_REGISTRY", "ml-model/registry")
+MODEL_VERSION = os.environ.get("CLARIFICATION_MODEL_VERSION") or None
+SHADOW_MODEL_VERSION = os.environ.get("CLARIFICATION_SHADOW_MODEL_VERSION") or None
+LLM_API_URL = os.environ.get("CLARIFICATION_LLM_URL", "http://localhost:11434/api/chat")
+LLM_MODEL_NAME = os.environ.get("CLARIFICATION_LLM_MODEL", "qwen2.5:0.5b")
+
+# Analyses sent to the LLM at the same time by this process; the others wait,
+# interactive ones first, and give up (showing the published analysis) after
+# LLM_WAIT_SECONDS or when LLM_MAX_QUEUED are already waiting
+LLM_MAX_CONCURRENT = int(os.environ.get("CLARIFICATION_LLM_MAX_CONCURRENT", "2"))
+LLM_WAIT_SECONDS = float(os.environ.get("CLARIFICATION_LLM_WAIT_SECONDS", "20"))
+LLM_MAX_QUEUED = int(os.environ.get("CLARIFICATION_LLM_MAX_QUEUED", "32"))
+
+# The model and the LLM client are built on first use; set to 1 to build them
+# right after the first paint instead, trading a slower first rerun for a
+# faster first interaction
+EAGER_START = os.environ.get("CLARIFICATION_EAGER_START", "0") == "1"
+
+# Profiling mode: every rerun is profiled (also with `?profile=1` in the URL)
+# and its profile written to PROFILE_DIR, which keeps the newest PROFILE_KEEP
+PROFILE_ENABLED = os.environ.get("CLARIFICATION_PROFILE", "0") == "1"
+PROFILE_DIR = os.environ.get("CLARIFICATION_PROFILE_DIR", "data/profiles")
+PROFILE_KEEP = int(os.environ.get("CLARIFICATION_PROFILE_KEEP", "50"))
+
+# Seconds between two checks of the dataset file for changes; 0 disables the watcher
+DATASET_REFRESH_SECONDS = float(os.environ.get("CLARIFICATION_REFRESH_SECONDS", "5"))
+
+# Results shared by every session (analyses, predictions of a score vector):
+# memory budget, and an optional SQLite file receiving what does not fit
+STATE_MAX_MB = float(os.environ.get("CLARIFICATION_STATE_MAX_MB", "64"))
+STATE_SPILL_PATH = os.environ.get("CLARIFICATION_STATE_SPILL") or None
+
+# An analysis is reused for scores within this (Euclidean) distance of scores
+# already analysed for the same company and predicted rating; 0 only reuses
+# the analysis of identical scores
+ANALYSIS_REUSE_DISTANCE = float(os.environ.get("CLARIFICATION_ANALYSIS_REUSE_DISTANCE", "0.5"))
+
+# Multi-worker mode (`python -m workers`): several app processes behind a load
+# balancer share predictions, figures and analyses through this SQLite file
+SHARED_CACHE_PATH = os.environ.get("CLARIFICATION_SHARED_CACHE") or None
+
+# Concurrent prediction calls (all sessions, or all service requests) are
+# stacked into one model call, up to PREDICT_BATCH_ROWS rows. By default a
+# batch is whatever queued up while the previous one ran; PREDICT_BATCH_MS
+# makes the first call of a batch wait that long for others
+PREDICT_BATCH_MS = float(os.environ.get("CLARIFICATION_PREDICT_BATCH_MS", "0"))
+PREDICT_BATCH_ROWS = int(os.environ.get("CLARIFICATION_PREDICT_BATCH_ROWS", "4096"))
+
+# Headless REST service (`python -m service`): port, threads running the
+# LLM calls, requests in progress before new ones get a 503, and companies
+# returned per page of /companies (the default and largest `limit`)
+SERVICE_PORT = int(os.environ.get("CLARIFICATION_SERVICE_PORT", "8600"))
+SERVICE_WORKERS = int(os.environ.get("CLARIFICATION_SERVICE_WORKERS", "4"))
+SERVICE_MAX_PENDING = int(os.environ.get("CLARIFICATION_SERVICE_MAX_PENDING", "256"))
+SERVICE_MAX_COMPANIES = int(os.environ.get("CLARIFICATION_SERVICE_MAX_COMPANIES", "1000"))
@@ -1,12 +1,188 @@
+import os
 import streamlit as st
 import pandas as pd
 from typing import List
+import config
+from data.history import HistoryStore
+from data.sqlite_backend import open_store
+from data.store import CompanyCache, CompanyStore, DatasetWatcher
+from instrumentation import get_logger, timed, timer
+
+logger = get_logger("database")
+
+CHUNK_ROWS = 100_000
+
+def read_dataset(path):
+    """
+    Reads a company dataset, choosing the reader from the file extension.
+
+    Args:
+        path (str): Path to a .csv, .parquet or .feather file.
+
+    Returns:
+        pd.DataFrame: The dataset.
+
+    Raises:
+        ValueError: If the extension is not supported.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        return pd.read_csv(path)
+    if extension == ".parquet":
+        return pd.read_parquet(path)
+    if extension == ".feather":
+        return pd.read_feather(path)
+    raise ValueError(f"Unsupported dataset format: {path}")
+
+def iter_dataset(path, columns=None, chunk_rows=CHUNK_ROWS):
+    """
+    Reads a company dataset chunk by chunk, so memory does not grow with the file.
+
+    CSV files are read with pandas' `chunksize`, Parquet files row group by row
+    group and Feather files record batch by record batch.
+
+    Args:
+        path (str): Path to a .csv, .parquet or .feather file.
+        columns (list, optional): Columns to read; all by default.
+        chunk_rows (int, optional): Maximum number of rows per chunk.
+
+    Yields:
+        pd.DataFrame: The next chunk of rows.
+
+    Raises:
+        ValueError: If the extension is not supported.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        yield from pd.read_csv(path, usecols=columns, chunksize=chunk_rows)
+        return
+    if extension == ".parquet":
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows, columns=columns):
+            yield batch.to_pandas()
+        return
+    if extension == ".feather":
+        import pyarrow as pa
+        with pa.memory_map(path) as source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                batch = reader.get_batch(i)
+                if columns is not None:
+                    batch = batch.select(columns)
+                for start in range(0, batch.num_rows, chunk_rows):
+                    yield batch.slice(start, chunk_rows).to_pandas()
+        return
+    raise ValueError(f"Unsupported dataset format: {path}")
+
+@st.cache_resource
+def get_store(path=config.DATASET_PATH):
+    """
+    Returns the process-wide company store, loading the dataset on first use.
+
+    With `CLARIFICATION_BACKEND=sqlite` the store is an `SqliteCompanyStore`
+    answering every call with indexed queries; otherwise it is an in-memory
+    `CompanyStore`. Both expose the same interface.
+
+    Unless `CLARIFICATION_REFRESH_SECONDS` is 0, a watcher thread polls the
+    dataset file and applies row-level changes to the store, so new ratings are
+    picked up without restarting the process or re-parsing on every rerun.
+
+    Args:
+        path (str, optional): The dataset file.
+
+    Returns:
+        CompanyStore or SqliteCompanyStore: The store.
+    """
+    with timer("dataset_load"):
+        if config.DATASET_BACKEND == "sqlite":
+            store = open_store(config.SQLITE_PATH, path, read_dataset)
+        else:
+            store = CompanyStore(read_dataset(path))
+    logger.debug("Dataset loaded from %s (%s backend)", path, config.DATASET_BACKEND)
+    if config.DATASET_REFRESH_SECONDS > 0:
+        DatasetWatcher(store, path, read_dataset, config.DATASET_REFRESH_SECONDS).start()
+    return store
+
+@st.cache_resource
+def get_figure_cache():
+    """
+    Returns the process-wide cache of per-company figures.
+
+    Entries are keyed on the company's row version and dropped when the row
+    changes. In multi-worker mode they are also shared with the other workers.
+    """
+    if config.SHARED_CACHE_PATH:
+        import resources
+        return CompanyCache(get_store(), shared=resources.get_results())
+    return CompanyCache(get_store())
+
+@st.cache_resource
+def get_history():
+    """
+    Returns the process-wide score history store (empty until snapshots are recorded).
+    """
+    return HistoryStore(config.HISTORY_PATH)
 
-@st.cache_data
 def companies_data():
-    return pd.read_csv("data/df_demo.csv")
+    """
+    Returns the whole dataset. With the SQLite backend this materializes every
+    row, so prefer `get_card_data` and `filter_companies`.
+    """
+    return get_store().frame
+
+def filter_companies(industry=None, rating=None, limit=None, offset=0):
+    """
+    Returns the companies of an industry and/or with a given rating.
+
+    Args:
+        industry (str, optional): Value of `IVA_INDUSTRY` to match.
+        rating (str, optional): Value of `IVA_COMPANY_RATING` to match.
+        limit (int, optional): Maximum number of rows to return.
+        offset (int, optional): Number of matching rows to skip.
+
+    Returns:
+        pd.DataFrame: The matching rows, in dataset order.
+    """
+    return get_store().filter(industry=industry, rating=rating, limit=limit, offset=offset)
+
+def dataset_version():
+    return get_store().version
+
+@st.cache_data(max_entries=2)
+def _companies_names(version) -> List[str]:
+    return get_store().sorted_names()
 
-@st.cache_data
 def get_companies_names() -> List[str]:
-    print(companies_data().columns)
-    return sorted(companies_data()["Company_Name"].tolist())
+    return _companies_names(dataset_version())
+
+@timed("get_card_data")
+def get_card_data(selected_companies):
+    """
+    Retrieves data for the specified companies from the database.
+
+    This function filters the company dataset and returns the rows
+    corresponding to the selected companies.
+
+    Args:
+        selected_companies (list): A list of company names to retrieve data for.
+
+    Returns:
+        list: A list of rows (as pandas Series) representing the data of the selected companies.
+
+    Example:
+        >>> selected = ["Company A", "Company B"]
+        >>> data = database.get_card_data(selected)
+        >>> print(data)  # List of matching rows
+
+    Notes:
+        - The function looks the companies up through the `Company_Name` index
+          of the store, so its cost does not grow with the dataset size.
+        - Rows are returned in dataset order.
+    """
+    result = []
+    if selected_companies == None or len(selected_companies) == 0:
+        return result
+
+    for _, row in get_store().lookup(selected_companies).iterrows():
+        result.append(row)
+    return result
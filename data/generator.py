@@ -0,0 +1,212 @@
+"""
+Synthetic dataset generator for scale testing.
+
+Learns per-column distributions from `df_demo.csv` and writes datasets of
+arbitrary size with the same schema, chunk by chunk so memory stays flat:
+
+    python -m data.generator --rows 1000000 --output data/universe_1m.parquet
+    python -m data.generator --rows 10000 --output data/universe_10k.csv
+
+Point the app at the result with `CLARIFICATION_DATASET=<path>`.
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from features import FEATURES
+
+SOURCE_PATH = "data/df_demo.csv"
+CHUNK_ROWS = 250_000
+SUPPORTED_FORMATS = (".csv", ".parquet", ".feather")
+
+# Sentence boundary without a separating space is common in the source analyses
+SENTENCE_SPLIT = r'(?<=[.!?])\s*(?=[A-Z])'
+
+class DatasetProfile:
+    """
+    Per-column distributions learned from a source dataset.
+
+    Attributes:
+        columns (list): Column order of the source dataset.
+        ratings (np.ndarray): The (rating, previous rating, trend) combinations.
+        ratings_p (np.ndarray): Their empirical probabilities.
+        score_models (dict): Rating -> (mean, covariance) of the score columns.
+        tax_values (np.ndarray): Empirical values of `TAX_TRANSP_PCTL_GLOBAL`.
+        industries (np.ndarray): The (industry, sub-industry) pairs.
+        industries_p (np.ndarray): Their empirical probabilities.
+        name_parts (list): Vocabularies for the three words of a company name.
+        sentences (np.ndarray): Pool of analysis sentences.
+        analysis_lengths (np.ndarray): Empirical lengths of the analysis texts.
+    """
+    def __init__(self, source):
+        """
+        Learns the distributions from a dataset.
+
+        Args:
+            source (pd.DataFrame): The dataset to learn from (e.g. `df_demo.csv`).
+        """
+        source = source.drop(columns=[c for c in source.columns if c.startswith("Unnamed")])
+        self.columns = source.columns.tolist()
+
+        combos = source.groupby(['IVA_COMPANY_RATING', 'IVA_PREVIOUS_RATING', 'IVA_RATING_TREND']).size()
+        self.ratings = np.array(combos.index.tolist(), dtype=object)
+        self.ratings_p = (combos / combos.sum()).to_numpy()
+
+        self.score_models = {}
+        for rating, group in source.groupby('IVA_COMPANY_RATING'):
+            scores = FEATURES.from_frame(group, dtype=np.float64)
+            covariance = np.cov(scores, rowvar=False) if len(scores) > 1 else np.zeros((len(FEATURES),) * 2)
+            # Small ridge keeps the covariance positive definite for the rare ratings
+            self.score_models[rating] = (scores.mean(axis=0), covariance + np.eye(len(FEATURES)) * 1e-3)
+
+        self.tax_values = source['TAX_TRANSP_PCTL_GLOBAL'].to_numpy()
+
+        industries = source.groupby(['IVA_INDUSTRY', 'GICS_SUB_IND']).size()
+        self.industries = np.array(industries.index.tolist(), dtype=object)
+        self.industries_p = (industries / industries.sum()).to_numpy()
+
+        words = source['Company_Name'].str.split(n=2)
+        self.name_parts = [np.array(sorted(set(words.str[i]))) for i in range(3)]
+
+        sentences = source['IVA_RATING_ANALYSIS'].str.split(SENTENCE_SPLIT, regex=True).explode()
+        self.sentences = sentences[sentences.str.len() > 0].to_numpy(dtype=object)
+        self.analysis_lengths = source['IVA_RATING_ANALYSIS'].str.len().to_numpy()
+
+    def _names(self, start, n):
+        """
+        Builds `n` unique company names for the global rows `start .. start + n`.
+
+        The three name words are picked through a fixed stride over all the
+        combinations, so consecutive rows do not share prefixes; once the
+        combinations are exhausted a numeric suffix keeps names unique.
+        """
+        first, middle, last = self.name_parts
+        combinations = len(first) * len(middle) * len(last)
+        index = np.arange(start, start + n, dtype=np.int64)
+        stride = 7919  # prime, so coprime with the number of combinations
+        combo = (index * stride) % combinations
+        generation = index // combinations
+
+        names = pd.Series(first[combo % len(first)]) + " " + \
+            middle[(combo // len(first)) % len(middle)] + " " + \
+            last[combo // (len(first) * len(middle))]
+        return names.where(generation == 0, names + " " + (generation + 1).astype(str))
+
+    def _analyses(self, rng, n):
+        """
+        Builds `n` analysis texts by concatenating random sentences of the pool,
+        with lengths drawn from the empirical length distribution.
+        """
+        mean_sentence = np.mean([len(s) for s in self.sentences])
+        targets = rng.choice(self.analysis_lengths, size=n)
+        counts = np.maximum(1, np.rint(targets / (mean_sentence + 1)).astype(int))
+        picks = self.sentences[rng.integers(0, len(self.sentences), size=(n, counts.max()))]
+        picks[np.arange(counts.max()) >= counts[:, None]] = ""
+        texts = pd.Series(picks[:, 0])
+        for i in range(1, picks.shape[1]):
+            column = pd.Series(picks[:, i])
+            texts = texts.where(column == "", texts + " " + column)
+        return texts
+
+    def sample(self, rng, start, n):
+        """
+        Draws `n` synthetic companies.
+
+        Args:
+            rng (np.random.Generator): The random generator.
+            start (int): Global index of the first row, used to keep names unique across chunks.
+            n (int): The number of rows to draw.
+
+        Returns:
+            pd.DataFrame: The synthetic rows, with the source column order.
+        """
+        ratings = self.ratings[rng.choice(len(self.ratings), size=n, p=self.ratings_p)]
+        scores = np.empty((n, len(FEATURES)))
+        for rating, (mean, covariance) in self.score_models.items():
+            mask = ratings[:, 0] == rating
+            if mask.any():
+                scores[mask] = rng.multivariate_normal(mean, covariance, size=int(mask.sum()))
+        scores = np.round(np.clip(scores, 0.0, 10.0), 1)
+        industries = self.industries[rng.choice(len(self.industries), size=n, p=self.industries_p)]
+
+        frame = pd.DataFrame(scores, columns=FEATURES.columns)
+        frame['Company_Name'] = self._names(start, n)
+        frame['IVA_COMPANY_RATING'] = ratings[:, 0]
+        frame['IVA_PREVIOUS_RATING'] = ratings[:, 1]
+        frame['IVA_RATING_TREND'] = ratings[:, 2].astype(np.float64)
+        frame['TAX_TRANSP_PCTL_GLOBAL'] = rng.choice(self.tax_values, size=n)
+        frame['IVA_INDUSTRY'] = industries[:, 0]
+        frame['GICS_SUB_IND'] = industries[:, 1]
+        frame['IVA_RATING_ANALYSIS'] = self._analyses(rng, n)
+        frame.index = pd.RangeIndex(start, start + n)
+        return frame[self.columns]
+
+def generate(rows, output, source_path=SOURCE_PATH, seed=0, chunk_rows=CHUNK_ROWS):
+    """
+    Writes a synthetic dataset of `rows` companies to `output`.
+
+    The format is chosen from the extension (.csv, .parquet or .feather). Rows are
+    generated and written in chunks of `chunk_rows`, so memory does not grow
+    with the dataset size. CSV output keeps the unnamed index column of `df_demo.csv`.
+
+    Args:
+        rows (int): The number of companies to generate.
+        output (str): The output path.
+        source_path (str, optional): The dataset to learn the distributions from.
+        seed (int, optional): Seed of the random generator.
+        chunk_rows (int, optional): The number of rows generated per chunk.
+
+    Returns:
+        None
+
+    Raises:
+        ValueError: If the output extension is not supported.
+    """
+    extension = os.path.splitext(output)[1].lower()
+    if extension not in SUPPORTED_FORMATS:
+        raise ValueError(f"Unsupported output format '{extension}', expected one of {SUPPORTED_FORMATS}")
+
+    profile = DatasetProfile(pd.read_csv(source_path))
+    rng = np.random.default_rng(seed)
+    writer = None
+    try:
+        for start in range(0, rows, chunk_rows):
+            chunk = profile.sample(rng, start, min(chunk_rows, rows - start))
+            if extension == ".csv":
+                chunk.to_csv(output, mode="w" if start == 0 else "a", header=start == 0)
+                continue
+
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                if extension == ".parquet":
+                    writer = pq.ParquetWriter(output, table.schema)
+                else:
+                    # Feather v2 is the Arrow IPC file format, which can be written incrementally
+                    writer = pa.ipc.new_file(output, table.schema, options=pa.ipc.IpcWriteOptions(compression="lz4"))
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic company dataset learned from df_demo.csv.")
+    parser.add_argument("--rows", type=int, required=True, help="Number of companies to generate.")
+    parser.add_argument("--output", required=True, help="Output path (.csv, .parquet or .feather).")
+    parser.add_argument("--source", default=SOURCE_PATH, help="Dataset to learn the distributions from.")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed.")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, help="Rows generated per chunk.")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    generate(args.rows, args.output, args.source, args.seed, args.chunk_rows)
+    elapsed = time.perf_counter() - start
+    print(f"Wrote {args.rows} rows to {args.output} in {elapsed:.1f}s ({args.rows / elapsed:,.0f} rows/s)")
+
+if __name__ == "__main__":
+    main()
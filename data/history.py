@@ -0,0 +1,437 @@
+"""
+Append-only history of the company scores and ratings.
+
+Each snapshot of the dataset (the eleven scores and the rating of every
+company at a date) is written as one Parquet file under a year partition:
+
+    data/history/year=2026/2026-10-19.parquet
+
+Once a month is over its daily files are compacted into one file sorted by
+company and date, and once a year is over its months are compacted the same
+way, so reading the history of one company touches a few row groups per year
+instead of one file per day:
+
+    data/history/year=2026/2026-09-01_2026-09-30.parquet
+    data/history/year=2025/2025-01-01_2025-12-31.parquet
+
+Snapshots are recorded from a dataset file, or backfilled with synthetic
+history for testing:
+
+    python -m data.history append --dataset data/df_demo.csv --date 2026-10-19
+    python -m data.history backfill --dataset data/df_demo.csv --days 1095
+"""
+import argparse
+import datetime
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from features import FEATURES
+from instrumentation import get_logger, increment, timer
+
+logger = get_logger("history")
+
+KEY_COLUMN = "Company_Name"
+DATE_COLUMN = "date"
+RATING_COLUMN = "IVA_COMPANY_RATING"
+HISTORY_COLUMNS = [KEY_COLUMN, DATE_COLUMN, RATING_COLUMN] + FEATURES.columns
+
+# Rating notches, worst to best; the position of a rating is its notch
+RATINGS = ["CCC", "B", "BB", "BBB", "A", "AA", "AAA"]
+
+# Rows per row group of the compacted files; small enough for the row group
+# statistics to narrow a company lookup to a few thousand rows
+ROW_GROUP_ROWS = 4_096
+
+def rating_notches(ratings):
+    """
+    Converts ratings to notches (CCC = 0 ... AAA = 6), NaN for unknown ratings.
+
+    Args:
+        ratings (array-like): Alphabetical ratings.
+
+    Returns:
+        np.ndarray: The notches, as floats.
+    """
+    codes = pd.Categorical(ratings, categories=RATINGS, ordered=True).codes.astype(np.float64)
+    codes[codes < 0] = np.nan
+    return codes
+
+def _to_date(value):
+    return pd.Timestamp(value).date()
+
+class HistoryStore:
+    """
+    Reads and appends the score history kept under a directory.
+
+    The store never rewrites recorded values: appends add a file, and
+    compaction only merges the files of a finished period into one. Files are
+    immutable once written, so their footers are cached.
+    """
+    def __init__(self, root):
+        """
+        Args:
+            root (str): The history directory; created on the first append.
+        """
+        self.root = root
+        self._lock = threading.Lock()
+        self._footers = {}
+
+    def _files(self):
+        """
+        Lists the history files as (first date, last date, path), oldest first.
+
+        Files already merged into a compacted file (e.g. while a compaction is
+        being finished) are skipped, so no snapshot is read twice.
+        """
+        if not os.path.isdir(self.root):
+            return []
+        files = []
+        for year in os.listdir(self.root):
+            directory = os.path.join(self.root, year)
+            if not year.startswith("year=") or not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                if not name.endswith(".parquet"):
+                    continue
+                first, _, last = name[:-len(".parquet")].partition("_")
+                files.append((_to_date(first), _to_date(last or first), os.path.join(directory, name)))
+
+        files.sort()
+        return [f for f in files if not any(
+            a <= f[0] and f[1] <= b and (a, b) != (f[0], f[1]) for a, b, _ in files
+        )]
+
+    @property
+    def version(self):
+        """
+        Changes whenever a snapshot is appended; suitable as a cache key.
+        """
+        files = self._files()
+        return f"{len(files)}:{files[-1][1]}" if files else ""
+
+    def dates(self):
+        """
+        Returns the first and last recorded dates, or (None, None) when empty.
+        """
+        files = self._files()
+        return (files[0][0], files[-1][1]) if files else (None, None)
+
+    def _footer(self, path):
+        """
+        Returns the cached metadata of a file and the name range of each row group.
+        """
+        footer = self._footers.get(path)
+        if footer is None:
+            import pyarrow.parquet as pq  # deferred: only needed once history is read
+
+            metadata = pq.read_metadata(path)
+            column = metadata.schema.names.index(KEY_COLUMN)
+            ranges = []
+            for i in range(metadata.num_row_groups):
+                statistics = metadata.row_group(i).column(column).statistics
+                ranges.append((statistics.min, statistics.max) if statistics is not None and statistics.has_min_max else (None, None))
+            footer = self._footers[path] = (metadata, ranges)
+        return footer
+
+    def _read(self, files, columns=None, company_name=None):
+        """
+        Reads some columns of the given files, only the row groups that may
+        contain `company_name` when given.
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        columns = columns or HISTORY_COLUMNS
+        read_columns = list(dict.fromkeys(columns + ([KEY_COLUMN] if company_name is not None else [])))
+        tables = []
+        for _, _, path in files:
+            metadata, ranges = self._footer(path)
+            groups = [i for i, (low, high) in enumerate(ranges)
+                      if company_name is None or low is None or low <= company_name <= high]
+            if groups:
+                table = pq.ParquetFile(path, metadata=metadata).read_row_groups(groups, columns=read_columns, use_threads=False)
+                if company_name is not None:
+                    table = table.filter(pa.compute.equal(table[KEY_COLUMN], company_name))
+                tables.append(table.select(columns))
+        if not tables:
+            return pd.DataFrame(columns=columns)
+        return pa.concat_tables(tables, promote_options="permissive").to_pandas()
+
+    def _window(self, start=None, end=None):
+        start = _to_date(start) if start is not None else datetime.date.min
+        end = _to_date(end) if end is not None else datetime.date.max
+        return [f for f in self._files() if f[1] >= start and f[0] <= end], start, end
+
+    @staticmethod
+    def _between(frame, start, end):
+        dates = frame[DATE_COLUMN]
+        return frame[(dates >= start) & (dates <= end)]
+
+    def company_history(self, company_name, start=None, end=None, columns=None):
+        """
+        Returns the recorded snapshots of one company, oldest first.
+
+        Only the row groups whose name range contains the company are read, so
+        the cost grows with the number of files rather than with the universe.
+
+        Args:
+            company_name (str): The company.
+            start (date-like, optional): First date to include.
+            end (date-like, optional): Last date to include.
+            columns (list, optional): Columns to read; all history columns by default.
+
+        Returns:
+            pd.DataFrame: One row per recorded date.
+        """
+        columns = list(dict.fromkeys([DATE_COLUMN] + (columns or HISTORY_COLUMNS)))
+        with timer("history_company"):
+            files, start, end = self._window(start, end)
+            history = self._between(self._read(files, columns, company_name), start, end)
+        return history.reset_index(drop=True)
+
+    def snapshot(self, date=None, columns=None):
+        """
+        Returns the last snapshot recorded on or before `date` (the latest by default).
+
+        Args:
+            date (date-like, optional): The date of the snapshot.
+            columns (list, optional): Columns to read.
+
+        Returns:
+            pd.DataFrame: One row per company, indexed by `Company_Name`.
+        """
+        columns = list(dict.fromkeys([KEY_COLUMN, DATE_COLUMN] + (columns or HISTORY_COLUMNS)))
+        files, _, end = self._window(None, date)
+        frame = self._read(files[-1:], columns)
+        if len(frame):
+            frame = self._between(frame, datetime.date.min, end)
+            frame = frame[frame[DATE_COLUMN] == frame[DATE_COLUMN].max()]
+        return frame.set_index(frame[KEY_COLUMN]).rename_axis(None)
+
+    def rolling_changes(self, days, date=None):
+        """
+        Computes, for every company, the change of each score and of the rating
+        between a snapshot and the one `days` earlier.
+
+        Args:
+            days (int): The length of the window, in days.
+            date (date-like, optional): End of the window; the latest snapshot by default.
+
+        Returns:
+            pd.DataFrame: Indexed by company, with one change column per score
+            and `rating_notches` (positive for upgrades). Companies missing at
+            either end of the window are left out.
+        """
+        with timer("history_rolling_changes"):
+            current = self.snapshot(date)
+            if len(current) == 0:
+                return pd.DataFrame(columns=FEATURES.columns + ["rating_notches"])
+            end = current[DATE_COLUMN].iloc[0]
+            previous = self.snapshot(end - datetime.timedelta(days=days))
+            common = current.index.intersection(previous.index)
+            current, previous = current.loc[common], previous.loc[common]
+
+            changes = pd.DataFrame(
+                FEATURES.from_frame(current, dtype=np.float64) - FEATURES.from_frame(previous, dtype=np.float64),
+                index=common, columns=FEATURES.columns
+            ).round(2)
+            changes["rating_notches"] = rating_notches(current[RATING_COLUMN]) - rating_notches(previous[RATING_COLUMN])
+        return changes
+
+    def rating_transitions(self, start=None, end=None):
+        """
+        Finds every upgrade and downgrade recorded in a date range, across the universe.
+
+        Only the name, date and rating columns are read; consecutive snapshots of
+        each company are compared in one vectorized pass.
+
+        Args:
+            start (date-like, optional): First date of the range.
+            end (date-like, optional): Last date of the range.
+
+        Returns:
+            pd.DataFrame: One row per rating change with `Company_Name`, `date`,
+            `from`, `to`, `notches` and `direction` ("upgrade" or "downgrade").
+        """
+        with timer("history_transitions"):
+            files, start, end = self._window(start, end)
+            history = self._between(self._read(files, [KEY_COLUMN, DATE_COLUMN, RATING_COLUMN]), start, end)
+
+            # Files are read in date order, so a stable sort on the company
+            # keeps each company's snapshots chronological
+            codes, _ = pd.factorize(history[KEY_COLUMN])
+            order = np.argsort(codes, kind="stable")
+            codes = codes[order]
+            names = history[KEY_COLUMN].to_numpy()[order]
+            dates = history[DATE_COLUMN].to_numpy()[order]
+            ratings = history[RATING_COLUMN].astype(object).to_numpy()[order]
+
+            notches = rating_notches(ratings)
+            delta = np.zeros(len(history))
+            delta[1:] = notches[1:] - notches[:-1]
+            same_company = np.zeros(len(history), dtype=bool)
+            same_company[1:] = codes[1:] == codes[:-1]
+            changed = same_company & (delta != 0) & ~np.isnan(delta)
+
+            transitions = pd.DataFrame({
+                KEY_COLUMN: names[changed],
+                DATE_COLUMN: dates[changed],
+                "from": np.roll(ratings, 1)[changed],
+                "to": ratings[changed],
+                "notches": delta[changed].astype(np.int64),
+            })
+            transitions["direction"] = np.where(transitions["notches"] > 0, "upgrade", "downgrade")
+        return transitions
+
+    def _snapshot_table(self, frame, date):
+        import pyarrow as pa
+
+        frame = frame[[KEY_COLUMN, RATING_COLUMN] + FEATURES.columns]
+        table = pa.table({
+            KEY_COLUMN: pa.array(frame[KEY_COLUMN].astype(str)),
+            DATE_COLUMN: pa.array(np.full(len(frame), np.datetime64(date, "D"))),
+            RATING_COLUMN: pa.array(frame[RATING_COLUMN].astype(str)).dictionary_encode(),
+            **{column: pa.array(frame[column].to_numpy(np.float32)) for column in FEATURES.columns},
+        })
+        return table.sort_by(KEY_COLUMN)
+
+    def append(self, frame, date):
+        """
+        Records the scores and ratings of a dataset as the snapshot of `date`.
+
+        Snapshots must be appended in date order. The first snapshot of a month
+        compacts the daily files of the previous months of the year, and the
+        first snapshot of a year compacts the previous years into one file each.
+
+        Args:
+            frame (pd.DataFrame): The dataset (at least the name, rating and score columns).
+            date (date-like): The date of the snapshot.
+
+        Returns:
+            str: The path of the written file.
+
+        Raises:
+            ValueError: If a snapshot at or after `date` is already recorded.
+        """
+        import pyarrow.parquet as pq
+
+        date = _to_date(date)
+        with self._lock:
+            _, last = self.dates()
+            if last is not None and date <= last:
+                raise ValueError(f"History already has a snapshot on or after {date} (last: {last})")
+
+            directory = os.path.join(self.root, f"year={date.year}")
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f"{date.isoformat()}.parquet")
+            pq.write_table(self._snapshot_table(frame, date), path + ".tmp", compression="zstd")
+            os.replace(path + ".tmp", path)
+            increment("history_snapshots")
+            logger.info("Recorded %d companies on %s", len(frame), date)
+
+            if last is not None and (last.year, last.month) != (date.year, date.month):
+                self._compact_before(date)
+        return path
+
+    def _compact_before(self, date):
+        month_start = date.replace(day=1)
+        by_period = {}
+        for first, last, path in self._files():
+            if last >= month_start:
+                continue
+            period = first.year if first.year < date.year else (first.year, first.month)
+            by_period.setdefault(period, []).append((first, last, path))
+        for files in by_period.values():
+            if len(files) > 1:
+                self.compact(files)
+
+    def compact(self, files):
+        """
+        Merges history files into one file sorted by company and date.
+
+        Args:
+            files (list): (first date, last date, path) of the files, as listed by the store.
+
+        Returns:
+            str: The compacted file.
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        first, last = min(f[0] for f in files), max(f[1] for f in files)
+        path = os.path.join(os.path.dirname(files[0][2]), f"{first.isoformat()}_{last.isoformat()}.parquet")
+        with timer("history_compact"):
+            table = pa.concat_tables([pq.ParquetFile(source).read() for _, _, source in files])
+            table = table.sort_by([(KEY_COLUMN, "ascending"), (DATE_COLUMN, "ascending")])
+            pq.write_table(table, path + ".tmp", row_group_size=ROW_GROUP_ROWS, compression="zstd")
+            os.replace(path + ".tmp", path)
+            for _, _, source in files:
+                if source != path:
+                    os.remove(source)
+                    self._footers.pop(source, None)
+        logger.info("Compacted %d history files into %s", len(files), path)
+        return path
+
+def synthesize_history(frame, days, end, seed=0):
+    """
+    Builds `days` daily snapshots ending with `frame`, for testing and demos.
+
+    Scores follow a small random walk backwards from their current values and
+    ratings move by one notch about once a year.
+
+    Args:
+        frame (pd.DataFrame): The current dataset, used as the last snapshot.
+        days (int): The number of snapshots.
+        end (date-like): The date of the last snapshot.
+        seed (int, optional): Seed of the random generator.
+
+    Yields:
+        tuple: (date, snapshot DataFrame), oldest first.
+    """
+    rng = np.random.default_rng(seed)
+    n = len(frame)
+    scores = FEATURES.from_frame(frame, dtype=np.float64)
+    notches = np.nan_to_num(rating_notches(frame[RATING_COLUMN]), nan=3)
+
+    # Offsets of every past day relative to today, accumulated backwards
+    score_steps = rng.normal(0.0, 0.05, size=(days, n, len(FEATURES)))
+    score_steps[-1] = 0
+    score_offsets = np.cumsum(score_steps[::-1], axis=0)[::-1]
+    rating_steps = (rng.random((days, n)) < 1 / 365) * rng.choice([-1, 1], size=(days, n))
+    rating_steps[-1] = 0
+    rating_offsets = np.cumsum(rating_steps[::-1], axis=0)[::-1]
+
+    end = _to_date(end)
+    for day in range(days):
+        snapshot = frame[[KEY_COLUMN]].copy()
+        snapshot[RATING_COLUMN] = np.array(RATINGS)[np.clip(notches - rating_offsets[day], 0, len(RATINGS) - 1).astype(int)]
+        snapshot[FEATURES.columns] = np.round(np.clip(scores - score_offsets[day], 0, 10), 1)
+        yield end - datetime.timedelta(days=days - 1 - day), snapshot
+
+def main():
+    from data.database import read_dataset
+
+    parser = argparse.ArgumentParser(description="Record or backfill the score history.")
+    parser.add_argument("command", choices=["append", "backfill"])
+    parser.add_argument("--dataset", default="data/df_demo.csv", help="Dataset to record.")
+    parser.add_argument("--history", default="data/history", help="History directory.")
+    parser.add_argument("--date", default=datetime.date.today().isoformat(), help="Date of the (last) snapshot.")
+    parser.add_argument("--days", type=int, default=365, help="Number of daily snapshots to backfill.")
+    args = parser.parse_args()
+
+    store = HistoryStore(args.history)
+    frame = read_dataset(args.dataset)
+    start = time.perf_counter()
+    if args.command == "append":
+        store.append(frame, args.date)
+    else:
+        for date, snapshot in synthesize_history(frame, args.days, args.date):
+            store.append(snapshot, date)
+    print(f"History in {args.history} now spans {' to '.join(map(str, store.dates()))} ({time.perf_counter() - start:.1f}s)")
+
+if __name__ == "__main__":
+    main()
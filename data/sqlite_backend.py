@@ -0,0 +1,328 @@
+"""
+SQLite storage backend for the company dataset.
+
+Imports the dataset once into an indexed SQLite file and answers lookups,
+filters and name lists with indexed queries, so workers do not need to keep
+the whole frame in memory. Selected with `CLARIFICATION_BACKEND=sqlite`;
+the file is (re)built automatically when missing or older than the dataset,
+or explicitly with:
+
+    python -m data.sqlite_backend --dataset data/df_demo.csv --output data/df_demo.sqlite
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import get_logger, increment, set_gauge
+
+logger = get_logger("sqlite_backend")
+
+TABLE = "companies"
+KEY_COLUMN = "Company_Name"
+INDEXED_COLUMNS = ["IVA_INDUSTRY", "IVA_COMPANY_RATING"]
+IMPORT_CHUNK_ROWS = 100_000
+# Names bound per `IN (...)` query, within SQLite's bound-parameter limit
+MAX_PARAMS = 900
+# Bookkeeping columns, never returned to callers
+HASH_COLUMN = "_hash"
+VERSION_COLUMN = "_version"
+
+def _row_hashes(frame):
+    # SQLite integers are signed 64-bit
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy().view(np.int64)
+
+def _chunks(names):
+    for i in range(0, len(names), MAX_PARAMS):
+        part = names[i:i + MAX_PARAMS]
+        yield part, ", ".join("?" * len(part))
+
+def _create_indexes(connection):
+    connection.execute(f'CREATE UNIQUE INDEX idx_{TABLE}_name ON {TABLE} ("{KEY_COLUMN}")')
+    for column in INDEXED_COLUMNS:
+        connection.execute(f'CREATE INDEX idx_{TABLE}_{column.lower()} ON {TABLE} ("{column}")')
+
+def build_database(dataset, output, chunk_rows=IMPORT_CHUNK_ROWS):
+    """
+    Imports a dataset into a new SQLite file and creates its indexes.
+
+    Args:
+        dataset (pd.DataFrame or iterable of pd.DataFrame): The dataset, whole or in chunks.
+        output (str): Path of the SQLite file; an existing file is replaced.
+        chunk_rows (int, optional): Rows written per transaction when `dataset` is a frame.
+
+    Returns:
+        None
+    """
+    if isinstance(dataset, pd.DataFrame):
+        frame = dataset
+        dataset = (frame.iloc[i:i + chunk_rows] for i in range(0, len(frame), chunk_rows))
+
+    # A unique name: several processes may rebuild the same stale file at once
+    descriptor, temporary = tempfile.mkstemp(prefix=os.path.basename(output) + ".", suffix=".tmp",
+                                             dir=os.path.dirname(os.path.abspath(output)))
+    os.close(descriptor)
+    connection = sqlite3.connect(temporary)
+    try:
+        for chunk in dataset:
+            chunk = chunk.assign(**{HASH_COLUMN: _row_hashes(chunk), VERSION_COLUMN: 0})
+            chunk.to_sql(TABLE, connection, if_exists="append", index=False)
+        _create_indexes(connection)
+        connection.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value INTEGER)")
+        connection.execute("INSERT INTO meta VALUES ('version', 0)")
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.commit()
+    except BaseException:
+        connection.close()
+        os.remove(temporary)
+        raise
+    connection.close()
+    os.replace(temporary, output)
+
+class SqliteCompanyStore:
+    """
+    `CompanyStore` counterpart backed by an SQLite file.
+
+    Exposes the same interface (`frame`, `names`, `sorted_names`, `lookup`,
+    `filter`, `company_version`, `row_hash`, `upsert`, `delete`, `apply_snapshot`,
+    `subscribe`), but every call is an indexed query. The dataset version and
+    the per-company versions live in the file, so several processes opening
+    the same file agree on them.
+    """
+    def __init__(self, db_path):
+        """
+        Args:
+            db_path (str): Path of a file built by `build_database`.
+        """
+        self.db_path = db_path
+        self._local = threading.local()
+        self._lock = threading.RLock()
+        self._listeners = []
+        self._load_columns()
+        set_gauge("dataset_rows", self._connection().execute(f"SELECT COUNT(*) FROM {TABLE}").fetchone()[0])
+
+    def _load_columns(self):
+        info = self._connection().execute(f"PRAGMA table_info({TABLE})").fetchall()
+        self.columns = [row[1] for row in info if row[1] not in (HASH_COLUMN, VERSION_COLUMN)]
+        self._select = ", ".join(f'"{c}"' for c in self.columns)
+
+    def _connection(self):
+        # sqlite3 connections must not be shared between threads
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.db_path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._local.connection = connection
+        return connection
+
+    def _query(self, sql, params=()):
+        frame = pd.read_sql_query(sql, self._connection(), params=params)
+        return frame.set_index(frame[KEY_COLUMN], drop=False).rename_axis(None)
+
+    @property
+    def version(self):
+        return self._connection().execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+
+    @property
+    def frame(self):
+        """
+        The whole dataset, materialized. Prefer `lookup` and `filter`.
+        """
+        return self._query(f"SELECT {self._select} FROM {TABLE} ORDER BY rowid")
+
+    def names(self):
+        rows = self._connection().execute(f'SELECT "{KEY_COLUMN}" FROM {TABLE} ORDER BY rowid').fetchall()
+        return pd.Index([row[0] for row in rows])
+
+    def sorted_names(self):
+        """
+        Returns the company names in alphabetical order, read from the name index.
+        """
+        rows = self._connection().execute(f'SELECT "{KEY_COLUMN}" FROM {TABLE} ORDER BY "{KEY_COLUMN}"').fetchall()
+        return [row[0] for row in rows]
+
+    def company_version(self, company_name):
+        row = self._connection().execute(f'SELECT {VERSION_COLUMN} FROM {TABLE} WHERE "{KEY_COLUMN}" = ?', (company_name,)).fetchone()
+        return -1 if row is None else row[0]
+
+    def row_hash(self, company_name):
+        row = self._connection().execute(f'SELECT {HASH_COLUMN} FROM {TABLE} WHERE "{KEY_COLUMN}" = ?', (company_name,)).fetchone()
+        return None if row is None else row[0]
+
+    def lookup(self, company_names):
+        """
+        Returns the rows of the given companies, in dataset order.
+        """
+        company_names = list(dict.fromkeys(company_names))
+        if len(company_names) == 0:
+            return self._query(f"SELECT {self._select} FROM {TABLE} LIMIT 0")
+        if len(company_names) <= MAX_PARAMS:
+            placeholders = ", ".join("?" * len(company_names))
+            return self._query(f'SELECT {self._select} FROM {TABLE} WHERE "{KEY_COLUMN}" IN ({placeholders}) ORDER BY rowid', company_names)
+        parts = [
+            self._query(f'SELECT rowid AS _rowid, {self._select} FROM {TABLE} WHERE "{KEY_COLUMN}" IN ({placeholders})', part)
+            for part, placeholders in _chunks(company_names)
+        ]
+        return pd.concat(parts).sort_values("_rowid").drop(columns="_rowid")
+
+    def filter(self, industry=None, rating=None, limit=None, offset=0):
+        """
+        Returns the companies of an industry and/or with a rating, through their indexes.
+        """
+        clauses, params = [], []
+        if industry is not None:
+            clauses.append('"IVA_INDUSTRY" = ?')
+            params.append(industry)
+        if rating is not None:
+            clauses.append('"IVA_COMPANY_RATING" = ?')
+            params.append(rating)
+        sql = f"SELECT {self._select} FROM {TABLE}"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY rowid"
+        if limit is not None or offset:
+            sql += f" LIMIT {-1 if limit is None else int(limit)} OFFSET {int(offset)}"
+        return self._query(sql, params)
+
+    def subscribe(self, callback):
+        with self._lock:
+            self._listeners.append(callback)
+
+    def _publish(self, connection, changed):
+        if not changed:
+            connection.rollback()
+            return changed
+        connection.commit()
+        version = self.version
+        increment("dataset_changed_rows", len(changed))
+        set_gauge("dataset_version", version)
+        logger.info("Dataset version %d: %d companies changed", version, len(changed))
+        for callback in list(self._listeners):
+            callback(changed, version)
+        return changed
+
+    def _bump_version(self, connection):
+        connection.execute("UPDATE meta SET value = value + 1 WHERE key = 'version'")
+        return connection.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+
+    def _upsert(self, connection, rows):
+        rows = rows.reindex(columns=self.columns)
+        rows = rows[~rows[KEY_COLUMN].duplicated(keep="last")]
+        hashes = _row_hashes(rows)
+
+        # Compare against the stored hashes in chunks, within SQLite's parameter limit
+        stored = {}
+        names = rows[KEY_COLUMN].tolist()
+        for part, placeholders in _chunks(names):
+            stored.update(connection.execute(f'SELECT "{KEY_COLUMN}", {HASH_COLUMN} FROM {TABLE} WHERE "{KEY_COLUMN}" IN ({placeholders})', part).fetchall())
+        changed_mask = np.array([stored.get(name) != h for name, h in zip(names, hashes.tolist())], dtype=bool)
+        changed_rows = rows[changed_mask]
+        if len(changed_rows) == 0:
+            return set()
+
+        version = self._bump_version(connection)
+        columns = self.columns + [HASH_COLUMN, VERSION_COLUMN]
+        quoted = ", ".join(f'"{c}"' for c in columns)
+        updates = ", ".join(f'"{c}" = excluded."{c}"' for c in columns if c != KEY_COLUMN)
+        values = changed_rows.assign(**{HASH_COLUMN: hashes[changed_mask], VERSION_COLUMN: version})
+        values = values.astype(object).where(values.notna(), None).itertuples(index=False, name=None)
+        connection.executemany(
+            f'INSERT INTO {TABLE} ({quoted}) VALUES ({", ".join("?" * len(columns))}) ON CONFLICT("{KEY_COLUMN}") DO UPDATE SET {updates}',
+            [tuple(v.item() if isinstance(v, np.generic) else v for v in row) for row in values]
+        )
+        return set(changed_rows[KEY_COLUMN])
+
+    def _rebuild(self, connection, snapshot):
+        """
+        Replaces the table with a snapshot whose columns differ from the stored ones.
+        """
+        rows = snapshot[~snapshot[KEY_COLUMN].duplicated(keep="last")]
+        version = self._bump_version(connection)
+        connection.execute(f"DROP TABLE {TABLE}")
+        rows.assign(**{HASH_COLUMN: _row_hashes(rows), VERSION_COLUMN: version}).to_sql(TABLE, connection, index=False)
+        _create_indexes(connection)
+        self._load_columns()
+        logger.info("Dataset columns changed, rebuilt the table with %d companies", len(rows))
+        return set(rows[KEY_COLUMN])
+
+    def upsert(self, rows):
+        with self._lock:
+            connection = self._connection()
+            return self._publish(connection, self._upsert(connection, rows))
+
+    def delete(self, company_names):
+        with self._lock:
+            connection = self._connection()
+            removed = set()
+            for part, placeholders in _chunks(list(dict.fromkeys(company_names))):
+                query = f'SELECT "{KEY_COLUMN}" FROM {TABLE} WHERE "{KEY_COLUMN}" IN ({placeholders})'
+                removed.update(row[0] for row in connection.execute(query, part))
+            if removed:
+                self._bump_version(connection)
+                connection.executemany(f'DELETE FROM {TABLE} WHERE "{KEY_COLUMN}" = ?', [(name,) for name in removed])
+            return self._publish(connection, removed)
+
+    def apply_snapshot(self, snapshot):
+        """
+        Brings the table in line with a new full dataset in one transaction.
+
+        A snapshot with other columns (e.g. the `BASELINE_*` columns added by
+        `baseline_predictions`) rebuilds the table and changes every company.
+        """
+        with self._lock:
+            connection = self._connection()
+            # Another worker sharing the file may already have rebuilt the table
+            self._load_columns()
+            removed = set(self.names().difference(pd.Index(snapshot[KEY_COLUMN])))
+            if set(snapshot.columns) != set(self.columns):
+                return self._publish(connection, self._rebuild(connection, snapshot) | removed)
+            if removed:
+                connection.executemany(f'DELETE FROM {TABLE} WHERE "{KEY_COLUMN}" = ?', [(name,) for name in removed])
+            changed = self._upsert(connection, snapshot)
+            if removed and not changed:
+                self._bump_version(connection)
+            return self._publish(connection, changed | removed)
+
+def _dataset_chunks(dataset_path, read):
+    # CSV files are imported chunk by chunk so the whole dataset is never in memory
+    if dataset_path.lower().endswith(".csv"):
+        return pd.read_csv(dataset_path, chunksize=IMPORT_CHUNK_ROWS)
+    return read(dataset_path)
+
+def open_store(db_path, dataset_path, read):
+    """
+    Opens the SQLite store, building it from the dataset when missing or stale.
+
+    Args:
+        db_path (str): Path of the SQLite file.
+        dataset_path (str): The dataset the file is built from.
+        read (callable): Function reading the dataset into a DataFrame.
+
+    Returns:
+        SqliteCompanyStore: The store.
+    """
+    if not os.path.exists(db_path) or os.path.getmtime(db_path) < os.path.getmtime(dataset_path):
+        start = time.perf_counter()
+        build_database(_dataset_chunks(dataset_path, read), db_path)
+        logger.info("Built %s from %s in %.1fs", db_path, dataset_path, time.perf_counter() - start)
+    return SqliteCompanyStore(db_path)
+
+def main():
+    from data.database import read_dataset
+
+    parser = argparse.ArgumentParser(description="Import a company dataset into an indexed SQLite file.")
+    parser.add_argument("--dataset", required=True, help="Dataset to import (.csv, .parquet or .feather).")
+    parser.add_argument("--output", required=True, help="SQLite file to write.")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    build_database(_dataset_chunks(args.dataset, read_dataset), args.output)
+    print(f"Imported {args.dataset} into {args.output} in {time.perf_counter() - start:.1f}s")
+
+if __name__ == "__main__":
+    main()
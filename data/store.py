@@ -0,0 +1,354 @@
+import os
+import threading
+
+import pandas as pd
+
+from instrumentation import get_logger, increment, set_gauge, timer
+
+logger = get_logger("store")
+
+KEY_COLUMN = "Company_Name"
+
+class CompanyStore:
+    """
+    In-memory company dataset, indexed by `Company_Name` and updated row by row.
+
+    The store keeps a global dataset version, bumped on every change, and a
+    per-company version, bumped only for the rows that changed. Downstream
+    caches key their entries on `company_version(name)` and may subscribe to be
+    told which companies changed, so a refresh invalidates only those entries.
+
+    Attributes:
+        version (int): The dataset version.
+    """
+    def __init__(self, frame):
+        """
+        Builds the store from a full dataset.
+
+        Args:
+            frame (pd.DataFrame): The dataset; `Company_Name` must be unique.
+        """
+        self._lock = threading.RLock()
+        self._listeners = []
+        self._frame = frame.set_index(frame[KEY_COLUMN], drop=False).rename_axis(None)
+        self._hashes = self._row_hashes(self._frame)
+        self._company_versions = pd.Series(0, index=self._frame.index, dtype="int64")
+        self.version = 0
+        set_gauge("dataset_rows", len(self._frame))
+
+    @staticmethod
+    def _row_hashes(frame):
+        return pd.util.hash_pandas_object(frame, index=False)
+
+    @property
+    def frame(self):
+        """
+        The current dataset, in file order, indexed by `Company_Name`.
+        """
+        return self._frame
+
+    def names(self):
+        """
+        Returns the company names, in file order.
+        """
+        return self._frame.index
+
+    def sorted_names(self):
+        """
+        Returns the company names in alphabetical order.
+        """
+        return sorted(self._frame.index.tolist())
+
+    def company_version(self, company_name):
+        """
+        Returns the version of a company's row (0 until it first changes, -1 if unknown).
+        """
+        return int(self._company_versions.get(company_name, -1))
+
+    def row_hash(self, company_name):
+        """
+        Returns the content hash of a company's row (None if unknown).
+
+        Unlike `company_version`, it is the same in every process that loaded
+        the same data, so it can key caches shared between processes.
+        """
+        value = self._hashes.get(company_name)
+        return None if value is None else int(value)
+
+    def lookup(self, company_names):
+        """
+        Returns the rows of the given companies through the name index.
+
+        Args:
+            company_names (list): The companies to look up; unknown names are ignored.
+
+        Returns:
+            pd.DataFrame: The matching rows, in file order.
+        """
+        frame = self._frame
+        positions = frame.index.get_indexer(company_names)
+        positions = sorted(set(positions[positions >= 0].tolist()))
+        return frame.iloc[positions]
+
+    def filter(self, industry=None, rating=None, limit=None, offset=0):
+        """
+        Returns the companies of an industry and/or with a rating, in file order,
+        skipping the first `offset` matches.
+        """
+        frame = self._frame
+        mask = pd.Series(True, index=frame.index)
+        if industry is not None:
+            mask &= frame["IVA_INDUSTRY"] == industry
+        if rating is not None:
+            mask &= frame["IVA_COMPANY_RATING"] == rating
+        return frame[mask].iloc[offset:None if limit is None else offset + limit]
+
+    def subscribe(self, callback):
+        """
+        Registers `callback(changed_names, version)`, called after every change.
+        """
+        with self._lock:
+            self._listeners.append(callback)
+
+    def _commit(self, frame, hashes, changed):
+        """
+        Publishes a new frame and bumps the versions of the changed companies.
+        """
+        if not changed:
+            return changed
+        self.version += 1
+        versions = self._company_versions.reindex(frame.index, fill_value=0)
+        versions[versions.index.isin(changed)] = self.version
+        self._frame = frame
+        self._hashes = hashes
+        self._company_versions = versions
+        increment("dataset_changed_rows", len(changed))
+        set_gauge("dataset_version", self.version)
+        set_gauge("dataset_rows", len(frame))
+        logger.info("Dataset version %d: %d companies changed", self.version, len(changed))
+        for callback in list(self._listeners):
+            callback(changed, self.version)
+        return changed
+
+    def _merge(self, frame, hashes, rows):
+        """
+        Merges `rows` into `frame` without publishing anything.
+
+        Only the incoming rows are hashed, so the cost does not depend on the
+        size of the dataset beyond the final reindex.
+
+        Returns:
+            tuple: (new frame, new hashes, names of the rows that changed).
+        """
+        rows = rows.reindex(columns=frame.columns)
+        rows = rows.set_index(rows[KEY_COLUMN], drop=False).rename_axis(None)
+        rows = rows[~rows.index.duplicated(keep="last")]
+
+        existing = rows.index.isin(frame.index)
+        row_hashes = self._row_hashes(rows)
+        old_hashes = hashes.reindex(rows.index).to_numpy()
+        changed_rows = rows[~existing | (row_hashes.to_numpy() != old_hashes)]
+        if len(changed_rows) == 0:
+            return frame, hashes, set()
+
+        order = frame.index.append(changed_rows.index[~changed_rows.index.isin(frame.index)])
+        frame = pd.concat([frame.drop(index=changed_rows.index, errors="ignore"), changed_rows]).reindex(order)
+        hashes = pd.concat([hashes.drop(index=changed_rows.index, errors="ignore"), row_hashes.loc[changed_rows.index]]).reindex(order)
+        return frame, hashes, set(changed_rows.index)
+
+    def upsert(self, rows):
+        """
+        Inserts new companies and replaces the rows of existing ones.
+
+        Rows identical to the stored ones are ignored and do not bump any version.
+
+        Args:
+            rows (pd.DataFrame): The rows to upsert, with the dataset columns.
+
+        Returns:
+            set: The names of the companies that actually changed.
+        """
+        with self._lock:
+            return self._commit(*self._merge(self._frame, self._hashes, rows))
+
+    def delete(self, company_names):
+        """
+        Removes companies from the store.
+
+        Args:
+            company_names (iterable): The companies to remove; unknown names are ignored.
+
+        Returns:
+            set: The names of the companies that were removed.
+        """
+        with self._lock:
+            removed = self._frame.index.intersection(list(company_names))
+            return self._commit(self._frame.drop(index=removed), self._hashes.drop(index=removed), set(removed))
+
+    def apply_snapshot(self, snapshot):
+        """
+        Brings the store in line with a new full dataset, row by row.
+
+        Rows are compared by content hash: new and modified companies are
+        upserted, companies missing from the snapshot are deleted, and unchanged
+        rows keep their version. The whole snapshot is published as one version.
+
+        A snapshot with other columns (e.g. the `BASELINE_*` columns added by
+        `baseline_predictions`) replaces the whole frame and changes every company.
+
+        Args:
+            snapshot (pd.DataFrame): The new dataset.
+
+        Returns:
+            set: The names of the companies that changed.
+        """
+        with self._lock:
+            removed = self._frame.index.difference(pd.Index(snapshot[KEY_COLUMN]))
+            if set(snapshot.columns) != set(self._frame.columns):
+                frame = snapshot.set_index(snapshot[KEY_COLUMN], drop=False).rename_axis(None)
+                frame = frame[~frame.index.duplicated(keep="last")]
+                logger.info("Dataset columns changed, reloading all %d companies", len(frame))
+                return self._commit(frame, self._row_hashes(frame), set(frame.index) | set(removed))
+            frame, hashes, changed = self._merge(self._frame.drop(index=removed), self._hashes.drop(index=removed), snapshot)
+            return self._commit(frame, hashes, changed | set(removed))
+
+class DatasetWatcher:
+    """
+    Polls the dataset file and applies its changes to a `CompanyStore`.
+
+    Polling the modification time keeps the watcher dependency free and
+    works for files replaced atomically as well as rewritten in place.
+    """
+    def __init__(self, store, path, read, interval=5.0):
+        """
+        Args:
+            store (CompanyStore): The store to keep up to date.
+            path (str): The dataset file to watch.
+            read (callable): Function reading the dataset file into a DataFrame.
+            interval (float, optional): Seconds between two checks.
+        """
+        self.store = store
+        self.path = path
+        self.read = read
+        self.interval = interval
+        self._mtime = self._current_mtime()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _current_mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def check(self):
+        """
+        Applies the file to the store if it was modified since the last check.
+
+        Returns:
+            set: The names of the companies that changed (empty if the file did not change).
+        """
+        mtime = self._current_mtime()
+        if mtime is None or mtime == self._mtime:
+            return set()
+        self._mtime = mtime
+        with timer("dataset_refresh"):
+            return self.store.apply_snapshot(self.read(self.path))
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                logger.warning("Dataset refresh failed: %s", e)
+
+    def start(self):
+        """
+        Starts polling in a daemon thread.
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="dataset-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+class _NoValue:
+    """
+    Stored in the shared tier for builds that returned None, which `ResultStore.get` returns on a miss.
+    """
+
+class CompanyCache:
+    """
+    Process-wide cache of per-company results (figures, analyses, ...).
+
+    Entries are keyed on the company, its row version and a caller-provided
+    key; subscribing to the store drops the entries of changed companies only.
+    """
+    def __init__(self, store, max_entries=10_000, shared=None):
+        """
+        Args:
+            store (CompanyStore or SqliteCompanyStore): The dataset the entries derive from.
+            max_entries (int, optional): Entries kept in this process.
+            shared (ResultStore, optional): A cache tier shared with other
+                processes, looked up on a miss and written after every build.
+        """
+        self.store = store
+        self.max_entries = max_entries
+        self.shared = shared
+        self._entries = {}
+        self._lock = threading.Lock()
+        store.subscribe(self.invalidate)
+
+    def get_or_build(self, company_name, key, build):
+        """
+        Returns the cached value or builds and stores it.
+
+        Args:
+            company_name (str): The company the value belongs to.
+            key (hashable): What distinguishes values of the same company (e.g. inputs).
+            build (callable): Builds the value when it is missing.
+
+        Returns:
+            The cached or newly built value.
+        """
+        full_key = (company_name, self.store.company_version(company_name), key)
+        with self._lock:
+            if full_key in self._entries:
+                return self._entries[full_key]
+        if self.shared is None:
+            value = build()
+        else:
+            # Row versions are local to a process; the shared tier is keyed on the row content
+            shared_key = ("figure", company_name, self.store.row_hash(company_name), key)
+            value = self.shared.get(shared_key)
+            if isinstance(value, _NoValue):
+                value = None
+            elif value is None:
+                value = build()
+                self.shared.put(shared_key, _NoValue() if value is None else value)
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._entries.pop(next(iter(self._entries)))
+            self._entries[full_key] = value
+        return value
+
+    def get(self, company_name, key):
+        """
+        Returns the value cached in this process, or None; nothing is built.
+        """
+        full_key = (company_name, self.store.company_version(company_name), key)
+        with self._lock:
+            return self._entries.get(full_key)
+
+    def invalidate(self, company_names, version=None):
+        """
+        Drops every entry of the given companies.
+        """
+        with self._lock:
+            for full_key in [k for k in self._entries if k[0] in company_names]:
+                del self._entries[full_key]
+
+    def __len__(self):
+        return len(self._entries)
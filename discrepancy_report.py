@@ -0,0 +1,213 @@
+"""
+Universe-wide report of where the model disagrees with the actual ratings.
+
+Scores the whole dataset chunk by chunk, compares the model's top-2 ratings
+with `IVA_COMPANY_RATING` and writes the companies ranked by discrepancy to a
+Parquet file, which the Discrepancies page pages through:
+
+    python -m discrepancy_report
+    python -m discrepancy_report --dataset data/universe_1m.parquet --output /tmp/discrepancies.parquet
+
+Memory stays bounded by the chunk size: each chunk is split into buckets of
+equal rank (absolute discrepancy, then whether the actual rating is the
+model's second guess), written to one temporary file per bucket, and the
+buckets are concatenated in rank order at the end.
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import config
+from data.database import CHUNK_ROWS, iter_dataset
+from data.history import RATINGS, rating_notches
+from features import FEATURES
+from instrumentation import get_logger, increment, timer
+from scoring import RATING_LABELS
+
+logger = get_logger("discrepancy_report")
+
+INPUT_COLUMNS = ["Company_Name", "IVA_INDUSTRY", "IVA_COMPANY_RATING"] + FEATURES.columns
+SUMMARY_KEY = b"clarification.summary"
+ROW_GROUP_ROWS = 10_000
+
+# Highest discrepancy first; at equal distance, companies whose actual rating
+# is not even the model's second guess come first. Known ratings fill buckets
+# 0 to 2 * MAX_NOTCHES + 1; unknown ratings go last, in a bucket of their own.
+MAX_NOTCHES = len(RATINGS) - 1
+UNKNOWN_BUCKET = 2 * MAX_NOTCHES + 2
+
+def compare_chunk(model, chunk):
+    """
+    Scores a chunk and compares the top-2 predictions with the actual ratings.
+
+    Args:
+        model (ModelInterface): The rating model.
+        chunk (pd.DataFrame): Rows with the name, industry, rating and the eleven scores.
+
+    Returns:
+        pd.DataFrame: One row per company with the actual and predicted ratings,
+        the signed discrepancy in notches (positive when the model rates higher),
+        whether the actual rating is in the top 2 and the rank bucket.
+    """
+    predictions = model.predict(FEATURES.from_frame(chunk, dtype=np.float64))
+    actual = rating_notches(chunk["IVA_COMPANY_RATING"])
+    discrepancy = predictions[:, 0] - actual
+    in_top_2 = (predictions[:, 0] == actual) | (predictions[:, 1] == actual)
+
+    bucket = (MAX_NOTCHES - np.abs(discrepancy)) * 2 + in_top_2
+    bucket = np.where(np.isnan(actual), UNKNOWN_BUCKET, bucket)
+
+    return pd.DataFrame({
+        "Company_Name": chunk["Company_Name"].to_numpy(),
+        "IVA_INDUSTRY": chunk["IVA_INDUSTRY"].to_numpy(),
+        "IVA_COMPANY_RATING": chunk["IVA_COMPANY_RATING"].to_numpy(),
+        "PREDICTED_RATING": RATING_LABELS[predictions[:, 0]],
+        "SECOND_RATING": RATING_LABELS[predictions[:, 1]],
+        "DISCREPANCY": discrepancy,
+        "IN_TOP_2": in_top_2,
+        "_bucket": bucket.astype(np.int64),
+    })
+
+def _report_schema():
+    import pyarrow as pa
+
+    return pa.schema([
+        ("Company_Name", pa.string()),
+        ("IVA_INDUSTRY", pa.string()),
+        ("IVA_COMPANY_RATING", pa.string()),
+        ("PREDICTED_RATING", pa.string()),
+        ("SECOND_RATING", pa.string()),
+        ("DISCREPANCY", pa.float64()),
+        ("IN_TOP_2", pa.bool_()),
+    ])
+
+def build_report(model, dataset_path, output_path, chunk_rows=CHUNK_ROWS, on_progress=None):
+    """
+    Writes the discrepancy report of a whole dataset.
+
+    Args:
+        model (ModelInterface): The rating model.
+        dataset_path (str): The dataset (.csv, .parquet or .feather).
+        output_path (str): The Parquet file to write; replaced atomically.
+        chunk_rows (int, optional): Rows scored per chunk.
+        on_progress (callable, optional): Called with the number of rows scored so far.
+
+    Returns:
+        dict: The summary stored in the file metadata (row counts per
+        discrepancy and top-2 agreement, companies with an unknown rating,
+        throughput).
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    start = time.perf_counter()
+    output_dir = os.path.dirname(os.path.abspath(output_path))
+    os.makedirs(output_dir, exist_ok=True)
+    workdir = tempfile.mkdtemp(prefix="discrepancy-", dir=output_dir)
+    schema = _report_schema()
+    writers = {}
+    counts = {}
+    unknown = 0
+    rows = 0
+    try:
+        with timer("discrepancy_report"):
+            for chunk in iter_dataset(dataset_path, columns=INPUT_COLUMNS, chunk_rows=chunk_rows):
+                result = compare_chunk(model, chunk)
+                for bucket, part in result.groupby("_bucket", sort=False):
+                    table = pa.Table.from_pandas(part.drop(columns="_bucket"), schema=schema, preserve_index=False)
+                    if bucket not in writers:
+                        writers[bucket] = pq.ParquetWriter(os.path.join(workdir, f"{bucket}.parquet"), schema)
+                    writers[bucket].write_table(table)
+                for key, count in result.groupby([result["DISCREPANCY"].abs(), "IN_TOP_2"]).size().items():
+                    key = f"{int(key[0])}|{bool(key[1])}"
+                    counts[key] = counts.get(key, 0) + int(count)
+                # Not in `counts`: their discrepancy is NaN
+                unknown += int((result["_bucket"] == UNKNOWN_BUCKET).sum())
+                rows += len(result)
+                increment("discrepancy_rows", len(result))
+                if on_progress is not None:
+                    on_progress(rows)
+
+            for writer in writers.values():
+                writer.close()
+
+            elapsed = time.perf_counter() - start
+            summary = {
+                "dataset": dataset_path,
+                "rows": rows,
+                "counts": counts,
+                "unknown": unknown,
+                "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "seconds": round(elapsed, 3),
+                "rows_per_second": round(rows / elapsed) if elapsed > 0 else None,
+            }
+
+            # Concatenate the buckets in rank order
+            schema = schema.with_metadata({SUMMARY_KEY: json.dumps(summary).encode("utf-8")})
+            with pq.ParquetWriter(output_path + ".tmp", schema) as writer:
+                for bucket in sorted(writers):
+                    for batch in pq.ParquetFile(os.path.join(workdir, f"{bucket}.parquet")).iter_batches(batch_size=ROW_GROUP_ROWS):
+                        writer.write_batch(batch, row_group_size=ROW_GROUP_ROWS)
+            os.replace(output_path + ".tmp", output_path)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    logger.info("Discrepancy report of %d rows written to %s in %.1fs", rows, output_path, summary["seconds"])
+    return summary
+
+def read_summary(path):
+    """
+    Returns the summary stored in a report, or None if the report does not exist.
+    """
+    if not os.path.exists(path):
+        return None
+    import pyarrow.parquet as pq
+    metadata = pq.read_schema(path).metadata or {}
+    return json.loads(metadata[SUMMARY_KEY]) if SUMMARY_KEY in metadata else None
+
+def read_page(path, offset, limit):
+    """
+    Reads `limit` ranked rows of a report starting at `offset`, touching only
+    the row groups that contain them.
+
+    Args:
+        path (str): The report file.
+        offset (int): Rank of the first row (0-based).
+        limit (int): Number of rows.
+
+    Returns:
+        pd.DataFrame: The rows, with their rank as index (1-based).
+    """
+    import pyarrow.parquet as pq
+
+    report = pq.ParquetFile(path)
+    sizes = [report.metadata.row_group(i).num_rows for i in range(report.metadata.num_row_groups)]
+    bounds = np.concatenate([[0], np.cumsum(sizes)])
+    groups = [i for i in range(len(sizes)) if bounds[i + 1] > offset and bounds[i] < offset + limit]
+    if not groups:
+        return pd.DataFrame(columns=report.schema_arrow.names)
+    table = report.read_row_groups(groups)
+    page = table.slice(offset - bounds[groups[0]], limit).to_pandas()
+    page.index = pd.RangeIndex(offset + 1, offset + 1 + len(page), name="Rank")
+    return page
+
+def main():
+    from ml_model import ModelInterface
+
+    parser = argparse.ArgumentParser(description="Rank the companies by discrepancy between the model and their rating.")
+    parser.add_argument("--dataset", default=config.DATASET_PATH, help="Dataset to score (.csv, .parquet or .feather).")
+    parser.add_argument("--output", default=config.DISCREPANCY_REPORT_PATH, help="Parquet report to write.")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, help="Rows scored per chunk.")
+    args = parser.parse_args()
+
+    summary = build_report(ModelInterface(config.MODEL_PATH), args.dataset, args.output, args.chunk_rows)
+    print(f"Scored {summary['rows']} companies in {summary['seconds']:.1f}s ({summary['rows_per_second']} rows/s) into {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+The eleven scores the model rates a company on, in one place.
+
+The card's sliders, the comparison chart, the LLM prompt, the model and the
+batch jobs all read the same score columns; `FEATURES` defines their order
+(the order the model's scaler was fitted with), their slider labels and keys,
+and extracts them as one matrix, whatever the source: dataset rows, records
+of the selected companies or the sliders in session state. `DISPLAY_COLUMNS`
+and `PILLAR_COLUMNS` give the order the card and the charts show them in.
+"""
+import numpy as np
+
+class FeatureSchema:
+    """
+    Ordered score columns, with vectorized extraction into (n x columns) matrices.
+    """
+    def __init__(self, columns, labels, default=5.0, dtype=np.float32):
+        """
+        Args:
+            columns (list): Column names, in model input order.
+            labels (list): Display names of the columns, in the same order.
+            default (float, optional): Value of a score missing from a record.
+            dtype (numpy dtype, optional): Type of the extracted matrices.
+        """
+        self.columns = list(columns)
+        self.labels = list(labels)
+        self.default = default
+        self.dtype = dtype
+
+    def __len__(self):
+        return len(self.columns)
+
+    def positions(self, columns):
+        """
+        Returns the positions of `columns` in the schema, to reorder a matrix's columns.
+        """
+        return [self.columns.index(column) for column in columns]
+
+    def slider_keys(self, company_name):
+        """
+        Returns the session-state keys of a company's sliders, in column order.
+        """
+        return [f"slide{i}_{company_name}" for i in range(1, len(self.columns) + 1)]
+
+    def from_frame(self, frame, dtype=None):
+        """
+        Extracts the scores of every row of a DataFrame.
+
+        Returns:
+            np.ndarray: An (n x 11) matrix, in column order.
+        """
+        return frame[self.columns].to_numpy(dtype=dtype or self.dtype)
+
+    def from_records(self, records, dtype=None):
+        """
+        Extracts the scores of rows given as pd.Series or dicts; missing scores are `default`.
+
+        Meant for a few rows (the selected companies): building a DataFrame
+        from them costs more than reading each score. Use `from_frame` for
+        dataset rows.
+
+        Returns:
+            np.ndarray: An (n x 11) matrix, in column order.
+        """
+        return np.array([[record.get(column, self.default) for column in self.columns] for record in records],
+                        dtype=dtype or self.dtype).reshape(len(records), len(self.columns))
+
+    def from_sliders(self, session_state, company_names, dtype=None):
+        """
+        Extracts the slider values of companies from session state.
+
+        Returns:
+            np.ndarray: An (n x 11) matrix, one row per company, in column order.
+        """
+        return np.array([[session_state[key] for key in self.slider_keys(name)] for name in company_names],
+                        dtype=dtype or self.dtype).reshape(len(company_names), len(self.columns))
+
+    def set_sliders(self, session_state, company_name, row):
+        """
+        Sets a company's sliders to the scores of a row.
+        """
+        for key, column in zip(self.slider_keys(company_name), self.columns):
+            session_state[key] = float(row[column])
+
+    def key(self, values):
+        """
+        Returns a score vector as a tuple usable in cache keys.
+
+        Rounded so that the same scores give the same key whether they were
+        extracted as float32 or float64.
+        """
+        return tuple(round(float(value), 4) for value in values)
+
+FEATURES = FeatureSchema(
+    columns=[
+        'ENVIRONMENTAL_PILLAR_SCORE', 'GOVERNANCE_PILLAR_SCORE', 'SOCIAL_PILLAR_SCORE',
+        'CLIMATE_CHANGE_THEME_SCORE', 'BUSINESS_ETHICS_THEME_SCORE', 'HUMAN_CAPITAL_THEME_SCORE',
+        'HUMAN_CAPITAL_DEV_SCORE', 'ACCOUNTING_SCORE', 'BOARD_SCORE',
+        'OWNERSHIP_AND_CONTROL_SCORE', 'PAY_SCORE'
+    ],
+    labels=[
+        'Environmental Pillar Score', 'Governance Pillar Score', 'Social Pillar Score',
+        'Climate Change Theme Score', 'Business Ethics Theme Score', 'Human Capital Theme Score',
+        'Human Capital Dev Score', 'Accounting Score', 'Board Score',
+        'Ownership and Control Score', 'Pay Score'
+    ],
+)
+
+def _display_order(columns):
+    # The card and the charts show Social before Governance
+    order = list(columns)
+    social, governance = order.index('SOCIAL_PILLAR_SCORE'), order.index('GOVERNANCE_PILLAR_SCORE')
+    order[social], order[governance] = order[governance], order[social]
+    return order
+
+# The scores in display order, and the three pillars among them
+DISPLAY_COLUMNS = _display_order(FEATURES.columns)
+PILLAR_COLUMNS = [column for column in DISPLAY_COLUMNS if column.endswith('_PILLAR_SCORE')]
@@ -0,0 +1,145 @@
+"""
+Plotly figures shared by the app and the report generator.
+"""
+import copy
+from functools import lru_cache
+
+import numpy as np
+
+from features import DISPLAY_COLUMNS, FEATURES
+from instrumentation import timer
+
+def pillar_bars_figure(esg_values):
+    """
+    Builds the bar chart of the three pillar scores shown on the card.
+
+    Args:
+        esg_values (list): Environmental, Social and Governance pillar scores.
+
+    Returns:
+        go.Figure: The bar chart.
+    """
+    with timer("figure_build"):
+        import plotly.graph_objects as go  # deferred: not needed before the first figure
+        categories = ['Environmental', 'Social', 'Governance']
+        fig_bars = go.Figure(data=[
+            go.Bar(
+                y=esg_values,
+                x=categories,
+                orientation='v',
+                marker_color=['#2ca02c', '#1f77b4', '#ff7f0e'],
+                text=esg_values,
+                textposition='outside',
+                textfont=dict(size=18),  # Increase font size of the values inside the bars
+            )
+        ])
+
+        fig_bars.update_layout(
+            xaxis_title="Score (out of 10)",
+            yaxis=dict(range=[0, 10.5]),  # Extend Y-axis slightly for better spacing
+            xaxis=dict(
+                title=dict(
+                    text="Pillar Categories",  # X-axis label
+                    font=dict(size=18)  # Font size for the X-axis label
+                ),
+                tickfont=dict(size=16),  # Increase font size for the X-axis tick labels
+            ),
+            template="plotly_white",
+            height=400,
+            paper_bgcolor="#22222E",
+            plot_bgcolor="#22222E",
+            margin=dict(l=0, r=0, t=0, b=0),  # Set the margins to zero for better layout
+        )
+
+    return fig_bars
+
+@lru_cache(maxsize=1)
+def _pillar_bars_template():
+    return pillar_bars_figure([0.0, 0.0, 0.0]).to_plotly_json()
+
+def pillar_bars_spec(esg_values):
+    """
+    Returns the `pillar_bars_figure` of some scores as a plain figure dict.
+
+    Building and validating a `go.Figure` takes tens of milliseconds; the
+    dict is a copy of one template with the values filled in, for callers
+    that render many of them (see `company_report`).
+
+    Args:
+        esg_values (list): Environmental, Social and Governance pillar scores.
+
+    Returns:
+        dict: The figure, as accepted by `plotly.io.to_html(..., validate=False)`.
+    """
+    spec = copy.deepcopy(_pillar_bars_template())
+    spec["data"][0]["y"] = list(esg_values)
+    spec["data"][0]["text"] = [str(value) for value in esg_values]
+    return spec
+
+# Scores of the comparison chart, in display order
+COMPARISON_COLUMNS = DISPLAY_COLUMNS
+
+def comparison_figure(companies):
+    """
+    Builds the grouped bar chart comparing the eleven scores of several companies.
+
+    Args:
+        companies (list): The companies' rows (pd.Series or dicts); missing scores show as 5.
+
+    Returns:
+        go.Figure: The chart.
+    """
+    category_names = [
+        'Environmental', 'Social', 'Governance', 'Climate Change', 'Business Ethics',
+        'Human Capital', 'Human Capital Dev', 'Accounting', 'Board',
+        'Ownership & Control', 'Pay'
+    ]
+    # Pillars shown as on the card (Social before Governance), in float64 so the bar labels print as in the dataset
+    scores = FEATURES.from_records(companies, dtype=np.float64)[:, FEATURES.positions(COMPARISON_COLUMNS)]
+    with timer("figure_build"):
+        import plotly.graph_objects as go  # deferred: not needed before the first figure
+        fig_comparison = go.Figure()
+
+        for i, company in enumerate(companies):
+            company_name = company['Company_Name']
+            esg_values = scores[i].tolist()
+
+            # Color palette
+            colors = [
+                'rgb(31, 119, 180)', 'rgb(255, 127, 14)', 'rgb(44, 160, 44)', 'rgb(214, 39, 40)',
+                'rgb(148, 103, 189)', 'rgb(140, 86, 75)', 'rgb(227, 119, 194)', 'rgb(127, 127, 127)',
+                'rgb(188, 189, 34)', 'rgb(23, 190, 207)'
+            ]
+            color = colors[i % len(colors)]
+
+            fig_comparison.add_trace(go.Bar(
+                y=esg_values,
+                x=category_names,
+                name=company_name,
+                text=esg_values,
+                textposition='outside',
+                textfont=dict(size=14),
+                marker_color=color
+            ))
+
+        fig_comparison.update_layout(
+            xaxis_title="Categories",
+            yaxis=dict(range=[0, 10.5], title="Score (out of 10)"),
+            template="plotly_white",
+            height=600,
+            barmode='group',
+            paper_bgcolor="#22222E",
+            plot_bgcolor="#22222E",
+            font=dict(color="white"),
+            margin=dict(l=0, r=0, t=50, b=100),
+            legend_title="Companies",
+            legend=dict(
+                orientation="h",
+                yanchor="bottom",
+                y=-0.3,
+                xanchor="center",
+                x=0.5
+            )
+        )
+
+    return fig_comparison
@@ -0,0 +1,273 @@
+import logging
+import os
+import threading
+import time
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Off switch: CLARIFICATION_METRICS=0 turns every timer/counter into a no-op
+ENABLED = os.environ.get("CLARIFICATION_METRICS", "1").lower() not in ("0", "false", "off", "no")
+LOG_LEVEL = os.environ.get("CLARIFICATION_LOG_LEVEL", "WARNING").upper()
+METRICS_PREFIX = "clarification"
+
+_lock = threading.Lock()
+_counters = {}
+_gauges = {}
+_timers = {}  # name -> [count, total_seconds, max_seconds]
+_metrics_server = None
+
+_root_logger = logging.getLogger(METRICS_PREFIX)
+if not _root_logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("[%(asctime)s] %(levelname)s %(name)s: %(message)s", "%Y-%m-%d %H:%M:%S"))
+    _root_logger.addHandler(_handler)
+    _root_logger.setLevel(LOG_LEVEL)
+    _root_logger.propagate = False
+
+def get_logger(name):
+    """
+    Returns a leveled logger under the application namespace.
+
+    The level is controlled by the `CLARIFICATION_LOG_LEVEL` environment variable
+    (default `WARNING`), so debug messages cost a single level check when disabled.
+
+    Args:
+        name (str): The name of the module requesting the logger.
+
+    Returns:
+        logging.Logger: The `clarification.<name>` logger.
+    """
+    return logging.getLogger(f"{METRICS_PREFIX}.{name}")
+
+def increment(name, value=1):
+    """
+    Increments the counter `name` by `value`.
+    """
+    if not ENABLED:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+def set_gauge(name, value):
+    """
+    Sets the gauge `name` to `value`.
+    """
+    if not ENABLED:
+        return
+    with _lock:
+        _gauges[name] = value
+
+def observe(name, seconds):
+    """
+    Records a duration (in seconds) for the timer `name`.
+    """
+    if not ENABLED:
+        return
+    with _lock:
+        stats = _timers.get(name)
+        if stats is None:
+            _timers[name] = [1, seconds, seconds]
+        else:
+            stats[0] += 1
+            stats[1] += seconds
+            if seconds > stats[2]:
+                stats[2] = seconds
+
+class _Timer:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        observe(self.name, time.perf_counter() - self.start)
+        return False
+
+class _NoopTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+_NOOP_TIMER = _NoopTimer()
+
+def timer(name):
+    """
+    Context manager measuring the wall time of the enclosed block.
+
+    Args:
+        name (str): The timer name (exported as `clarification_<name>_seconds`).
+
+    Returns:
+        A context manager. When metrics are disabled a shared no-op object is returned.
+
+    Example:
+        >>> with timer("figure_build"):
+        ...     fig = go.Figure()
+    """
+    if not ENABLED:
+        return _NOOP_TIMER
+    return _Timer(name)
+
+def timed(name):
+    """
+    Decorator measuring every call of the wrapped function under the timer `name`.
+
+    When metrics are disabled the function is returned unchanged, so the
+    decorator has no runtime cost at all.
+
+    Args:
+        name (str): The timer name.
+
+    Returns:
+        callable: The decorator.
+    """
+    def decorator(func):
+        if not ENABLED:
+            return func
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                observe(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+def snapshot():
+    """
+    Returns a consistent copy of every metric collected so far.
+
+    Returns:
+        dict: `{"counters": {...}, "gauges": {...}, "timers": {name: {"count", "total", "max", "mean"}}}`.
+    """
+    with _lock:
+        timers = {
+            name: {"count": count, "total": total, "max": maximum, "mean": total / count}
+            for name, (count, total, maximum) in _timers.items()
+        }
+        return {"counters": dict(_counters), "gauges": dict(_gauges), "timers": timers}
+
+def reset():
+    """
+    Clears every collected metric.
+    """
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _timers.clear()
+
+def render_prometheus():
+    """
+    Renders the collected metrics in the Prometheus text exposition format.
+
+    Timers are exported as summaries (`_seconds_count`, `_seconds_sum`) plus a
+    `_seconds_max` gauge, counters as `_total` and gauges as is.
+
+    Returns:
+        str: The metrics page.
+    """
+    data = snapshot()
+    lines = []
+    for name, value in sorted(data["counters"].items()):
+        metric = f"{METRICS_PREFIX}_{name}_total"
+        lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric} {value}")
+    for name, value in sorted(data["gauges"].items()):
+        metric = f"{METRICS_PREFIX}_{name}"
+        lines.append(f"# TYPE {metric} gauge")
+        lines.append(f"{metric} {value}")
+    for name, stats in sorted(data["timers"].items()):
+        metric = f"{METRICS_PREFIX}_{name}_seconds"
+        lines.append(f"# TYPE {metric} summary")
+        lines.append(f"{metric}_count {stats['count']}")
+        lines.append(f"{metric}_sum {stats['total']:.6f}")
+        lines.append(f"# TYPE {metric}_max gauge")
+        lines.append(f"{metric}_max {stats['max']:.6f}")
+    return "\n".join(lines) + "\n"
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_metrics_server(port=None):
+    """
+    Serves `/metrics` in Prometheus format from a background thread.
+
+    The server is started at most once per process; the port defaults to the
+    `CLARIFICATION_METRICS_PORT` environment variable and nothing is started
+    when neither is set or metrics are disabled.
+
+    Args:
+        port (int, optional): The port to listen on.
+
+    Returns:
+        ThreadingHTTPServer or None: The running server.
+    """
+    global _metrics_server
+    if port is None:
+        port = os.environ.get("CLARIFICATION_METRICS_PORT")
+    if not ENABLED or not port:
+        return None
+
+    with _lock:
+        if _metrics_server is None:
+            try:
+                _metrics_server = ThreadingHTTPServer(("127.0.0.1", int(port)), _MetricsHandler)
+            except OSError as e:
+                get_logger("instrumentation").warning("Cannot start metrics server on port %s: %s", port, e)
+                return None
+            threading.Thread(target=_metrics_server.serve_forever, daemon=True).start()
+    return _metrics_server
+
+def render_debug_panel():
+    """
+    Renders the collected metrics in a sidebar debug panel.
+
+    Shows a table of timers (count, mean, max, total in milliseconds), the
+    counters and gauges, and a download button for the Prometheus page.
+
+    Returns:
+        None
+    """
+    import streamlit as st
+
+    data = snapshot()
+    with st.sidebar.expander("Debug metrics", expanded=True):
+        if not ENABLED:
+            st.write("Metrics are disabled (CLARIFICATION_METRICS=0).")
+            return
+
+        rows = [
+            {
+                "timer": name,
+                "count": stats["count"],
+                "mean (ms)": round(stats["mean"] * 1000, 2),
+                "max (ms)": round(stats["max"] * 1000, 2),
+                "total (ms)": round(stats["total"] * 1000, 2),
+            }
+            for name, stats in sorted(data["timers"].items())
+        ]
+        st.dataframe(rows, hide_index=True, use_container_width=True)
+        st.json({"counters": data["counters"], "gauges": data["gauges"]}, expanded=False)
+        st.download_button("Download Prometheus metrics", render_prometheus(), file_name="metrics.prom", mime="text/plain")
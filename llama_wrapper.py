@@ -1,6 +1,138 @@
 import requests
 import pandas as pd
 import json
+import re
+import time
+from data.database import read_dataset
+from features import FEATURES
+from instrumentation import get_logger, increment, observe, set_gauge
+
+try:
+    # Optional: several times faster than json on the many small chunks of a stream
+    from orjson import loads as _json_loads
+except ImportError:
+    _json_loads = json.loads
+
+logger = get_logger("llama_wrapper")
+
+# Fields of the last chunk of an Ollama stream kept by `StreamParser`
+STREAM_METADATA = ("eval_count", "eval_duration", "prompt_eval_count", "prompt_eval_duration", "total_duration", "load_duration")
+
+BULLET = re.compile(r"^\s*(?:[-*\u2022]|\d+[.)])\s+(.*)$")
+SECTION = re.compile(r"^[#*\s]*(strength|weakness)(?:es|s)?\b[*\s]*:?[*\s]*(.*)$", re.IGNORECASE)
+
+class StreamParser:
+    """
+    Incremental parser of the AI API's streamed response.
+
+    The response is a stream of JSON lines (NDJSON), split arbitrarily into
+    network chunks. The parser keeps the unfinished line of a chunk for the
+    next one, decodes each complete line once, and collects:
+        - the content pieces, joined only once by `text`;
+        - the metadata of the final line (`eval_count`, `eval_duration`, ...);
+        - the bullet points of the text in `items`, each parsed as soon as
+          its line of text is complete, as {"kind": "strength" | "weakness" | None, "text": str}.
+    """
+    def __init__(self):
+        self.parts = []
+        self.metadata = {}
+        self.items = []
+        self.bad_lines = 0
+        self._pending = b""
+        self._line = []
+        self._section = None
+
+    @property
+    def text(self) -> str:
+        return "".join(self.parts)
+
+    @property
+    def tokens_per_second(self):
+        """
+        Generation throughput reported by the model server, or None if it did not report it.
+        """
+        if self.metadata.get("eval_count") and self.metadata.get("eval_duration"):
+            return self.metadata["eval_count"] / (self.metadata["eval_duration"] / 1e9)
+        return None
+
+    def feed(self, data: bytes) -> list:
+        """
+        Parses a chunk of the response.
+
+        Args:
+            data (bytes): The next bytes received.
+
+        Returns:
+            list: The content pieces of the lines completed by this chunk.
+        """
+        lines = (self._pending + data).split(b"\n")
+        self._pending = lines.pop()
+        return [piece for piece in map(self._decode, lines) if piece]
+
+    def close(self) -> list:
+        """
+        Parses what is left once the response is complete.
+
+        Returns:
+            list: The content pieces of the last line, if it had no newline.
+        """
+        pieces = [piece for piece in [self._decode(self._pending)] if piece]
+        self._pending = b""
+        if self._line:
+            self._end_line("".join(self._line))
+            self._line = []
+        return pieces
+
+    def feed_text(self, content: str):
+        """
+        Adds analysis text, parsing the bullet points of its completed lines.
+        """
+        lines = content.split("\n")
+        self._line.append(lines[0])
+        for line in lines[1:]:
+            self._end_line("".join(self._line))
+            self._line = [line]
+
+    def _decode(self, line: bytes) -> str:
+        line = line.strip()
+        if not line:
+            return ""
+        try:
+            chunk = _json_loads(line)
+        except ValueError:
+            # json.JSONDecodeError and orjson.JSONDecodeError are both ValueErrors
+            self.bad_lines += 1
+            return ""
+        if chunk.get("done"):
+            self.metadata = {key: chunk[key] for key in STREAM_METADATA if key in chunk}
+        content = (chunk.get("message") or {}).get("content", "")
+        if content:
+            self.parts.append(content)
+            self.feed_text(content)
+        return content
+
+    def _end_line(self, line: str):
+        bullet = BULLET.match(line)
+        section = SECTION.match(bullet.group(1) if bullet else line)
+        if section:
+            kind = "strength" if section.group(1).lower().startswith("strength") else "weakness"
+            text = section.group(2).strip(" *")
+            if not text:
+                # A heading ("**Strengths:**", "- Weaknesses:") for the bullets that follow
+                self._section = kind
+                return
+            self.items.append({"kind": kind, "text": text})
+        elif bullet:
+            self.items.append({"kind": self._section, "text": bullet.group(1).strip(" *")})
+
+def parse_bullets(text: str) -> list:
+    """
+    Returns the bullet points of a complete analysis, as `StreamParser.items`.
+    """
+    parser = StreamParser()
+    parser.feed_text(text)
+    parser.close()
+    return parser.items
 
 class CompanyAnalyzer:
     """
@@ -19,6 +151,9 @@ class CompanyAnalyzer:
         _get_row_data(row: pd.Series) -> dict:
             Extracts required columns from a given row, ensuring safe access.
 
+        stream(row_data: pd.Series, parser: StreamParser = None):
+            Sends company data to the AI API and yields the analysis as it is written.
+
         analyze(row_data: pd.Series) -> str:
             Sends company data to the AI API and returns a structured analysis.
     """
@@ -29,23 +164,28 @@ class CompanyAnalyzer:
         Args:
             api_url (str): The endpoint URL of the AI API.
             model_name (str): The name of the AI model to use.
-            csv_path (str): Path to the CSV file containing company data.
+            csv_path (str): Path to the dataset (.csv, .parquet or .feather) containing company data.
+                The file is only read when `df` is first accessed.
+        """
+        self.api_url = api_url
+        self.model_name = model_name
+        self.required_columns = ['Company_Name', 'IVA_COMPANY_RATING', 'IVA_RATING_ANALYSIS'] + FEATURES.columns
+        self.csv_path = csv_path
+        self._df = None
+
+    @property
+    def df(self) -> pd.DataFrame:
+        """
+        The company dataset, read on first access rather than at construction.
 
         Raises:
-            FileNotFoundError: If the CSV file cannot be found.
+            FileNotFoundError: If the dataset file cannot be found.
             pd.errors.ParserError: If the CSV file cannot be parsed properly.
         """
-        self.api_url = api_url
-        self.model_name = model_name
-        self.required_columns = [
-            'Company_Name', 'IVA_COMPANY_RATING', 'IVA_RATING_ANALYSIS',
-            'ENVIRONMENTAL_PILLAR_SCORE', 'GOVERNANCE_PILLAR_SCORE',
-            'SOCIAL_PILLAR_SCORE', 'CLIMATE_CHANGE_THEME_SCORE',
-            'BUSINESS_ETHICS_THEME_SCORE', 'HUMAN_CAPITAL_THEME_SCORE',
-            'HUMAN_CAPITAL_DEV_SCORE', 'ACCOUNTING_SCORE', 'BOARD_SCORE',
-            'OWNERSHIP_AND_CONTROL_SCORE', 'PAY_SCORE'
-        ]
-        self.df = pd.read_csv(csv_path)
+        if self._df is None:
+            self._df = read_dataset(self.csv_path)
+        return self._df
+
     def _get_row_data(self, row: pd.Series) -> dict:
         """
         Safely extracts all required data from a row.
@@ -58,30 +198,24 @@ class CompanyAnalyzer:
         """
         return {col: row[col] if col in row else "N/A" for col in self.required_columns}
 
-    def analyze(self, row_data: pd.Series) -> str:
+    def stream(self, row_data: pd.Series, parser: StreamParser = None):
         """
-        Analyzes a company's financial and governance data using an AI model.
-
-        This function constructs a prompt using the company's scores and
-        sends it to the AI API for analysis. The response is processed
-        as a bullet list of strengths and weaknesses.
+        Streams the analysis of a company as the AI model writes it.
 
         Args:
             row_data (pd.Series): A row containing company-specific data.
+            parser (StreamParser, optional): Parser of the response, for callers
+                that also want its bullet points or metadata; a new one by default.
 
-        Returns:
-            str: A text-based AI-generated analysis of the company.
+        Yields:
+            str: The next piece of the analysis text.
 
         Raises:
             requests.exceptions.RequestException: If the API call fails.
-            json.JSONDecodeError: If the API response is not valid JSON.
-
-        Example:
-            >>> company_analyzer = CompanyAnalyzer("https://api.example.com", "llama-model", "data.csv")
-            >>> row = company_analyzer.df.iloc[0]
-            >>> analysis = company_analyzer.analyze(row)
-            >>> print(analysis)
         """
+        start = time.perf_counter()
+        increment("llm_requests")
+        parser = parser if parser is not None else StreamParser()
         try:
 
             # Build prompt
@@ -106,16 +240,65 @@ class CompanyAnalyzer:
             )
 
             # Process streamed response
-            full_response = ""
-            for line in response.iter_lines():
-                if line:
-                    try:
-                        chunk = json.loads(line)
-                        full_response += chunk.get("message", {}).get("content", "")
-                    except json.JSONDecodeError:
-                        continue
+            first_token_at = None
+            pieces_count = 0
+            for data in response.iter_content(chunk_size=None):
+                for piece in parser.feed(data):
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                        observe("llm_ttft", first_token_at - start)
+                    pieces_count += 1
+                    yield piece
+            for piece in parser.close():
+                pieces_count += 1
+                yield piece
+
+            elapsed = time.perf_counter() - start
+            tokens = parser.metadata.get("eval_count") or pieces_count
+            observe("llm_analyze", elapsed)
+            increment("llm_tokens", tokens)
+            if parser.bad_lines:
+                increment("llm_bad_lines", parser.bad_lines)
+            if parser.metadata.get("eval_duration"):
+                observe("llm_eval", parser.metadata["eval_duration"] / 1e9)
+            tokens_per_second = parser.tokens_per_second
+            if tokens_per_second is None and first_token_at is not None and elapsed > first_token_at - start:
+                tokens_per_second = tokens / (elapsed - (first_token_at - start))
+            if tokens_per_second is not None:
+                set_gauge("llm_tokens_per_second", tokens_per_second)
+            logger.debug("Analysis for %s: %d tokens, %d bullet points in %.2fs",
+                         row_data['Company_Name'], tokens, len(parser.items), elapsed)
+
+        except Exception:
+            increment("llm_errors")
+            raise
 
-            return full_response or "No analysis generated"
+    def analyze(self, row_data: pd.Series) -> str:
+        """
+        Analyzes a company's financial and governance data using an AI model.
+
+        This function constructs a prompt using the company's scores and
+        sends it to the AI API for analysis. The response is processed
+        as a bullet list of strengths and weaknesses.
+
+        Args:
+            row_data (pd.Series): A row containing company-specific data.
+
+        Returns:
+            str: A text-based AI-generated analysis of the company.
+
+        Example:
+            >>> company_analyzer = CompanyAnalyzer("https://api.example.com", "llama-model", "data.csv")
+            >>> row = company_analyzer.df.iloc[0]
+            >>> analysis = company_analyzer.analyze(row)
+            >>> print(analysis)
+        """
+        try:
+            parser = StreamParser()
+            for _ in self.stream(row_data, parser):
+                pass
+            return parser.text or "No analysis generated"
 
         except Exception as e:
+            logger.warning("Analysis failed for %s: %s", row_data.get('Company_Name', 'N/A'), e)
             return f"Analysis failed: {str(e)}"
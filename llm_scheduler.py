@@ -0,0 +1,128 @@
+"""
+Admission control and priorities for the LLM.
+
+Every session (and the REST service) sends its analyses to the same local
+Ollama instance, which runs one or two generations at a time and queues the
+rest: a burst of "Read analysis" clicks makes every user wait for all the
+others. The `LLMScheduler` lets at most `max_concurrent` analyses reach the
+LLM, queues the others by priority (interactive dialogs ahead of batch
+analyses, then first come first served), and gives up on requests that would
+wait longer than the budget or join a queue that is already too long, so the
+caller can fall back to the published analysis.
+"""
+import heapq
+import itertools
+import threading
+import time
+
+import config
+from instrumentation import get_logger, increment, observe, set_gauge
+
+logger = get_logger("llm_scheduler")
+
+INTERACTIVE = 0
+BATCH = 1
+
+class LLMScheduler:
+    """
+    Stands in for a `CompanyAnalyzer`, limiting and ordering its concurrent calls.
+
+    Exposes `model_name`, `stream` and `analyze`.
+    """
+    def __init__(self, analyzer, max_concurrent=config.LLM_MAX_CONCURRENT, wait_seconds=config.LLM_WAIT_SECONDS,
+                 max_queued=config.LLM_MAX_QUEUED):
+        """
+        Args:
+            analyzer (CompanyAnalyzer): The LLM client.
+            max_concurrent (int, optional): Analyses sent to the LLM at the same time.
+            wait_seconds (float, optional): Longest wait for a slot before giving up.
+            max_queued (int, optional): Waiting analyses above which new ones give up at once.
+        """
+        self.analyzer = analyzer
+        self.max_concurrent = max_concurrent
+        self.wait_seconds = wait_seconds
+        self.max_queued = max_queued
+        self._active = 0
+        self._waiting = []  # heap of (priority, arrival)
+        self._arrivals = itertools.count()
+        self._condition = threading.Condition()
+
+    @property
+    def model_name(self):
+        return self.analyzer.model_name
+
+    def _acquire(self, priority, wait_seconds):
+        with self._condition:
+            if len(self._waiting) >= self.max_queued:
+                increment("llm_rejected")
+                raise TimeoutError(f"{len(self._waiting)} analyses already waiting for the LLM")
+            entry = (priority, next(self._arrivals))
+            heapq.heappush(self._waiting, entry)
+            self._update_gauges()
+            start = time.perf_counter()
+            deadline = start + wait_seconds
+            try:
+                while self._active >= self.max_concurrent or self._waiting[0] != entry:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        increment("llm_rejected")
+                        raise TimeoutError(f"No LLM slot within {wait_seconds:g}s")
+                    self._condition.wait(remaining)
+                self._active += 1
+            finally:
+                self._waiting.remove(entry)
+                heapq.heapify(self._waiting)
+                self._update_gauges()
+                # The head may have changed (this request left the queue or took a slot)
+                self._condition.notify_all()
+        observe("llm_queue_wait", time.perf_counter() - start)
+
+    def _release(self):
+        with self._condition:
+            self._active -= 1
+            self._update_gauges()
+            self._condition.notify_all()
+
+    def _update_gauges(self):
+        set_gauge("llm_queue_depth", len(self._waiting))
+        set_gauge("llm_active", self._active)
+
+    def stream(self, row_data, parser=None, priority=INTERACTIVE, wait_seconds=None):
+        """
+        Streams the analysis of a company once a slot is free.
+
+        Args:
+            row_data (pd.Series): A row containing company-specific data.
+            parser (StreamParser, optional): Passed on to `CompanyAnalyzer.stream`.
+            priority (int, optional): `INTERACTIVE` or `BATCH`; lower goes first.
+            wait_seconds (float, optional): Overrides the wait budget.
+
+        Yields:
+            str: The next piece of the analysis text.
+
+        Raises:
+            TimeoutError: If no slot was free within the budget, or the queue is full.
+        """
+        self._acquire(priority, self.wait_seconds if wait_seconds is None else wait_seconds)
+        try:
+            yield from self.analyzer.stream(row_data, parser)
+        finally:
+            self._release()
+
+    def analyze(self, row_data, priority=INTERACTIVE, wait_seconds=None):
+        """
+        Analyzes a company once a slot is free, as `CompanyAnalyzer.analyze`.
+
+        Returns:
+            str or None: The analysis, an "Analysis failed: ..." message, or
+            None when the LLM is too busy to answer within the budget.
+        """
+        try:
+            self._acquire(priority, self.wait_seconds if wait_seconds is None else wait_seconds)
+        except TimeoutError as e:
+            logger.info("Analysis of %s skipped: %s", row_data.get('Company_Name', 'N/A'), e)
+            return None
+        try:
+            return self.analyzer.analyze(row_data)
+        finally:
+            self._release()
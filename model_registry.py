@@ -0,0 +1,341 @@
+"""
+Registry of versioned model bundles.
+
+Each bundle is a directory holding a model, its scaler and a `metadata.json`
+with the feature order, the classes and the checksums of both pickles:
+
+    ml-model/registry/v1/model.pkl
+    ml-model/registry/v1/scaler.pkl
+    ml-model/registry/v1/metadata.json
+
+Bundles are registered and compared from the command line:
+
+    python -m model_registry register --model ml-model/model.pkl --scaler ml-model/scaler.pkl
+    python -m model_registry list
+    python -m model_registry compare v1 v2 --dataset data/df_demo.csv
+
+The app serves `CLARIFICATION_MODEL_VERSION` (the latest bundle by default)
+and, when `CLARIFICATION_SHADOW_MODEL_VERSION` is set, runs that version in
+the shadow of every prediction and records how often the two agree.
+"""
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+
+from features import FEATURES
+from instrumentation import get_logger, increment, timer
+from ml_model import ModelInterface
+
+logger = get_logger("model_registry")
+
+METADATA_FILE = "metadata.json"
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _checksum(model_sha256, scaler_sha256):
+    return hashlib.sha256(f"{model_sha256}:{scaler_sha256}".encode("ascii")).hexdigest()
+
+def file_checksum(model_path, scaler_path=None):
+    """
+    Returns the checksum a model and its scaler would have as a registered bundle.
+
+    Args:
+        model_path (str): The model pickle.
+        scaler_path (str, optional): The scaler pickle; `scaler.pkl` next to the model by default.
+    """
+    scaler_path = scaler_path or os.path.join(os.path.dirname(model_path), "scaler.pkl")
+    return _checksum(_sha256(model_path), _sha256(scaler_path))
+
+class ModelRegistry:
+    """
+    Versioned model bundles on disk, loaded once and kept warm in the process.
+    """
+    def __init__(self, root):
+        """
+        Args:
+            root (str): The registry directory; created on the first registration.
+        """
+        self.root = root
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def versions(self):
+        """
+        Returns the metadata of every bundle, oldest first.
+        """
+        if not os.path.isdir(self.root):
+            return []
+        bundles = []
+        for version in os.listdir(self.root):
+            path = os.path.join(self.root, version, METADATA_FILE)
+            if os.path.exists(path):
+                with open(path) as file:
+                    bundles.append(json.load(file))
+        return sorted(bundles, key=lambda metadata: metadata["created"])
+
+    def latest(self):
+        """
+        Returns the most recently registered version, or None if the registry is empty.
+        """
+        versions = self.versions()
+        return versions[-1]["version"] if versions else None
+
+    def register(self, model_path, scaler_path, version=None, description=""):
+        """
+        Copies a model and its scaler into a new bundle.
+
+        The feature order is read from the scaler when it was fitted on a
+        DataFrame, and is otherwise assumed to be `FEATURES.columns`.
+
+        Args:
+            model_path (str): The model pickle.
+            scaler_path (str): The scaler pickle it was trained with.
+            version (str, optional): The version name; `v<n>` by default.
+            description (str, optional): Free text stored in the metadata.
+
+        Returns:
+            dict: The metadata of the new bundle.
+
+        Raises:
+            ValueError: If the version already exists.
+        """
+        interface = ModelInterface(model_path, scaler_path)
+        version = version or f"v{len(self.versions()) + 1}"
+        directory = os.path.join(self.root, version)
+        if os.path.exists(directory):
+            raise ValueError(f"Model version {version} already exists in {self.root}")
+
+        n_features = getattr(interface.scaler, "n_features_in_", len(FEATURES))
+        features = getattr(interface.scaler, "feature_names_in_", FEATURES.columns[:n_features])
+        model_sha256, scaler_sha256 = _sha256(model_path), _sha256(scaler_path)
+        metadata = {
+            "version": version,
+            "description": description,
+            "created": datetime.datetime.now().isoformat(timespec="microseconds"),
+            "model_type": f"{type(interface.model).__module__}.{type(interface.model).__name__}",
+            "features": [str(feature) for feature in features],
+            "classes": np.asarray(interface.model.classes_).tolist(),
+            "model_sha256": model_sha256,
+            "scaler_sha256": scaler_sha256,
+            "checksum": _checksum(model_sha256, scaler_sha256),
+            "source": {"model": model_path, "scaler": scaler_path},
+        }
+
+        os.makedirs(self.root, exist_ok=True)
+        staging = directory + ".tmp"
+        os.makedirs(staging)
+        shutil.copyfile(model_path, os.path.join(staging, "model.pkl"))
+        shutil.copyfile(scaler_path, os.path.join(staging, "scaler.pkl"))
+        with open(os.path.join(staging, METADATA_FILE), "w") as file:
+            json.dump(metadata, file, indent=2)
+        os.replace(staging, directory)
+        logger.info("Registered model %s (%s)", version, metadata["checksum"][:12])
+        return metadata
+
+    def metadata(self, version):
+        with open(os.path.join(self.root, version, METADATA_FILE)) as file:
+            return json.load(file)
+
+    def get(self, version=None):
+        """
+        Returns the loaded model of a version (the latest by default).
+
+        Each version is loaded once, after its checksums are verified, and
+        then kept in memory alongside the others.
+
+        Args:
+            version (str, optional): The version to load.
+
+        Returns:
+            ModelInterface: The model, with its bundle metadata as `metadata`.
+
+        Raises:
+            ValueError: If the registry is empty or a pickle does not match its checksum.
+        """
+        version = version or self.latest()
+        if version is None:
+            raise ValueError(f"No model registered in {self.root}")
+        with self._lock:
+            if version not in self._models:
+                metadata = self.metadata(version)
+                directory = os.path.join(self.root, version)
+                model_path, scaler_path = os.path.join(directory, "model.pkl"), os.path.join(directory, "scaler.pkl")
+                if file_checksum(model_path, scaler_path) != metadata["checksum"]:
+                    raise ValueError(f"Model version {version} does not match its checksum")
+                with timer("model_load"):
+                    interface = ModelInterface(model_path, scaler_path)
+                interface.metadata = metadata
+                self._models[version] = interface
+                logger.debug("Model %s loaded", version)
+            return self._models[version]
+
+    def predict(self, input_data, version=None):
+        """
+        Routes a prediction to a version (the latest by default).
+        """
+        return self.get(version).predict(input_data)
+
+    def shadow_proba(self, input_data, primary, shadow):
+        """
+        Runs two versions on the same inputs.
+
+        When both are linear threshold models (such as `LogisticAT`) over the
+        same features, the inputs are scaled once per distinct scaler and both
+        linear predictors come out of a single matrix product; other models
+        are run one after the other.
+
+        Args:
+            input_data (array-like): Rows of features, in the bundles' feature order.
+            primary (str): The version whose predictions are served.
+            shadow (str): The version run alongside.
+
+        Returns:
+            tuple: The probability vectors of the primary and of the shadow version.
+        """
+        models = [self.get(primary), self.get(shadow)]
+        input_data = np.asarray(input_data, dtype=np.float64)
+        with timer("model_shadow_predict"):
+            if not all(_is_threshold_model(m) for m in models) or models[0].metadata["features"] != models[1].metadata["features"]:
+                return tuple(m.predict_proba(input_data) for m in models)
+
+            scaled = {}
+            for m in models:
+                if m.metadata["scaler_sha256"] not in scaled:
+                    scaled[m.metadata["scaler_sha256"]] = m.scaler.transform(input_data)
+            if len(scaled) == 1:
+                # One scaler: both linear predictors in one product
+                predictors = next(iter(scaled.values())) @ np.column_stack([m.model.coef_ for m in models])
+            else:
+                predictors = np.column_stack([scaled[m.metadata["scaler_sha256"]] @ m.model.coef_ for m in models])
+            probabilities = tuple(_threshold_proba(predictors[:, i], m.model.theta_) for i, m in enumerate(models))
+        increment("model_predict_rows", 2 * len(input_data))
+        return probabilities
+
+def _is_threshold_model(interface):
+    coef = getattr(interface.model, "coef_", None)
+    return coef is not None and np.ndim(coef) == 1 and hasattr(interface.model, "theta_")
+
+def _threshold_proba(predictor, theta):
+    # Same as mord's threshold_proba, from an already computed X.w
+    cumulative = 1.0 / (1.0 + np.exp(-(theta[:, None] - predictor)))
+    cumulative = np.pad(cumulative.T, pad_width=((0, 0), (1, 1)), mode="constant", constant_values=(0, 1))
+    return np.diff(cumulative)
+
+class ShadowModel:
+    """
+    Serves one version and runs another in its shadow.
+
+    Exposes the `ModelInterface` prediction methods, so it can stand in for
+    the served model; agreement between the two versions is recorded in the
+    `model_shadow_rows` and `model_shadow_disagreements` counters.
+    """
+    def __init__(self, registry, primary, shadow):
+        self.registry = registry
+        self.primary = primary
+        self.shadow = shadow
+        self.served = registry.get(primary)
+        self.metadata = self.served.metadata
+
+    def predict_proba(self, input_data):
+        probabilities, shadow_probabilities = self.registry.shadow_proba(input_data, self.primary, self.shadow)
+        disagreements = int((probabilities.argmax(axis=1) != shadow_probabilities.argmax(axis=1)).sum())
+        increment("model_shadow_rows", len(probabilities))
+        increment("model_shadow_disagreements", disagreements)
+        if disagreements:
+            logger.info("Shadow %s disagrees with %s on %d of %d rows", self.shadow, self.primary, disagreements, len(probabilities))
+        return probabilities
+
+    def summarize(self, probabilities, k=2):
+        return self.served.summarize(probabilities, k)
+
+    def predict_distribution(self, input_data, k=2):
+        return self.summarize(self.predict_proba(input_data), k)
+
+    def top_k(self, input_data, k=2):
+        prediction = self.predict_distribution(input_data, k)
+        return prediction["classes"], prediction["confidences"]
+
+    def predict(self, input_data):
+        classes, _ = self.top_k(input_data, 2)
+        return classes
+
+    def sensitivity(self, input_row, steps=101, low=0.0, high=10.0):
+        return self.served.sensitivity(input_row, steps, low, high)
+
+def load_served_model(registry, model_path, version=None, shadow=None):
+    """
+    Loads the model the app serves.
+
+    Args:
+        registry (ModelRegistry): The registry.
+        model_path (str): The model pickle used while the registry is empty.
+        version (str, optional): The served version; the latest by default.
+        shadow (str, optional): A version to run in the shadow of the served one;
+            ignored, with a warning, while the registry is empty.
+
+    Returns:
+        ModelInterface or ShadowModel: The model; its `metadata` holds at least
+        the `version` and the `checksum`.
+    """
+    if version is None and registry.latest() is None:
+        if shadow:
+            logger.warning("Shadow model %s not run: no model is registered in %s, serving %s", shadow, registry.root, model_path)
+            increment("model_shadow_unavailable")
+        model = ModelInterface(model_path)
+        model.metadata = {"version": None, "checksum": file_checksum(model_path)}
+        return model
+    if shadow:
+        return ShadowModel(registry, version or registry.latest(), shadow)
+    return registry.get(version)
+
+def main():
+    import config
+    from data.database import read_dataset
+
+    parser = argparse.ArgumentParser(description="Manage the versioned model bundles.")
+    parser.add_argument("--registry", default=config.MODEL_REGISTRY_PATH, help="Registry directory.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    register = commands.add_parser("register", help="Register a model and its scaler as a new version.")
+    register.add_argument("--model", required=True)
+    register.add_argument("--scaler", required=True)
+    register.add_argument("--version")
+    register.add_argument("--description", default="")
+    commands.add_parser("list", help="List the registered versions.")
+    compare = commands.add_parser("compare", help="Shadow-run two versions over a dataset.")
+    compare.add_argument("primary")
+    compare.add_argument("shadow")
+    compare.add_argument("--dataset", default=config.DATASET_PATH)
+    args = parser.parse_args()
+
+    registry = ModelRegistry(args.registry)
+    if args.command == "register":
+        metadata = registry.register(args.model, args.scaler, args.version, args.description)
+        print(f"Registered {metadata['version']} ({metadata['checksum'][:12]})")
+    elif args.command == "list":
+        for metadata in registry.versions():
+            print(f"{metadata['version']:<8} {metadata['created'][:19]}  {metadata['model_type']:<40} {metadata['checksum'][:12]}  {metadata['description']}")
+    else:
+        features = registry.get(args.primary).metadata["features"]
+        input_data = read_dataset(args.dataset)[features].to_numpy(dtype=np.float64)
+        start = time.perf_counter()
+        probabilities = registry.shadow_proba(input_data, args.primary, args.shadow)
+        seconds = time.perf_counter() - start
+        primary, shadow = (registry.get(version).summarize(p)["classes"] for version, p in zip((args.primary, args.shadow), probabilities))
+        agreement = (primary[:, 0] == shadow[:, 0]).mean()
+        print(f"{len(input_data)} rows in {seconds * 1000:.1f}ms: top-1 agreement {agreement:.1%}, "
+              f"top-2 overlap {(np.sort(primary, axis=1) == np.sort(shadow, axis=1)).all(axis=1).mean():.1%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import math
+import streamlit as st
+
+st.set_page_config(page_title="ClarificatION - Discrepancies", page_icon=":chart_with_upwards_trend:", layout="wide")
+
+import config
+import resources
+from discrepancy_report import build_report, read_page, read_summary
+
+PAGE_SIZE = 50
+
+st.markdown("## Model vs. actual rating")
+st.caption("Companies ranked by the distance, in notches, between the model's top prediction and their rating.")
+
+report_path = config.DISCREPANCY_REPORT_PATH
+
+if st.button("Score the whole universe", type="primary"):
+    progress = st.progress(0.0, text="Scoring...")
+    summary = read_summary(report_path)
+    expected = summary["rows"] if summary else None
+
+    def on_progress(rows):
+        fraction = min(rows / expected, 1.0) if expected else 0.0
+        progress.progress(fraction, text=f"Scored {rows:,} companies")
+
+    build_report(resources.get_model(), config.DATASET_PATH, report_path, on_progress=on_progress)
+    progress.empty()
+
+summary = read_summary(report_path)
+if summary is None:
+    st.info(f"No report yet. Click the button above or run `python -m discrepancy_report` to write {report_path}.")
+    st.stop()
+
+counts = summary["counts"]
+exact = sum(count for key, count in counts.items() if key.startswith("0|"))
+in_top_2 = sum(count for key, count in counts.items() if key.endswith("|True"))
+col1, col2, col3, col4 = st.columns(4)
+rows = summary["rows"]
+unknown = summary.get("unknown", 0)  # absent from reports written before it was recorded
+rated = rows - unknown
+speed = summary["rows_per_second"]
+col1.metric("Companies", f"{rows:,}")
+col2.metric("Exact match", f"{exact / rated:.1%}" if rated else "-")
+col3.metric("Rating in top 2", f"{in_top_2 / rated:.1%}" if rated else "-")
+col4.metric("Scoring speed", f"{speed:,} rows/s" if speed is not None else "-")
+caption = f"Report of {summary['dataset']} written on {summary['created']}."
+if unknown:
+    caption += f" {unknown:,} companies without a known rating are ranked last and left out of the shares."
+st.caption(caption)
+
+pages = max(1, math.ceil(rows / PAGE_SIZE))
+page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, step=1, key="discrepancy_page")
+st.dataframe(read_page(report_path, (page - 1) * PAGE_SIZE, PAGE_SIZE), use_container_width=True)
@@ -0,0 +1,171 @@
+"""
+Opt-in profiling of the app's reruns.
+
+With `CLARIFICATION_PROFILE=1`, or `?profile=1` in the page URL, every run of
+`main.py` is recorded by cProfile and written to `CLARIFICATION_PROFILE_DIR`
+as a `.prof` file, keeping the newest `CLARIFICATION_PROFILE_KEEP`. Open one
+with `python -m pstats <file>`, or as a flame graph with snakeviz or
+flameprof. The sidebar shows the slowest reruns of the process, with the time
+spent in each part of the page:
+
+    get_card_data, companies_comparator, company_card,
+    predict (model calls, including the wait on the micro-batcher),
+    analyze (LLM calls, including the wait for a scheduler slot)
+
+Only the script thread is profiled: model batches run on the micro-batcher's
+thread and show up as the time the script waited for them. Widget callbacks
+(`update_model` when a slider moves) run before the script starts and are
+not part of the rerun's profile.
+"""
+import cProfile
+import os
+import pstats
+import threading
+import time
+
+import config
+from instrumentation import get_logger, increment
+
+logger = get_logger("profiling")
+
+# Parts of the page: (file, function) pairs whose time is attributed to each
+SECTIONS = {
+    "get_card_data": [("database.py", "get_card_data")],
+    "companies_comparator": [("companies_comparator.py", "companies_comparator")],
+    "company_card": [("company_card.py", "company_card")],
+    "predict": [(file, function) for file in ("ml_model.py", "batching.py")
+                for function in ("predict", "predict_proba", "predict_distribution", "top_k", "sensitivity")],
+    "analyze": [(file, function) for file in ("llama_wrapper.py", "llm_scheduler.py") for function in ("analyze", "stream")],
+}
+
+_active = {}  # thread id -> profiler of the rerun running on that thread
+_summaries = []
+_lock = threading.Lock()
+
+def enabled(query_params):
+    """
+    Tells whether this rerun is profiled: by the environment, or by `?profile=1`.
+    """
+    return config.PROFILE_ENABLED or query_params.get("profile") == "1"
+
+def start_rerun():
+    """
+    Starts profiling the current rerun.
+
+    A profiler left running on this thread by a rerun that never reached
+    `finish_rerun` is dropped here. From Python 3.12 only one profiler can be
+    active in the process: while another session's rerun (or a debugger) is
+    being profiled, this rerun is not.
+
+    Returns:
+        cProfile.Profile or None: The profiler, to pass to `finish_rerun`, or
+        None if the rerun cannot be profiled.
+    """
+    thread_id = threading.get_ident()
+    leftover = _active.pop(thread_id, None)
+    if leftover is not None:
+        leftover.disable()
+        increment("profile_interrupted")
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError as e:
+        increment("profile_skipped")
+        logger.debug("Rerun not profiled: %s", e)
+        return None
+    _active[thread_id] = profiler
+    return profiler
+
+def section_times(stats):
+    """
+    Attributes the profiled time to the page sections.
+
+    A section's time is the cumulative time of its functions, minus the
+    calls between them (`predict_distribution` calling `predict_proba` is
+    counted once).
+
+    Args:
+        stats (pstats.Stats): The rerun's profile.
+
+    Returns:
+        dict: Seconds per section of `SECTIONS`.
+    """
+    times = {}
+    for section, targets in SECTIONS.items():
+        matched = {
+            func: entry for func, entry in stats.stats.items()
+            if (os.path.basename(func[0]), func[2]) in targets
+        }
+        total = 0.0
+        for func, (_, _, _, cumulative, callers) in matched.items():
+            nested = sum(caller_stats[3] for caller, caller_stats in callers.items() if caller in matched and caller != func)
+            total += cumulative - nested
+        times[section] = total
+    return times
+
+def finish_rerun(profiler, elapsed, label=""):
+    """
+    Stops profiling the rerun, writes its profile and records its summary.
+
+    Args:
+        profiler (cProfile.Profile): The profiler returned by `start_rerun`.
+        elapsed (float): The rerun's wall-clock duration, in seconds.
+        label (str, optional): What the rerun showed, e.g. the selected companies.
+
+    Returns:
+        dict: The rerun's summary: time, duration, seconds per section and profile path.
+    """
+    profiler.disable()
+    _active.pop(threading.get_ident(), None)
+    os.makedirs(config.PROFILE_DIR, exist_ok=True)
+    path = os.path.join(config.PROFILE_DIR, f"rerun_{time.strftime('%Y%m%d_%H%M%S')}_{time.time_ns() % 10**9:09d}_{elapsed * 1000:.0f}ms.prof")
+    stats = pstats.Stats(profiler)
+    stats.dump_stats(path)
+    _rotate(config.PROFILE_DIR, config.PROFILE_KEEP)
+
+    summary = {"time": time.strftime("%H:%M:%S"), "total": elapsed, **section_times(stats), "label": label, "profile": path}
+    with _lock:
+        _summaries.append(summary)
+        _summaries.sort(key=lambda s: s["total"], reverse=True)
+        del _summaries[max(config.PROFILE_KEEP, 0):]
+    increment("profile_reruns")
+    logger.debug("Rerun profiled in %s (%.0f ms)", path, elapsed * 1000)
+    return summary
+
+def _rotate(directory, keep):
+    profiles = sorted(
+        (entry for entry in os.scandir(directory) if entry.name.endswith(".prof")),
+        key=lambda entry: entry.stat().st_mtime,
+    )
+    for entry in profiles[:max(len(profiles) - keep, 0)]:
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
+
+def slowest_reruns(limit=10):
+    """
+    Returns the summaries of the slowest profiled reruns of this process, slowest first.
+    """
+    with _lock:
+        return list(_summaries[:limit])
+
+def render_profile_panel(limit=10):
+    """
+    Renders the slowest profiled reruns in a sidebar table, in milliseconds.
+    """
+    import streamlit as st
+
+    with st.sidebar.expander("Slowest reruns", expanded=True):
+        rows = [
+            {
+                "time": summary["time"],
+                "total (ms)": round(summary["total"] * 1000, 1),
+                **{f"{section} (ms)": round(summary[section] * 1000, 1) for section in SECTIONS},
+                "companies": summary["label"],
+                "profile": os.path.basename(summary["profile"]),
+            }
+            for summary in slowest_reruns(limit)
+        ]
+        st.dataframe(rows, hide_index=True, use_container_width=True)
+        st.caption(f"Profiles in {config.PROFILE_DIR}; open with `python -m pstats` or snakeviz.")
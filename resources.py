@@ -0,0 +1,102 @@
+import streamlit as st
+import config
+from instrumentation import get_logger, timer
+
+logger = get_logger("resources")
+
+@st.cache_resource
+def get_registry():
+    """
+    Returns the process-wide model registry, which keeps the loaded versions warm.
+    """
+    from model_registry import ModelRegistry
+    return ModelRegistry(config.MODEL_REGISTRY_PATH)
+
+@st.cache_resource
+def get_batcher():
+    """
+    Returns the process-wide model, behind a `MicroBatcher` shared by every session.
+
+    The model is the registry's `CLARIFICATION_MODEL_VERSION` (the latest by
+    default), shadowed by `CLARIFICATION_SHADOW_MODEL_VERSION` if set; while
+    the registry is empty it is loaded from `CLARIFICATION_MODEL`. Predictions
+    that sessions request at the same time are stacked into one model call.
+    """
+    from batching import MicroBatcher
+    from model_registry import load_served_model
+    with timer("model_load"):
+        model = load_served_model(get_registry(), config.MODEL_PATH, config.MODEL_VERSION, config.SHADOW_MODEL_VERSION)
+    logger.debug("ML model loaded")
+    return MicroBatcher(model)
+
+def get_model():
+    """
+    Returns the model for the session, loading it on first use.
+
+    `ml_model` (numpy, joblib, scikit-learn and the pickles) is only imported
+    here, so the first paint of the page does not pay for it.
+
+    Returns:
+        MicroBatcher: The shared model (see `get_batcher`), also stored under `st.session_state["model"]`.
+    """
+    if "model" not in st.session_state:
+        st.session_state["model"] = get_batcher()
+    return st.session_state["model"]
+
+@st.cache_resource
+def get_model_checksum():
+    """
+    Returns the checksum of the served model, without loading it.
+
+    Baseline predictions stored in the dataset are only shown when they were
+    computed by the model with this checksum.
+
+    Returns:
+        str: The registry checksum of the served version, or of `CLARIFICATION_MODEL`
+        and its scaler while the registry is empty.
+    """
+    from model_registry import file_checksum
+    registry = get_registry()
+    if registry.latest() is None:
+        return file_checksum(config.MODEL_PATH)
+    return registry.metadata(config.MODEL_VERSION or registry.latest())["checksum"]
+
+@st.cache_resource
+def get_results():
+    """
+    Returns the process-wide store of results shared by every session.
+
+    With `CLARIFICATION_SHARED_CACHE` set, it also shares them with the other
+    workers through that file.
+    """
+    from shared_state import ResultStore
+    if config.SHARED_CACHE_PATH:
+        return ResultStore(spill_path=config.SHARED_CACHE_PATH, write_through=True)
+    return ResultStore()
+
+@st.cache_resource
+def get_scheduler():
+    """
+    Returns the process-wide `LLMScheduler`, through which every session reaches the LLM.
+    """
+    from llama_wrapper import CompanyAnalyzer
+    from llm_scheduler import LLMScheduler
+    analyzer = CompanyAnalyzer(
+        api_url=config.LLM_API_URL,
+        model_name=config.LLM_MODEL_NAME,
+        csv_path=config.DATASET_PATH
+    )
+    logger.debug("LLama model loaded")
+    return LLMScheduler(analyzer)
+
+def get_analyzer():
+    """
+    Returns the session's analyzer, building it on first use.
+
+    Returns:
+        LLMScheduler: The shared scheduler in front of the `CompanyAnalyzer`,
+        stored under `st.session_state["llama"]`.
+    """
+    if "llama" not in st.session_state:
+        st.session_state["llama"] = get_scheduler()
+    return st.session_state["llama"]
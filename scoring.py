@@ -0,0 +1,325 @@
+"""
+Streaming scoring of a whole dataset file.
+
+Reads the dataset chunk by chunk, scales and predicts each chunk, and appends
+the top-2 ratings with their probabilities to the output as it goes, so memory
+does not depend on the size of the file:
+
+    python -m scoring --dataset data/universe_10m.parquet --output /tmp/scores.parquet
+    python -m scoring --dataset data/df_demo.csv --output /tmp/scores.csv --chunk-rows 50000
+    python -m scoring --dataset data/universe_10m.parquet --output /tmp/scores.parquet --workers 0
+
+Throughput (rows per second) is logged after every chunk and reported at the end.
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+import config
+from data.database import CHUNK_ROWS, iter_dataset
+from data.history import RATINGS
+from features import FEATURES
+from instrumentation import get_logger, increment, set_gauge, timer
+
+logger = get_logger("scoring")
+
+OUTPUT_FORMATS = (".csv", ".parquet", ".feather")
+INPUT_COLUMNS = ["Company_Name"] + FEATURES.columns
+
+# Class c of the model is the rating RATINGS[c], as in `predictions_dict`
+RATING_LABELS = np.array(RATINGS, dtype=object)
+
+def _scores_frame(names, classes, probabilities):
+    result = {"Company_Name": names}
+    for i in range(classes.shape[1]):
+        result[f"RATING_{i + 1}"] = RATING_LABELS[classes[:, i]]
+        result[f"PROBABILITY_{i + 1}"] = probabilities[:, i].astype(np.float32)
+    return pd.DataFrame(result)
+
+def score_chunk(model, chunk, k=2):
+    """
+    Scores one chunk of the dataset.
+
+    Args:
+        model (ModelInterface): The rating model.
+        chunk (pd.DataFrame): Rows with `Company_Name` and the eleven scores.
+        k (int, optional): Number of ratings kept per company.
+
+    Returns:
+        pd.DataFrame: `Company_Name`, then `RATING_i` and `PROBABILITY_i` for i = 1..k.
+    """
+    classes, probabilities = model.top_k(FEATURES.from_frame(chunk, dtype=np.float64), k)
+    return _scores_frame(chunk["Company_Name"].to_numpy(), classes, probabilities)
+
+class _ScoreWriter:
+    """
+    Appends scored chunks to a CSV, Parquet or Feather file.
+    """
+    def __init__(self, path):
+        extension = os.path.splitext(path)[1].lower()
+        if extension not in OUTPUT_FORMATS:
+            raise ValueError(f"Unsupported output format: {path}")
+        self.path = path
+        self.extension = extension
+        self._arrow = None
+        self._header = True
+
+    def write(self, frame):
+        if self.extension == ".csv":
+            frame.to_csv(self.path + ".tmp", mode="w" if self._header else "a", header=self._header, index=False)
+            self._header = False
+            return
+        import pyarrow as pa
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        if self._arrow is None:
+            if self.extension == ".parquet":
+                import pyarrow.parquet as pq
+                self._arrow = pq.ParquetWriter(self.path + ".tmp", table.schema)
+            else:
+                # Feather v2 is the Arrow IPC file format, which pd.read_feather reads
+                self._arrow = pa.ipc.new_file(self.path + ".tmp", table.schema)
+        self._arrow.write_table(table)
+
+    def close(self):
+        if self._arrow is not None:
+            self._arrow.close()
+        if os.path.exists(self.path + ".tmp"):
+            os.replace(self.path + ".tmp", self.path)
+
+    def abort(self):
+        """
+        Closes the writer after a failure and removes the partial file; the output is left untouched.
+        """
+        if self._arrow is not None:
+            try:
+                self._arrow.close()
+            except Exception:
+                pass
+        if os.path.exists(self.path + ".tmp"):
+            os.remove(self.path + ".tmp")
+
+def _drain(scored, output_path, on_progress):
+    """
+    Writes scored chunks in order as they come, with progress and throughput.
+    """
+    writer = _ScoreWriter(output_path)
+    start = time.perf_counter()
+    rows = 0
+    try:
+        for frame in scored:
+            writer.write(frame)
+            rows += len(frame)
+            increment("scoring_rows", len(frame))
+            rate = rows / (time.perf_counter() - start)
+            set_gauge("scoring_rows_per_second", rate)
+            logger.info("Scored %d rows (%.0f rows/s)", rows, rate)
+            if on_progress is not None:
+                on_progress(rows, rate)
+    except BaseException:
+        # A bad chunk, a failed worker or Ctrl-C: no partial output
+        writer.abort()
+        raise
+    writer.close()
+
+    seconds = time.perf_counter() - start
+    return {"rows": rows, "seconds": seconds, "rows_per_second": rows / seconds if seconds > 0 else 0.0}
+
+def score_file(model, dataset_path, output_path, chunk_rows=CHUNK_ROWS, k=2, on_progress=None):
+    """
+    Scores a dataset file into an output file, one chunk at a time.
+
+    Args:
+        model (ModelInterface): The rating model.
+        dataset_path (str): The dataset (.csv, .parquet or .feather).
+        output_path (str): The output (.csv, .parquet or .feather); written to a temporary
+            file and moved into place once complete.
+        chunk_rows (int, optional): Rows read and scored per chunk.
+        k (int, optional): Number of ratings kept per company.
+        on_progress (callable, optional): Called with (rows scored so far, rows per second).
+
+    Returns:
+        dict: `rows`, `seconds` and `rows_per_second`.
+    """
+    chunks = iter_dataset(dataset_path, columns=INPUT_COLUMNS, chunk_rows=chunk_rows)
+    with timer("scoring_file"):
+        return _drain((score_chunk(model, chunk, k) for chunk in chunks), output_path, on_progress)
+
+# Model of the current worker process, loaded once by `_init_worker`
+_worker_model = None
+
+def _init_worker(model_path):
+    global _worker_model
+    from ml_model import ModelInterface
+    _worker_model = ModelInterface(model_path)
+
+def _score_shard(dataset_path, shard, k):
+    """
+    Reads a shard of a Parquet or Feather file in the worker and scores it.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    kind, parts = shard
+    if kind == "parquet":
+        table = pq.ParquetFile(dataset_path).read_row_groups(parts, columns=INPUT_COLUMNS)
+    else:
+        with pa.memory_map(dataset_path) as source:
+            index, offset, length = parts
+            table = pa.Table.from_batches([pa.ipc.open_file(source).get_batch(index).slice(offset, length).select(INPUT_COLUMNS)])
+    return score_chunk(_worker_model, table.to_pandas(), k)
+
+def _score_shared(block_name, shape, names, k):
+    """
+    Scores features handed over by the parent process in a shared memory block.
+    """
+    from multiprocessing import shared_memory
+
+    block = shared_memory.SharedMemory(name=block_name)
+    try:
+        features = np.ndarray(shape, dtype=np.float64, buffer=block.buf)
+        classes, probabilities = _worker_model.top_k(features, k)
+    finally:
+        block.close()
+    return _scores_frame(names, classes, probabilities)
+
+def _shards(dataset_path, chunk_rows):
+    """
+    Splits a Parquet file into runs of row groups and a Feather file into
+    slices of record batches of about `chunk_rows` rows each.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if dataset_path.lower().endswith(".parquet"):
+        metadata = pq.ParquetFile(dataset_path).metadata
+        group, rows = [], 0
+        for i in range(metadata.num_row_groups):
+            group.append(i)
+            rows += metadata.row_group(i).num_rows
+            if rows >= chunk_rows:
+                yield "parquet", group
+                group, rows = [], 0
+        if group:
+            yield "parquet", group
+        return
+    with pa.memory_map(dataset_path) as source:
+        reader = pa.ipc.open_file(source)
+        sizes = [reader.get_batch(i).num_rows for i in range(reader.num_record_batches)]
+    for index, size in enumerate(sizes):
+        for offset in range(0, size, chunk_rows):
+            yield "feather", (index, offset, min(chunk_rows, size - offset))
+
+def _parallel_scores(model_path, dataset_path, workers, chunk_rows, k):
+    """
+    Yields the scored chunks of a dataset in file order, scored by a pool of processes.
+
+    Parquet and Feather files are sharded and each worker reads its own
+    shards, so the parent only writes results. CSV files cannot be split
+    safely at byte offsets (quoted text fields may span lines), so the parent parses
+    them and hands the feature matrix of each chunk to a worker through
+    shared memory. At most two chunks per worker are in flight.
+
+    Every shared memory block is released, also when a worker fails or the
+    caller stops reading before the end.
+    """
+    from collections import deque
+    from concurrent.futures import ProcessPoolExecutor
+    from multiprocessing import shared_memory
+
+    csv = dataset_path.lower().endswith(".csv")
+    blocks = {}  # shared memory blocks not released yet, by name
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(model_path,)) as pool:
+        if csv:
+            def submit(chunk):
+                features = FEATURES.from_frame(chunk, dtype=np.float64)
+                block = shared_memory.SharedMemory(create=True, size=max(features.nbytes, 1))
+                blocks[block.name] = block
+                np.ndarray(features.shape, dtype=np.float64, buffer=block.buf)[:] = features
+                return pool.submit(_score_shared, block.name, features.shape, chunk["Company_Name"].to_numpy(), k), block.name
+            tasks = iter_dataset(dataset_path, columns=INPUT_COLUMNS, chunk_rows=chunk_rows)
+        else:
+            def submit(shard):
+                return pool.submit(_score_shard, dataset_path, shard, k), None
+            tasks = _shards(dataset_path, chunk_rows)
+
+        pending = deque()
+        try:
+            for task in tasks:
+                pending.append(submit(task))
+                if len(pending) >= 2 * workers:
+                    yield _collect(pending.popleft(), blocks)
+            while pending:
+                yield _collect(pending.popleft(), blocks)
+        finally:
+            # A worker failed or the caller stopped early: drop the chunks still in flight
+            for future, _ in pending:
+                future.cancel()
+            for block in blocks.values():
+                _release(block)
+            blocks.clear()
+
+def _collect(submitted, blocks):
+    future, block_name = submitted
+    try:
+        return future.result()
+    finally:
+        if block_name is not None:
+            _release(blocks.pop(block_name))
+
+def _release(block):
+    block.close()
+    try:
+        block.unlink()
+    except FileNotFoundError:
+        pass
+
+def score_file_parallel(model_path, dataset_path, output_path, workers=None, chunk_rows=CHUNK_ROWS, k=2, on_progress=None):
+    """
+    Scores a dataset file with a pool of worker processes, keeping the output in file order.
+
+    Each worker loads the model once when it starts. The output is the same
+    as with `score_file`.
+
+    Args:
+        model_path (str): The model pickle, loaded by every worker.
+        dataset_path (str): The dataset (.csv, .parquet or .feather).
+        output_path (str): The output (.csv, .parquet or .feather).
+        workers (int, optional): Number of processes; all the cores by default.
+        chunk_rows (int, optional): Rows per shard.
+        k (int, optional): Number of ratings kept per company.
+        on_progress (callable, optional): Called with (rows scored so far, rows per second).
+
+    Returns:
+        dict: `rows`, `seconds`, `rows_per_second` and `workers`.
+    """
+    workers = workers or os.cpu_count()
+    with timer("scoring_file"):
+        stats = _drain(_parallel_scores(model_path, dataset_path, workers, chunk_rows, k), output_path, on_progress)
+    stats["workers"] = workers
+    return stats
+
+def main():
+    from ml_model import ModelInterface
+
+    parser = argparse.ArgumentParser(description="Score a dataset file chunk by chunk.")
+    parser.add_argument("--dataset", default=config.DATASET_PATH, help="Dataset to score (.csv, .parquet or .feather).")
+    parser.add_argument("--output", required=True, help="Scores to write (.csv, .parquet or .feather).")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, help="Rows read and scored per chunk.")
+    parser.add_argument("--top", type=int, default=2, help="Number of ratings kept per company.")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes; 0 uses every core.")
+    args = parser.parse_args()
+
+    def progress(rows, rate):
+        print(f"\r{rows:,} rows ({rate:,.0f} rows/s)", end="", flush=True)
+
+    if args.workers == 1:
+        stats = score_file(ModelInterface(config.MODEL_PATH), args.dataset, args.output, args.chunk_rows, args.top, progress)
+    else:
+        stats = score_file_parallel(config.MODEL_PATH, args.dataset, args.output, args.workers or None, args.chunk_rows, args.top, progress)
+    print(f"\nScored {stats['rows']:,} rows in {stats['seconds']:.1f}s ({stats['rows_per_second']:,.0f} rows/s) into {args.output}")
+
+if __name__ == "__main__":
+    main()
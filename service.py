@@ -0,0 +1,320 @@
+"""
+Headless REST service exposing the model, the dataset and the analyzer.
+
+Runs next to the Streamlit app, for systems that need predictions or
+analyses without going through the UI:
+
+    python -m service
+    python -m service --port 8600 --workers 8
+
+Endpoints:
+
+    GET  /health                          served model and dataset version
+    POST /predict                         {"rows": [[11 scores], ...] or [{"ENVIRONMENTAL_PILLAR_SCORE": ..., ...}], "k": 2}
+    GET  /companies?industry=&rating=&limit=&offset=
+                                          one page of at most SERVICE_MAX_COMPANIES; X-Next-Offset
+                                          is set when there may be more
+    GET  /companies/<name>
+    POST /companies/<name>/analysis       {"scores": {...}} overrides, optional; the text is streamed
+    POST /companies/<name>/analysis?format=items
+                                          the bullet points instead, one JSON object per line as each is written
+    POST /companies/<name>/analysis?priority=batch
+                                          queued behind interactive analyses; 503 when the LLM is too busy
+    GET  /metrics                         Prometheus metrics
+
+The event loop only parses and answers requests. Concurrent prediction
+requests are stacked into one model call by a `MicroBatcher`, LLM calls run
+on a bounded thread pool behind an `LLMScheduler`, and analyses are kept in a
+shared LRU cache keyed on the scores.
+"""
+import argparse
+import asyncio
+import json
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import tornado.ioloop
+import tornado.iostream
+import tornado.web
+
+import config
+from batching import MicroBatcher
+from data.history import RATINGS
+from features import FEATURES
+from instrumentation import get_logger, increment, observe, render_prometheus, set_gauge, timer
+from llm_scheduler import BATCH, INTERACTIVE, LLMScheduler
+
+logger = get_logger("service")
+
+ANALYSIS_CACHE_ENTRIES = 1024
+_END = object()
+
+class AnalysisCache:
+    """
+    Analyses shared by every request, least recently used first out.
+    """
+    def __init__(self, max_entries=ANALYSIS_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            text = self._entries.get(key)
+            if text is not None:
+                self._entries.move_to_end(key)
+        increment("service_analysis_cache_hits" if text is not None else "service_analysis_cache_misses")
+        return text
+
+    def put(self, key, text):
+        with self._lock:
+            self._entries[key] = text
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+class _Handler(tornado.web.RequestHandler):
+    """
+    Base handler: JSON errors and admission control.
+    """
+    def prepare(self):
+        state = self.settings["state"]
+        if state["pending"] >= self.settings["max_pending"]:
+            increment("service_rejected")
+            self.set_header("Retry-After", "1")
+            raise tornado.web.HTTPError(503, reason="Too many requests in progress")
+        state["pending"] += 1
+        self._admitted = True
+        set_gauge("service_pending", state["pending"])
+        increment("service_requests")
+
+    def on_finish(self):
+        if getattr(self, "_admitted", False):
+            self.settings["state"]["pending"] -= 1
+        observe("service_request", self.request.request_time())
+
+    def write_error(self, status_code, **kwargs):
+        self.set_header("Content-Type", "application/json")
+        self.finish(json.dumps({"error": self._reason}))
+
+    def json_body(self):
+        try:
+            body = json.loads(self.request.body or b"{}")
+        except json.JSONDecodeError as e:
+            raise tornado.web.HTTPError(400, reason=f"Invalid JSON: {e}")
+        if not isinstance(body, dict):
+            raise tornado.web.HTTPError(400, reason="The JSON body must be an object")
+        return body
+
+    def int_argument(self, name, default, low, high=None):
+        value = self.get_query_argument(name, None)
+        if value is None or value == "":
+            return default
+        try:
+            value = int(value)
+        except ValueError:
+            raise tornado.web.HTTPError(400, reason=f"`{name}` must be an integer")
+        if value < low or (high is not None and value > high):
+            bounds = f"between {low} and {high}" if high is not None else f"at least {low}"
+            raise tornado.web.HTTPError(400, reason=f"`{name}` must be {bounds}")
+        return value
+
+    def company(self, name):
+        rows = self.settings["store"].lookup([name])
+        if len(rows) == 0:
+            raise tornado.web.HTTPError(404, reason=f"Unknown company: {name}")
+        return rows.iloc[0]
+
+class HealthHandler(_Handler):
+    def get(self):
+        metadata = getattr(self.settings["model"], "metadata", {})
+        self.write({"status": "ok", "model": metadata.get("version"), "checksum": metadata.get("checksum"),
+                    "dataset_version": self.settings["store"].version})
+
+class MetricsHandler(tornado.web.RequestHandler):
+    def get(self):
+        self.set_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.write(render_prometheus())
+
+def _input_rows(rows):
+    """
+    Converts the `rows` of a prediction request into a feature matrix.
+    """
+    if not isinstance(rows, list) or not rows:
+        raise ValueError("`rows` must be a non-empty list")
+    if isinstance(rows[0], dict):
+        missing = [c for c in FEATURES.columns if c not in rows[0]]
+        if missing:
+            raise ValueError(f"Missing scores: {', '.join(missing)}")
+        rows = [[row[c] for c in FEATURES.columns] for row in rows]
+    matrix = np.asarray(rows, dtype=np.float64)
+    if matrix.ndim != 2 or matrix.shape[1] != len(FEATURES.columns):
+        raise ValueError(f"Each row must have {len(FEATURES.columns)} scores")
+    return matrix
+
+class PredictHandler(_Handler):
+    async def post(self):
+        body = self.json_body()
+        try:
+            k = int(body.get("k", 2))
+        except (TypeError, ValueError):
+            raise tornado.web.HTTPError(400, reason="`k` must be an integer")
+        try:
+            rows = _input_rows(body.get("rows"))
+        except (KeyError, TypeError, ValueError) as e:
+            raise tornado.web.HTTPError(400, reason=str(e))
+        if not 1 <= k <= len(RATINGS):
+            raise tornado.web.HTTPError(400, reason=f"`k` must be between 1 and {len(RATINGS)}")
+
+        with timer("service_predict"):
+            probabilities = await asyncio.wrap_future(self.settings["batcher"].submit(rows))
+            prediction = self.settings["model"].summarize(probabilities, k)
+        increment("service_predict_rows", len(rows))
+        self.write({
+            "model": getattr(self.settings["model"], "metadata", {}).get("version"),
+            "predictions": [
+                {"ratings": [RATINGS[c] for c in classes], "probabilities": confidences.tolist(), "expected": expected}
+                for classes, confidences, expected in zip(prediction["classes"], prediction["confidences"], prediction["expected"].tolist())
+            ],
+        })
+
+class CompaniesHandler(_Handler):
+    def get(self):
+        # Never the whole universe in one response: serializing it would block the event loop
+        limit = self.int_argument("limit", config.SERVICE_MAX_COMPANIES, 1, config.SERVICE_MAX_COMPANIES)
+        offset = self.int_argument("offset", 0, 0)
+        rows = self.settings["store"].filter(
+            industry=self.get_query_argument("industry", None),
+            rating=self.get_query_argument("rating", None),
+            limit=limit,
+            offset=offset,
+        )
+        if len(rows) == limit:
+            self.set_header("X-Next-Offset", str(offset + limit))
+        self.set_header("Content-Type", "application/json")
+        self.write(rows.to_json(orient="records"))
+
+class CompanyHandler(_Handler):
+    def get(self, name):
+        self.set_header("Content-Type", "application/json")
+        self.write(self.company(name).to_json())
+
+class AnalysisHandler(_Handler):
+    async def post(self, name):
+        from llama_wrapper import StreamParser, parse_bullets
+
+        company = self.company(name).copy()
+        scores = self.json_body().get("scores", {})
+        if not isinstance(scores, dict):
+            raise tornado.web.HTTPError(400, reason="`scores` must be an object")
+        for column, value in scores.items():
+            if column not in FEATURES.columns:
+                raise tornado.web.HTTPError(400, reason=f"Unknown score: {column}")
+            try:
+                company[column] = float(value)
+            except (TypeError, ValueError):
+                raise tornado.web.HTTPError(400, reason=f"Score {column} must be a number")
+        items = self.get_query_argument("format", "text") == "items"
+        priority = BATCH if self.get_query_argument("priority", "interactive") == "batch" else INTERACTIVE
+
+        analyzer = self.settings["analyzer"]
+        version = self.settings["store"].company_version(name)
+        key = (name, version, analyzer.model_name, FEATURES.key(company[FEATURES.columns]))
+        self.set_header("Content-Type", "application/x-ndjson" if items else "text/plain; charset=utf-8")
+        cached = self.settings["analyses"].get(key)
+        if cached is not None:
+            self.finish("".join(json.dumps(item) + "\n" for item in parse_bullets(cached)) if items else cached)
+            return
+
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        cancelled = threading.Event()
+        parser = StreamParser()
+
+        def produce():
+            try:
+                for piece in analyzer.stream(company, parser, priority):
+                    if cancelled.is_set():
+                        break
+                    loop.call_soon_threadsafe(queue.put_nowait, piece)
+                loop.call_soon_threadsafe(queue.put_nowait, _END)
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+
+        loop.run_in_executor(self.settings["executor"], produce)
+        sent = 0
+        try:
+            while True:
+                piece = await queue.get()
+                if isinstance(piece, TimeoutError):
+                    # Raised before the LLM was called: nothing was written yet
+                    self.set_header("Retry-After", "5")
+                    raise tornado.web.HTTPError(503, reason=str(piece))
+                if isinstance(piece, Exception):
+                    logger.warning("Analysis failed for %s: %s", name, piece)
+                    self.write(json.dumps({"error": str(piece)}) + "\n" if items else f"\nAnalysis failed: {piece}")
+                    return
+                if items:
+                    # The parser runs on the producer thread: items are only appended to
+                    new_items = parser.items[sent:]
+                    sent += len(new_items)
+                    self.write("".join(json.dumps(item) + "\n" for item in new_items))
+                elif piece is not _END:
+                    self.write(piece)
+                if piece is _END:
+                    break
+                await self.flush()
+        except tornado.iostream.StreamClosedError:
+            cancelled.set()
+            return
+        if parser.text:
+            self.settings["analyses"].put(key, parser.text)
+
+def make_app(model, store, analyzer, workers=config.SERVICE_WORKERS, max_pending=config.SERVICE_MAX_PENDING):
+    """
+    Builds the service application.
+
+    Args:
+        model (ModelInterface or ShadowModel): The served model.
+        store (CompanyStore or SqliteCompanyStore): The company dataset.
+        analyzer (CompanyAnalyzer): The LLM client, put behind an `LLMScheduler`.
+        workers (int, optional): Threads running the LLM calls.
+        max_pending (int, optional): Requests in progress before new ones are
+            answered with 503.
+
+    Returns:
+        tornado.web.Application: The application, not yet listening.
+    """
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="service")
+    return tornado.web.Application([
+        (r"/health", HealthHandler),
+        (r"/metrics", MetricsHandler),
+        (r"/predict", PredictHandler),
+        (r"/companies", CompaniesHandler),
+        (r"/companies/([^/]+)", CompanyHandler),
+        (r"/companies/([^/]+)/analysis", AnalysisHandler),
+    ], model=model, store=store, analyzer=LLMScheduler(analyzer), executor=executor,
+        batcher=MicroBatcher(model), analyses=AnalysisCache(),
+        max_pending=max_pending, state={"pending": 0})
+
+def main():
+    from data.database import get_store
+    from llama_wrapper import CompanyAnalyzer
+    from model_registry import ModelRegistry, load_served_model
+
+    parser = argparse.ArgumentParser(description="Serve predictions, companies and analyses over HTTP.")
+    parser.add_argument("--port", type=int, default=config.SERVICE_PORT)
+    parser.add_argument("--workers", type=int, default=config.SERVICE_WORKERS, help="Threads running the LLM calls.")
+    args = parser.parse_args()
+
+    model = load_served_model(ModelRegistry(config.MODEL_REGISTRY_PATH), config.MODEL_PATH, config.MODEL_VERSION, config.SHADOW_MODEL_VERSION)
+    analyzer = CompanyAnalyzer(api_url=config.LLM_API_URL, model_name=config.LLM_MODEL_NAME, csv_path=config.DATASET_PATH)
+    app = make_app(model, get_store(), analyzer, args.workers)
+    app.listen(args.port)
+    print(f"Serving on port {args.port} with {args.workers} workers")
+    tornado.ioloop.IOLoop.current().start()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+"""
+Computed results shared by every session.
+
+Streamlit's `st.session_state` is per browser session: what one user computed
+(an LLM analysis, a prediction of a given score vector) is recomputed for the
+next user, and lost when the tab closes. The UI state of a session (slider
+values, reset flags, the last prediction shown on each card) stays in
+`st.session_state`; results that only depend on their inputs go to the
+process-wide `ResultStore`, keyed on those inputs.
+
+The store is bounded in bytes. Entries evicted from memory are spilled to a
+SQLite file when `CLARIFICATION_STATE_SPILL` is set, and read back from it on
+a miss. With `CLARIFICATION_SHARED_CACHE` every entry is also written to that
+file as soon as it is stored, so the workers of a multi-worker deployment
+(see `python -m workers`) share each other's results.
+"""
+import hashlib
+import os
+import pickle
+import sqlite3
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+import config
+from instrumentation import get_logger, increment, set_gauge
+
+logger = get_logger("shared_state")
+
+def _key_id(key):
+    # Keys are tuples of strings and numbers, whose repr is stable across processes
+    return hashlib.sha256(repr(key).encode("utf-8")).hexdigest()
+
+class ResultStore:
+    """
+    Size-bounded LRU store of computed results, with an optional SQLite spill file.
+    """
+    def __init__(self, max_bytes=int(config.STATE_MAX_MB * 2**20), spill_path=config.STATE_SPILL_PATH, write_through=False):
+        """
+        Args:
+            max_bytes (int, optional): Memory budget, measured on the pickled values.
+            spill_path (str, optional): SQLite file receiving the evicted entries; none by default.
+            write_through (bool, optional): Write every entry to `spill_path`
+                when it is stored, not only when it is evicted.
+        """
+        self.max_bytes = max_bytes
+        self.spill_path = spill_path
+        self.write_through = write_through and spill_path is not None
+        self._entries = OrderedDict()  # key id -> (value, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._update_lock = threading.Lock()
+        self._local = threading.local()
+        if spill_path:
+            os.makedirs(os.path.dirname(os.path.abspath(spill_path)), exist_ok=True)
+            with sqlite3.connect(spill_path) as connection:
+                connection.execute("PRAGMA journal_mode=WAL")
+                connection.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value BLOB)")
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.spill_path, timeout=30)
+            self._local.connection = connection
+        return connection
+
+    def get(self, key, fresh=False):
+        """
+        Returns the stored value of `key`, or None.
+
+        Args:
+            key (hashable): The key.
+            fresh (bool, optional): With `write_through`, read the shared file
+                first, for values that other processes `update`.
+        """
+        key_id = _key_id(key)
+        if fresh and self.write_through:
+            row = self._connection().execute("SELECT value FROM results WHERE key = ?", (key_id,)).fetchone()
+            if row is not None:
+                increment("state_spill_hits")
+                value = pickle.loads(row[0])
+                self._insert(key_id, value, len(row[0]))
+                return value
+        with self._lock:
+            entry = self._entries.get(key_id)
+            if entry is not None:
+                self._entries.move_to_end(key_id)
+        if entry is not None:
+            increment("state_hits")
+            return entry[0]
+        if self.spill_path:
+            row = self._connection().execute("SELECT value FROM results WHERE key = ?", (key_id,)).fetchone()
+            if row is not None:
+                increment("state_spill_hits")
+                value = pickle.loads(row[0])
+                self._insert(key_id, value, len(row[0]))
+                return value
+        increment("state_misses")
+        return None
+
+    def put(self, key, value):
+        """
+        Stores `value` under `key`, evicting the least recently used entries past the budget.
+        """
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        key_id = _key_id(key)
+        if self.write_through:
+            connection = self._connection()
+            with connection:
+                connection.execute("INSERT OR REPLACE INTO results VALUES (?, ?)", (key_id, data))
+        self._insert(key_id, value, len(data))
+
+    def update(self, key, update):
+        """
+        Replaces the value of `key` with `update(current value or None)`, atomically.
+
+        With `write_through`, the value is read, updated and written in one
+        SQLite transaction, so updates made by other processes at the same
+        time are not lost.
+
+        Returns:
+            The new value.
+        """
+        key_id = _key_id(key)
+        with self._update_lock:
+            if self.write_through:
+                connection = self._connection()
+                connection.execute("BEGIN IMMEDIATE")
+                try:
+                    row = connection.execute("SELECT value FROM results WHERE key = ?", (key_id,)).fetchone()
+                    value = update(pickle.loads(row[0]) if row is not None else None)
+                    data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+                    connection.execute("INSERT OR REPLACE INTO results VALUES (?, ?)", (key_id, data))
+                    connection.commit()
+                except BaseException:
+                    connection.rollback()
+                    raise
+            else:
+                value = update(self.get(key))
+                data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            self._insert(key_id, value, len(data))
+        return value
+
+    def get_or_compute(self, key, compute):
+        """
+        Returns the stored value of `key`, or computes, stores and returns it.
+        """
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def _insert(self, key_id, value, size):
+        evicted = []
+        with self._lock:
+            if key_id in self._entries:
+                self._bytes -= self._entries.pop(key_id)[1]
+            self._entries[key_id] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                old_id, (old_value, old_size) = self._entries.popitem(last=False)
+                self._bytes -= old_size
+                evicted.append((old_id, old_value))
+            set_gauge("state_bytes", self._bytes)
+            set_gauge("state_entries", len(self._entries))
+        if evicted:
+            increment("state_evictions", len(evicted))
+            if self.spill_path and not self.write_through:
+                connection = self._connection()
+                with connection:
+                    connection.executemany("INSERT OR REPLACE INTO results VALUES (?, ?)",
+                                           [(k, pickle.dumps(v, protocol=pickle.HIGHEST_PROTOCOL)) for k, v in evicted])
+
+    def stats(self):
+        """
+        Returns the number of entries and bytes held in memory.
+        """
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes}
+
+class NearestVectors:
+    """
+    Finds, among the input vectors already stored under a group, the closest to a new one.
+
+    Results keyed on a score vector (analyses) are only reused for identical
+    scores; this index lets a caller reuse the result of a nearby vector
+    instead. The vectors of each group are kept in the `ResultStore` itself,
+    so they are bounded and shared the same way as the results, and updated
+    with `ResultStore.update` so that concurrent workers do not lose vectors.
+    """
+    def __init__(self, store, max_distance=config.ANALYSIS_REUSE_DISTANCE, max_vectors=256):
+        """
+        Args:
+            store (ResultStore): Where the vectors are kept.
+            max_distance (float, optional): Largest Euclidean distance of a reusable vector.
+            max_vectors (int, optional): Vectors kept per group, the oldest are dropped.
+        """
+        self.store = store
+        self.max_distance = max_distance
+        self.max_vectors = max_vectors
+
+    def nearest(self, group, vector):
+        """
+        Returns the stored vector of `group` closest to `vector` within `max_distance`, or None.
+        """
+        vectors = self.store.get(("vectors", group), fresh=True)
+        if not vectors:
+            return None
+        distances = np.linalg.norm(np.asarray(vectors) - np.asarray(vector, dtype=np.float64), axis=1)
+        best = int(np.argmin(distances))
+        if distances[best] > self.max_distance:
+            return None
+        increment("state_near_hits")
+        logger.debug("Reusing the result of a vector at distance %.3f", distances[best])
+        return vectors[best]
+
+    def add(self, group, vector):
+        """
+        Records that a result of `vector` is stored for `group`.
+        """
+        vector = tuple(float(v) for v in vector)
+
+        def append(vectors):
+            vectors = [v for v in vectors or () if v != vector]
+            return tuple((vectors + [vector])[-self.max_vectors:])
+
+        self.store.update(("vectors", group), append)
+
+    def discard(self, group, vector):
+        """
+        Forgets `vector`, e.g. once its result was evicted from the store.
+        """
+        vector = tuple(float(v) for v in vector)
+        self.store.update(("vectors", group), lambda vectors: tuple(v for v in vectors or () if v != vector))
+
+def session_memory(session_state):
+    """
+    Estimates the memory held by a session's state, grouped by key prefix.
+
+    Keys such as `slide3_<company>` are grouped under `slide3`; shared objects
+    (the model, the analyzer) are not counted.
+
+    Args:
+        session_state (Mapping): `st.session_state` or any mapping of keys to values.
+
+    Returns:
+        dict: Bytes per key prefix, largest first, plus a `total`.
+    """
+    sizes = {}
+    for key in list(session_state.keys()):
+        value = session_state[key]
+        if not isinstance(value, (str, bytes, int, float, bool, list, tuple, dict, type(None))):
+            continue
+        prefix = str(key).split("_", 1)[0]
+        sizes[prefix] = sizes.get(prefix, 0) + sys.getsizeof(key) + len(pickle.dumps(value))
+    sizes = dict(sorted(sizes.items(), key=lambda item: item[1], reverse=True))
+    sizes["total"] = sum(sizes.values())
+    return sizes
+
+def render_session_memory(session_state, store):
+    """
+    Renders this session's state size and the shared store's in the sidebar.
+    """
+    import streamlit as st
+
+    sizes = session_memory(session_state)
+    with st.sidebar.expander("Session memory", expanded=False):
+        st.dataframe([{"keys": prefix, "bytes": size} for prefix, size in sizes.items()], hide_index=True, use_container_width=True)
+        stats = store.stats()
+        st.write(f"Shared results: {stats['entries']} entries, {stats['bytes'] / 2**20:.1f} MB")
@@ -0,0 +1,14 @@
+"""
+Shared setup for the test suite.
+
+Run from the repository root:
+
+    python -m pytest tests
+"""
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+# The app opens "data/...", "ml-model/..." relative to the working directory
+os.chdir(REPO_ROOT)
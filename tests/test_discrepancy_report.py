@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+
+from data.history import RATINGS
+from discrepancy_report import MAX_NOTCHES, UNKNOWN_BUCKET, build_report, compare_chunk, read_page, read_summary
+from features import FEATURES
+
+
+class FixedModel:
+    """Predicts the same top-2 classes for every row."""
+    def __init__(self, first, second):
+        self.classes = [RATINGS.index(first), RATINGS.index(second)]
+
+    def predict(self, features):
+        return np.tile(self.classes, (len(features), 1))
+
+
+def _chunk(ratings):
+    frame = pd.DataFrame({
+        "Company_Name": [f"Company {i}" for i in range(len(ratings))],
+        "IVA_INDUSTRY": "Banks",
+        "IVA_COMPANY_RATING": ratings,
+    })
+    for column in FEATURES.columns:
+        frame[column] = 5.0
+    return frame
+
+
+def test_exact_match_outside_top_2_and_unknown_get_distinct_buckets():
+    # "A" is an exact match, "BB" the second guess, "AAA" neither; None is unknown
+    result = compare_chunk(FixedModel("A", "BB"), _chunk(["A", "BB", "AAA", None]))
+
+    assert result["_bucket"].tolist() == [2 * MAX_NOTCHES + 1, (MAX_NOTCHES - 2) * 2 + 1, (MAX_NOTCHES - 2) * 2, UNKNOWN_BUCKET]
+    assert UNKNOWN_BUCKET > result["_bucket"].iloc[:3].max()
+
+
+def test_unknown_ratings_are_ranked_after_exact_matches(tmp_path):
+    dataset = tmp_path / "dataset.csv"
+    _chunk([None, "A", "CCC", None, "A"]).to_csv(dataset, index=False)
+    report = str(tmp_path / "report.parquet")
+
+    summary = build_report(FixedModel("A", "BB"), str(dataset), report, chunk_rows=2)
+    page = read_page(report, 0, 10)
+
+    assert page["IVA_COMPANY_RATING"].tolist()[:3] == ["CCC", "A", "A"]
+    assert page["IVA_COMPANY_RATING"].iloc[3:].isna().all()
+    assert summary["rows"] == read_summary(report)["rows"] == 5
+    assert summary["unknown"] == 2
+    assert sum(summary["counts"].values()) + summary["unknown"] == summary["rows"]
@@ -0,0 +1,94 @@
+"""
+Multi-worker mode: several Streamlit processes sharing one cache tier.
+
+Launches N app processes on consecutive ports, to be put behind a load
+balancer with sticky sessions (a Streamlit session lives on one websocket):
+
+    python -m workers --workers 4
+    python -m workers --workers 8 --base-port 9000 --metrics-base-port 9100
+
+Every worker reads the dataset through the same SQLite file (built once here,
+before the workers start) instead of loading it into its own memory, and
+shares predictions, figures and LLM analyses through a SQLite cache in WAL
+mode (`CLARIFICATION_SHARED_CACHE`). Shared entries are keyed on the content
+of the company's row and the model checksum, which every worker computes the
+same way.
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import config
+from instrumentation import get_logger
+
+logger = get_logger("workers")
+
+DEFAULT_SHARED_CACHE = "data/shared_cache.sqlite"
+
+def prepare(shared_cache, backend):
+    """
+    Builds what the workers would otherwise race to build: the SQLite dataset and the shared cache file.
+    """
+    from shared_state import ResultStore
+
+    if backend == "sqlite":
+        from data.database import read_dataset
+        from data.sqlite_backend import open_store
+        open_store(config.SQLITE_PATH, config.DATASET_PATH, read_dataset)
+    ResultStore(spill_path=shared_cache, write_through=True)
+
+def launch(workers, base_port, shared_cache, backend="sqlite", metrics_base_port=None, extra_env=None):
+    """
+    Starts the worker processes.
+
+    Args:
+        workers (int): Number of processes.
+        base_port (int): Port of the first worker; the others follow.
+        shared_cache (str): The shared SQLite cache file.
+        backend (str, optional): Dataset backend of the workers.
+        metrics_base_port (int, optional): Port of the first worker's `/metrics`.
+        extra_env (dict, optional): More environment variables for the workers.
+
+    Returns:
+        list: The `subprocess.Popen` of every worker.
+    """
+    prepare(shared_cache, backend)
+    processes = []
+    for i in range(workers):
+        env = dict(os.environ, CLARIFICATION_BACKEND=backend, CLARIFICATION_SHARED_CACHE=shared_cache, **(extra_env or {}))
+        if metrics_base_port:
+            env["CLARIFICATION_METRICS_PORT"] = str(metrics_base_port + i)
+        command = [sys.executable, "-m", "streamlit", "run", "main.py",
+                   "--server.port", str(base_port + i), "--server.headless", "true"]
+        processes.append(subprocess.Popen(command, env=env))
+        logger.info("Worker %d started on port %d", i, base_port + i)
+    return processes
+
+def main():
+    parser = argparse.ArgumentParser(description="Run several app workers sharing one cache.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Number of Streamlit processes.")
+    parser.add_argument("--base-port", type=int, default=8501, help="Port of the first worker.")
+    parser.add_argument("--metrics-base-port", type=int, help="Port of the first worker's /metrics page.")
+    parser.add_argument("--shared-cache", default=config.SHARED_CACHE_PATH or DEFAULT_SHARED_CACHE, help="Shared SQLite cache file.")
+    parser.add_argument("--backend", choices=["sqlite", "memory"], default="sqlite", help="Dataset backend of the workers.")
+    args = parser.parse_args()
+
+    processes = launch(args.workers, args.base_port, args.shared_cache, args.backend, args.metrics_base_port)
+    print(f"{args.workers} workers on ports {args.base_port}-{args.base_port + args.workers - 1}, sharing {args.shared_cache}")
+    try:
+        while all(process.poll() is None for process in processes):
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in processes:
+            if process.poll() is None:
+                process.send_signal(signal.SIGTERM)
+        for process in processes:
+            process.wait()
+
+if __name__ == "__main__":
+    main()